@@ -0,0 +1,111 @@
+"""
+Import time benchmark of umt_craftsim.\n
+Every statement is run in fresh interpreter several times, median time of statement itself\n
+(without interpreter startup) is compared with its budget. Statement also must not load\n
+modules listed as lazy for it, which is checked exactly, independent of machine speed.\n
+Exit status is 1 if any budget is exceeded.\n
+Usage:
+    ```
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 31 --scale 2  # slow machine, budgets doubled
+    ```
+"""
+
+import argparse
+import compileall
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# statement -> (budget in milliseconds, modules statement must not import)
+BUDGETS: dict[str, tuple[float, tuple[str, ...]]] = {
+    "import umt_craftsim": (
+        2,
+        ("umt_craftsim.constants", "umt_craftsim.dataclasses.items"),
+    ),
+    "from umt_craftsim import Item, Machines": (
+        40,
+        ("umt_craftsim.transformations.engine", "umt_craftsim.item_factory"),
+    ),
+    "from umt_craftsim import ItemFactory": (
+        55,
+        (
+            "umt_craftsim.transformations.transformations_single",
+            "umt_craftsim.transformations.transformations_multiple",
+            "difflib",
+            "numpy",
+        ),
+    ),
+    "from umt_craftsim import ItemFactory; ItemFactory.create_ore('Tin')": (
+        55,
+        (
+            "umt_craftsim.transformations.transformations_single",
+            "umt_craftsim.transformations.transformations_multiple",
+        ),
+    ),
+}
+
+# sys and time are built in, json is imported after measured statement
+_PROBE = """
+import sys, time
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+import json
+print(json.dumps([seconds, sorted(sys.modules)]))
+"""
+
+
+def measure(statement: str, repeat: int) -> tuple[float, set[str]]:
+    """Median milliseconds of statement in fresh interpreters and modules it loaded.
+
+    Args:
+        statement (str): python code to measure
+        repeat (int): number of interpreters
+
+    Returns:
+        tuple[float, set[str]]: median milliseconds, modules loaded after statement
+    """
+    times = []
+    modules: set[str] = set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        seconds, loaded = json.loads(output)
+        times.append(seconds * 1000)
+        modules = set(loaded)
+    return statistics.median(times), modules
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=15, help="interpreters per statement")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of all budgets")
+    args = parser.parse_args(argv)
+
+    # measure imports from bytecode, as installed package is imported
+    compileall.compile_dir(ROOT / "umt_craftsim", quiet=1)
+    failed = False
+    for statement, (budget, lazy) in BUDGETS.items():
+        milliseconds, modules = measure(statement, args.repeat)
+        limit = budget * args.scale
+        loaded = sorted(modules.intersection(lazy))
+        ok = milliseconds <= limit and not loaded
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {milliseconds:7.2f} ms / {limit:6.1f} ms  {statement}")
+        for module in loaded:
+            print(f"     loaded eagerly: {module}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+"""
+Benchmark suite of umt_craftsim.\n
+Micro-benchmarks time every transformation class of transformations_single and\n
+transformations_multiple, TransformationHelperMixin.properties_totals, Item.short_sequence\n
+and Item.table_full. Macro-benchmarks replay main.py and not_a_test.py (print only formats\n
+its arguments), ItemFactory.process_mats_* paths and synthetic deep and wide recipe trees.\n
+Every benchmark reports operations per second (best round) and peak memory of one operation\n
+(tracemalloc), both are compared with stored baseline. Exit status is 1 if any benchmark is\n
+slower or uses more memory than baseline and tolerance allow, or if transformation class\n
+has no inputs in INPUTS.\n
+Baseline depends on machine, store it again with --save after moving to other machine.\n
+Usage:
+    ```
+    python benchmarks/bench_suite.py                  # compare with benchmarks/baseline.json
+    python benchmarks/bench_suite.py --save           # store results as new baseline
+    python benchmarks/bench_suite.py -k transform. --tolerance 0.5
+    ```
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+# package is imported from this checkout, not from installed version
+sys.path.insert(0, str(ROOT))
+
+from umt_craftsim.constants import Gems, ItemTypes, Machines, Ores
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.item_factory import ItemFactory
+from umt_craftsim.recipe_graph import RecipeGraph
+from umt_craftsim.service.mixins import TransformationHelperMixin
+from umt_craftsim.transformations import (
+    transformations_multiple,
+    transformations_single,
+)
+from umt_craftsim.transformations.transformation_registry import TransformationRegistry
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+SCRIPTS = ("main.py", "not_a_test.py")
+
+# machine -> names of samples() items given to transform()
+INPUTS: dict[str, tuple[str, ...]] = {
+    Machines.ORE_CLEANER: ("ore",),
+    Machines.POLISHER: ("ore",),
+    Machines.ORE_SMELTER: ("ore",),
+    Machines.BLAST_FURNACE: ("ore",),
+    Machines.PHILOSOPHERS_STONE: ("ore",),
+    Machines.ORE_UPGRADER: ("ore",),
+    Machines.COILER: ("tempered",),
+    Machines.BOLT_MACHINE: ("tempered",),
+    Machines.PLATE_STAMPER: ("tempered",),
+    Machines.TEMPERING_FORGE: ("alloy",),
+    Machines.BAR_TO_GEM_TRANSMUTER: ("tempered",),
+    Machines.PIPE_MAKER: ("plate",),
+    Machines.MECHANICAL_PARTS_MAKER: ("plate",),
+    Machines.FILIGREE_CUTTER: ("plate",),
+    Machines.ELECTRONIC_TUNER: ("circuit",),
+    Machines.GEM_CUTTER: ("gem",),
+    Machines.GEM_TO_BAR_TRANSMUTER: ("gem",),
+    Machines.QUALITY_ASSURANCE_MACHINE: ("gem",),
+    Machines.DUPLICATOR: ("gem",),
+    Machines.CERAMIC_FURNACE: ("clay",),
+    Machines.LENS_CUTTER: ("glass",),
+    Machines.FRAME_MAKER: ("tempered", "bolts"),
+    Machines.RING_MAKER: ("gem", "coil"),
+    Machines.BLASTING_POWDER_CHAMBER: ("metal dust", "stone dust"),
+    Machines.EXPLOSIVES_MAKER: ("powder", "casing"),
+    Machines.CIRCUIT_MAKER: ("glass", "coil"),
+    Machines.CASING_MACHINE: ("frame", "bolts", "plate"),
+    Machines.PRISMATIC_GEM_CRUCIBLE: ("gem", "gem"),
+    Machines.ALLOY_FURNACE: ("bar", "bar"),
+    Machines.MAGNETIC_MACHINE: ("coil", "casing"),
+    Machines.OPTICS_MACHINE: ("lens", "pipe"),
+    Machines.GILDER: ("filigree", "ring"),
+    Machines.ENGINE_FACTORY: ("mechanical parts", "pipe", "casing"),
+    Machines.SUPERCONDUCTOR_CONSTRUCTOR: ("tempered", "ceramic casing"),
+    Machines.AMULET_MAKER: ("ring", "frame", "prismatic"),
+    Machines.TABLET_FACTORY: ("casing", "glass", "circuit"),
+    Machines.LASER_MAKER: ("optics", "gem", "circuit"),
+    Machines.POWER_CORE_ASSEMBLER: ("casing", "superconductor", "electromagnet"),
+}
+
+# machines of ItemFactory.process_mats_* benchmarks, whole sequence is enabled
+MATS_MACHINES = [
+    Machines.ORE_UPGRADER,
+    Machines.ORE_CLEANER,
+    Machines.POLISHER,
+    Machines.PHILOSOPHERS_STONE,
+    Machines.ORE_SMELTER,
+    Machines.BAR_TO_GEM_TRANSMUTER,
+    Machines.PRISMATIC_GEM_CRUCIBLE,
+    Machines.GEM_CUTTER,
+    Machines.GEM_TO_BAR_TRANSMUTER,
+    Machines.ALLOY_FURNACE,
+    Machines.TEMPERING_FORGE,
+]
+
+
+def samples() -> dict[str, Item]:
+    """Valid input of every machine, crafted as in not_a_test.py."""
+    apply = TransformationRegistry.apply
+    items = {
+        "ore": ItemFactory.create_ore("Tin"),
+        "gem": ItemFactory.create_gem("Topaz"),
+        "glass": Item(ItemTypes.GLASS, value=40, materials=0),
+        "lens": Item(ItemTypes.LENS, value=60, materials=0),
+        "ceramic casing": Item(ItemTypes.CERAMIC_CASING, value=160, materials=0),
+        "clay": Item(ItemTypes.CLAY_BLOCK, value=5, materials=1),
+        "metal dust": Item("metal dust", value=1, materials=1),
+        "stone dust": Item("stone dust", value=1, materials=1),
+        "powder": Item(ItemTypes.BLASTING_POWDER, value=2, materials=0),
+    }
+    items["bar"] = apply(Machines.ORE_SMELTER, items["ore"])
+    items["alloy"] = apply(Machines.ALLOY_FURNACE, items["bar"], items["bar"])
+    items["tempered"] = apply(Machines.TEMPERING_FORGE, items["alloy"])
+    for name, machine in (
+        ("coil", Machines.COILER),
+        ("bolts", Machines.BOLT_MACHINE),
+        ("plate", Machines.PLATE_STAMPER),
+    ):
+        items[name] = apply(machine, items["tempered"])
+    items["pipe"] = apply(Machines.PIPE_MAKER, items["plate"])
+    items["mechanical parts"] = apply(Machines.MECHANICAL_PARTS_MAKER, items["plate"])
+    items["filigree"] = apply(Machines.FILIGREE_CUTTER, items["plate"])
+    items["frame"] = apply(Machines.FRAME_MAKER, items["tempered"], items["bolts"])
+    items["casing"] = apply(Machines.CASING_MACHINE, items["frame"], items["bolts"], items["plate"])
+    items["circuit"] = apply(Machines.CIRCUIT_MAKER, items["glass"], items["coil"])
+    items["prismatic"] = apply(Machines.PRISMATIC_GEM_CRUCIBLE, items["gem"], items["gem"])
+    items["ring"] = apply(Machines.RING_MAKER, items["gem"], items["coil"])
+    items["electromagnet"] = apply(Machines.MAGNETIC_MACHINE, items["coil"], items["casing"])
+    items["optics"] = apply(Machines.OPTICS_MACHINE, items["lens"], items["pipe"])
+    items["superconductor"] = apply(
+        Machines.SUPERCONDUCTOR_CONSTRUCTOR, items["tempered"], items["ceramic casing"]
+    )
+    items["power core"] = apply(
+        Machines.POWER_CORE_ASSEMBLER,
+        items["casing"],
+        items["superconductor"],
+        items["electromagnet"],
+    )
+    return items
+
+
+def transformation_classes() -> list[type]:
+    """Every registered transformation class of transformations_single and _multiple."""
+    classes = []
+    for module, base in (
+        (transformations_single, transformations_single.Transformation_Single),
+        (transformations_multiple, transformations_multiple.Transformation_Multiple),
+    ):
+        for cls in vars(module).values():
+            if (
+                inspect.isclass(cls)
+                and issubclass(cls, base)
+                and cls.__module__ == module.__name__
+                and not inspect.isabstract(cls)
+                and cls.machine in TransformationRegistry.registry
+            ):
+                classes.append(cls)
+    return classes
+
+
+def _script(name: str) -> Callable[[], object]:
+    """Replays script, print() only formats its arguments."""
+    path = ROOT / name
+    code = compile(path.read_text(encoding="utf-8"), str(path), "exec")
+
+    def quiet_print(*args, **kwargs):
+        for arg in args:
+            str(arg)
+
+    def run():
+        exec(code, {"__name__": "__benchmark__", "print": quiet_print})
+
+    return run
+
+
+def _deep_tree(depth: int) -> Callable[[], object]:
+    """Chain of depth alternating bar <-> gem transmutations, each item has deeper history."""
+    graph = RecipeGraph()
+    node = graph.add(Machines.ORE_SMELTER, ItemFactory.create_ore("Gold"))
+    for _ in range(depth // 2):
+        node = graph.add(Machines.BAR_TO_GEM_TRANSMUTER, node)
+        node = graph.add(Machines.GEM_TO_BAR_TRANSMUTER, node)
+    return lambda: graph.execute(node)
+
+
+def _wide_tree() -> Callable[[], object]:
+    """Every ore with 4 preprocessing prefixes, neighbours alloyed and crafted into casings."""
+    graph = RecipeGraph()
+    prefixes = (
+        (),
+        (Machines.ORE_CLEANER,),
+        (Machines.POLISHER,),
+        (Machines.ORE_CLEANER, Machines.POLISHER),
+    )
+    bars = []
+    for ore in Ores:
+        for prefix in prefixes:
+            node = graph.input(ItemFactory.create_ore(ore))
+            for machine in prefix:
+                node = graph.add(machine, node)
+            bars.append(graph.add(Machines.ORE_SMELTER, node))
+    for left, right in zip(bars, bars[1:] + bars[:1]):
+        alloy = graph.add(Machines.TEMPERING_FORGE, graph.add(Machines.ALLOY_FURNACE, left, right))
+        bolts = graph.add(Machines.BOLT_MACHINE, alloy)
+        plate = graph.add(Machines.PLATE_STAMPER, alloy)
+        frame = graph.add(Machines.FRAME_MAKER, alloy, bolts)
+        graph.add(Machines.CASING_MACHINE, frame, bolts, plate)
+    sinks = graph.sinks()
+    return lambda: graph.execute(*sinks)
+
+
+def collect() -> tuple[dict[str, Callable[[], object]], list[str]]:
+    """Every benchmark by name and transformation classes INPUTS has no inputs for.
+
+    Returns:
+        tuple[dict[str, Callable[[], object]], list[str]]: benchmarks, names of uncovered classes
+    """
+    items = samples()
+    benchmarks: dict[str, Callable[[], object]] = {}
+    uncovered = []
+    for cls in transformation_classes():
+        names = INPUTS.get(cls.machine)
+        if names is None:
+            uncovered.append(cls.__name__)
+            continue
+        benchmarks[f"transform.{cls.__name__}"] = partial(
+            cls().transform, *(items[name] for name in names)
+        )
+
+    totals = [items["casing"], items["superconductor"], items["electromagnet"]]
+    compact_totals = [CompactItem.from_item(item) for item in totals]
+    benchmarks["properties_totals.item"] = partial(
+        TransformationHelperMixin.properties_totals, totals
+    )
+    benchmarks["properties_totals.compact"] = partial(
+        TransformationHelperMixin.properties_totals, compact_totals
+    )
+    power_core = items["power core"]
+    benchmarks["item.short_sequence"] = power_core.short_sequence
+    benchmarks["item.table_full"] = power_core.table_full
+
+    for script in SCRIPTS:
+        benchmarks[f"script.{script}"] = _script(script)
+
+    ore = ItemFactory.create_ore("Tin")
+    gem = ItemFactory.create_gem("Painite")
+    # Ore Upgrader knows only some ores and can't upgrade last of them
+    ores = [
+        ItemFactory.create_ore(ore)
+        for ore in Ores
+        if ore.value in transformations_single.OreUpgraderTransformation.ores[:-1]
+    ]
+    batch = ores + [ItemFactory.create_gem(gem) for gem in Gems]
+    groups = [(ore, ore) for ore in ores]
+    benchmarks["factory.process_mats_simple"] = partial(
+        ItemFactory.process_mats_simple, ore, MATS_MACHINES
+    )
+    benchmarks["factory.process_mats_simple_batch"] = partial(
+        ItemFactory.process_mats_simple_batch, batch, MATS_MACHINES
+    )
+    benchmarks["factory.process_mats_complex"] = partial(
+        ItemFactory.process_mats_complex, MATS_MACHINES, ore, ore, gem, gem
+    )
+    benchmarks["factory.process_mats_complex_batch"] = partial(
+        ItemFactory.process_mats_complex_batch, MATS_MACHINES, groups
+    )
+
+    benchmarks["tree.deep"] = _deep_tree(200)
+    benchmarks["tree.wide"] = _wide_tree()
+    return benchmarks, uncovered
+
+
+def measure(function: Callable[[], object], rounds: int, round_time: float) -> tuple[float, int]:
+    """Operations per second of best round and peak memory of one operation.
+
+    Args:
+        function (Callable[[], object]): benchmark
+        rounds (int): number of timed rounds
+        round_time (float): minimal seconds of one round, number of calls is calibrated to it
+
+    Returns:
+        tuple[float, int]: operations per second, peak traced bytes of one call
+    """
+    function()
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= round_time:
+            break
+        calls = max(calls * 2, int(calls * round_time / max(elapsed, 1e-9)))
+
+    best = elapsed
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(calls):
+                function()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # smallest peak of few calls, one-time growth of shared caches isn't counted
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(3):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return calls / best, min(peaks)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("-k", "--filter", default="", help="run benchmarks containing substring")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="store results into baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="allowed relative loss of ops/sec and growth of peak memory",
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--round-time", type=float, default=0.05, help="seconds of one round")
+    args = parser.parse_args(argv)
+
+    benchmarks, uncovered = collect()
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["benchmarks"]
+
+    regressed = []
+    for name in uncovered:
+        print(f"FAIL {name} has no inputs in INPUTS")
+    results = {}
+    for name, function in benchmarks.items():
+        if args.filter not in name:
+            continue
+        ops, peak = measure(function, args.rounds, args.round_time)
+        results[name] = {"ops_per_sec": round(ops, 1), "peak_bytes": peak}
+        stored = baseline.get(name)
+        status, change = "new ", ""
+        if stored is not None:
+            ratio = ops / stored["ops_per_sec"]
+            change = f"{ratio - 1:+7.1%}"
+            slower = ratio < 1 - args.tolerance
+            # small absolute slack, peak of tiny operations moves with allocator state
+            bigger = peak > stored["peak_bytes"] * (1 + args.tolerance) + 2048
+            status = "FAIL" if slower or bigger else "ok  "
+            if slower or bigger:
+                regressed.append(name)
+            if bigger:
+                change += f"  peak was {stored['peak_bytes'] / 1024:.1f} KiB"
+        print(f"{status} {ops:12,.1f} ops/s {change:>8}  {peak / 1024:9.1f} KiB  {name}")
+
+    if args.save:
+        stored = {} if args.filter == "" else dict(baseline)
+        stored.update(results)
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "benchmarks": dict(sorted(stored.items())),
+                },
+                indent=2,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"baseline stored in {args.baseline}")
+        return 0
+    if regressed:
+        print(f"{len(regressed)} of {len(results)} benchmarks regressed: {', '.join(regressed)}")
+    return 1 if regressed or uncovered else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
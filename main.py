@@ -1,8 +1,9 @@
+from umt_craftsim.constants import Machines
 from umt_craftsim.dataclasses.items import Item
 from umt_craftsim.item_builder import ItemBuilder
 from umt_craftsim.item_factory import ItemFactory
-from umt_craftsim.transformations import transformations_multiple as tm
 from umt_craftsim.transformations import transformations_single as ts
+from umt_craftsim.transformations.transformation_registry import TransformationRegistry
 
 # Usage of project. This code doesn't interacting with code base, can be modified anyhow, it's literally just usage.
 # I decided to not cut this for having example of systems, so, everyone downloaded this garbage from github can start from something before going deeper.
@@ -14,15 +15,15 @@ tin_bar = (
     .add_transformation_single(ts.OreSmelterTransformation())
     .execute()
 )
-tin_alloy_untempered = tm.AlloyFurnaceTransformation().transform(tin_bar, tin_bar)
-tin_alloy = ts.TemperingForgeTransformation().transform(tin_alloy_untempered)
-tin_bolts = ts.BoltMachineTransformation().transform(tin_alloy)
-tin_coil = ts.CoilerTransformation().transform(tin_alloy)
-tin_plate = ts.PlateStamperTransformation().transform(tin_alloy)
-tin_frame = tm.FrameMakerTransformation().transform(tin_alloy, tin_bolts)
-tin_casing = tm.CasingMachineTransformation().transform(tin_frame, tin_bolts, tin_plate)
-tin_electromagnet = tm.MagneticMachineTransformation().transform(tin_coil, tin_casing)
-tin_electromagnet_tuned = ts.ElectronicTunerTransformation().transform(tin_electromagnet)
+tin_alloy_untempered = TransformationRegistry.apply(Machines.ALLOY_FURNACE, tin_bar, tin_bar)
+tin_alloy = TransformationRegistry.apply(Machines.TEMPERING_FORGE, tin_alloy_untempered)
+tin_bolts = TransformationRegistry.apply(Machines.BOLT_MACHINE, tin_alloy)
+tin_coil = TransformationRegistry.apply(Machines.COILER, tin_alloy)
+tin_plate = TransformationRegistry.apply(Machines.PLATE_STAMPER, tin_alloy)
+tin_frame = TransformationRegistry.apply(Machines.FRAME_MAKER, tin_alloy, tin_bolts)
+tin_casing = TransformationRegistry.apply(Machines.CASING_MACHINE, tin_frame, tin_bolts, tin_plate)
+tin_electromagnet = TransformationRegistry.apply(Machines.MAGNETIC_MACHINE, tin_coil, tin_casing)
+tin_electromagnet_tuned = TransformationRegistry.apply(Machines.ELECTRONIC_TUNER, tin_electromagnet)
 print(tin)
 print(tin_bar)
 print(tin_alloy)
@@ -35,9 +36,11 @@ print(tin_electromagnet)
 print(tin_electromagnet_tuned)
 print()
 stupid_glass = Item("glass", 30)
-tin_circuit_untuned = tm.CircuitMakerTransformation().transform(stupid_glass, tin_coil)
-tin_circuit = ts.ElectronicTunerTransformation().transform(tin_circuit_untuned)
-tin_tablet = tm.TabletFactoryTransformation().transform(tin_casing, stupid_glass, tin_circuit)
+tin_circuit_untuned = TransformationRegistry.apply(Machines.CIRCUIT_MAKER, stupid_glass, tin_coil)
+tin_circuit = TransformationRegistry.apply(Machines.ELECTRONIC_TUNER, tin_circuit_untuned)
+tin_tablet = TransformationRegistry.apply(
+    Machines.TABLET_FACTORY, tin_casing, stupid_glass, tin_circuit
+)
 print(repr(tin_tablet))
 
 painite = ItemFactory.create_gem("Painite")
@@ -47,12 +50,14 @@ painite_stage1_processed = (
     .add_transformation_single(ts.GemCutterTransformation())
     .execute()
 )
-painite_prismatic = tm.PrismaticGemCrucibleTransformation().transform(
-    painite_stage1_processed, painite_stage1_processed
+painite_prismatic = TransformationRegistry.apply(
+    Machines.PRISMATIC_GEM_CRUCIBLE, painite_stage1_processed, painite_stage1_processed
+)
+painite_bar = TransformationRegistry.apply(Machines.GEM_TO_BAR_TRANSMUTER, painite_prismatic)
+painite_alloy_untempered = TransformationRegistry.apply(
+    Machines.ALLOY_FURNACE, painite_bar, painite_bar
 )
-painite_bar = ts.GTBTransformation().transform(painite_prismatic)
-painite_alloy_untempered = tm.AlloyFurnaceTransformation().transform(painite_bar, painite_bar)
-painite_alloy = ts.TemperingForgeTransformation().transform(painite_alloy_untempered)
+painite_alloy = TransformationRegistry.apply(Machines.TEMPERING_FORGE, painite_alloy_untempered)
 print(painite_stage1_processed.table_full())
 print(painite_prismatic.table_full())
 print(painite_bar.table_full())
@@ -1,69 +1,72 @@
-from umt_craftsim.constants import ItemTypes
+from umt_craftsim.constants import ItemTypes, Machines
 from umt_craftsim.dataclasses.items import Item
 from umt_craftsim.item_factory import ItemFactory
-from umt_craftsim.transformations import transformations_multiple as tm
-from umt_craftsim.transformations import transformations_single as ts
+from umt_craftsim.transformations.transformation_registry import TransformationRegistry
 
 ore = "Unobtainium"
 results: list[Item] = []
 ore = ItemFactory.create_ore(ore)
 results.append(ore)
-ore_cleaned = ts.OreCleanerTransformation().transform(ore)
+ore_cleaned = TransformationRegistry.apply(Machines.ORE_CLEANER, ore)
 results.append(ore_cleaned)
-ore_polished = ts.PolisherTransformation().transform(ore_cleaned)
+ore_polished = TransformationRegistry.apply(Machines.POLISHER, ore_cleaned)
 results.append(ore_polished)
-ore_infused = ts.PhilosophersStoneTransformation().transform(ore_polished)
+ore_infused = TransformationRegistry.apply(Machines.PHILOSOPHERS_STONE, ore_polished)
 results.append(ore_infused)
-bar = ts.OreSmelterTransformation().transform(ore_infused)
+bar = TransformationRegistry.apply(Machines.ORE_SMELTER, ore_infused)
 results.append(bar)
-alloy = tm.AlloyFurnaceTransformation().transform(bar, bar)
+alloy = TransformationRegistry.apply(Machines.ALLOY_FURNACE, bar, bar)
 results.append(alloy)
-alloy_tempered = ts.TemperingForgeTransformation().transform(alloy)
+alloy_tempered = TransformationRegistry.apply(Machines.TEMPERING_FORGE, alloy)
 results.append(alloy_tempered)
-gem = ts.BTGTransformation().transform(alloy_tempered)
+gem = TransformationRegistry.apply(Machines.BAR_TO_GEM_TRANSMUTER, alloy_tempered)
 results.append(gem)
-gem_cut = ts.GemCutterTransformation().transform(gem)
+gem_cut = TransformationRegistry.apply(Machines.GEM_CUTTER, gem)
 results.append(gem_cut)
-gem_prismatic = tm.PrismaticGemCrucibleTransformation().transform(gem_cut, gem_cut)
+gem_prismatic = TransformationRegistry.apply(Machines.PRISMATIC_GEM_CRUCIBLE, gem_cut, gem_cut)
 results.append(gem_prismatic)
-super_gem = ts.QAMachineTransformation().transform(gem_prismatic)
+super_gem = TransformationRegistry.apply(Machines.QUALITY_ASSURANCE_MACHINE, gem_prismatic)
 results.append(super_gem)
-super_alloy = ts.GTBTransformation().transform(super_gem)
+super_alloy = TransformationRegistry.apply(Machines.GEM_TO_BAR_TRANSMUTER, super_gem)
 results.append(super_alloy)
 
 bar = super_alloy
 gem = super_gem
-coil = ts.CoilerTransformation().transform(bar)
+coil = TransformationRegistry.apply(Machines.COILER, bar)
 results.append(coil)
-bolts = ts.BoltMachineTransformation().transform(bar)
+bolts = TransformationRegistry.apply(Machines.BOLT_MACHINE, bar)
 results.append(bolts)
-plate = ts.PlateStamperTransformation().transform(bar)
+plate = TransformationRegistry.apply(Machines.PLATE_STAMPER, bar)
 results.append(plate)
-pipe = ts.PipeMakerTransformation().transform(plate)
+pipe = TransformationRegistry.apply(Machines.PIPE_MAKER, plate)
 results.append(pipe)
-mechanical_parts = ts.MechanicalPartsMakerTransformation().transform(plate)
+mechanical_parts = TransformationRegistry.apply(Machines.MECHANICAL_PARTS_MAKER, plate)
 results.append(mechanical_parts)
-filigree = ts.FiligreeCutterTransformation().transform(plate)
+filigree = TransformationRegistry.apply(Machines.FILIGREE_CUTTER, plate)
 results.append(filigree)
 
 table2: list[Item] = []
-frame = tm.FrameMakerTransformation().transform(bar, bolts)
+frame = TransformationRegistry.apply(Machines.FRAME_MAKER, bar, bolts)
 table2.append(frame)
-ring = tm.RingMakerTransformation().transform(gem, coil)
+ring = TransformationRegistry.apply(Machines.RING_MAKER, gem, coil)
 table2.append(ring)
 stupid_dust_x2 = Item(ItemTypes.BLASTING_POWDER, value=2, materials=0, sequence=["STUPID_DUST_x2"])
 stupid_dust_x3 = Item(ItemTypes.BLASTING_POWDER, value=3, materials=0, sequence=["STUPID_DUST_x2"])
-metal_casing = tm.CasingMachineTransformation().transform(frame, bolts, plate)
+metal_casing = TransformationRegistry.apply(Machines.CASING_MACHINE, frame, bolts, plate)
 table2.append(metal_casing)
-explosives_2x = tm.ExplosivesMakerTransformation().transform(stupid_dust_x2, metal_casing)
+explosives_2x = TransformationRegistry.apply(
+    Machines.EXPLOSIVES_MAKER, stupid_dust_x2, metal_casing
+)
 table2.append(explosives_2x)
-explosives_3x = tm.ExplosivesMakerTransformation().transform(stupid_dust_x3, metal_casing)
+explosives_3x = TransformationRegistry.apply(
+    Machines.EXPLOSIVES_MAKER, stupid_dust_x3, metal_casing
+)
 table2.append(explosives_3x)
 stupid_glass = Item(
     item_type=ItemTypes.GLASS, value=40, materials=0, sequence=["STUPID_GLASS_POLISHED"]
 )
-circuit = tm.CircuitMakerTransformation().transform(stupid_glass, coil)
-circuit = ts.ElectronicTunerTransformation().transform(circuit)
+circuit = TransformationRegistry.apply(Machines.CIRCUIT_MAKER, stupid_glass, coil)
+circuit = TransformationRegistry.apply(Machines.ELECTRONIC_TUNER, circuit)
 table2.append(circuit)
 stupid_ceramic_casing = Item(
     item_type=ItemTypes.CERAMIC_CASING,
@@ -77,27 +80,29 @@ stupid_lens = Item(
     materials=0,
     sequence=["ANOTHER_STUPID_ITEM_POLISHED"],
 )
-electromagnet = tm.MagneticMachineTransformation().transform(coil, metal_casing)
-electromagnet = ts.ElectronicTunerTransformation().transform(electromagnet)
+electromagnet = TransformationRegistry.apply(Machines.MAGNETIC_MACHINE, coil, metal_casing)
+electromagnet = TransformationRegistry.apply(Machines.ELECTRONIC_TUNER, electromagnet)
 table2.append(electromagnet)
-optics = tm.OpticsMachineTransformation().transform(stupid_lens, pipe)
+optics = TransformationRegistry.apply(Machines.OPTICS_MACHINE, stupid_lens, pipe)
 table2.append(optics)
-engine = tm.EngineFactoryTransformation().transform(mechanical_parts, pipe, metal_casing)
+engine = TransformationRegistry.apply(Machines.ENGINE_FACTORY, mechanical_parts, pipe, metal_casing)
 table2.append(optics)
-superconductor = tm.SuperconductorConstructorTransformation().transform(bar, stupid_ceramic_casing)
+superconductor = TransformationRegistry.apply(
+    Machines.SUPERCONDUCTOR_CONSTRUCTOR, bar, stupid_ceramic_casing
+)
 table2.append(superconductor)
-amulet = tm.AmuletMakerTransformation().transform(ring, frame, gem)
+amulet = TransformationRegistry.apply(Machines.AMULET_MAKER, ring, frame, gem)
 table2.append(amulet)
-amulet_gilded = tm.GilderTransformation().transform(filigree, amulet)
+amulet_gilded = TransformationRegistry.apply(Machines.GILDER, filigree, amulet)
 table2.append(amulet_gilded)
-ring_gilded = tm.GilderTransformation().transform(filigree, ring)
+ring_gilded = TransformationRegistry.apply(Machines.GILDER, filigree, ring)
 table2.append(ring_gilded)
-tablet = tm.TabletFactoryTransformation().transform(metal_casing, stupid_glass, circuit)
+tablet = TransformationRegistry.apply(Machines.TABLET_FACTORY, metal_casing, stupid_glass, circuit)
 table2.append(tablet)
-laser = tm.LaserMakerTransformation().transform(optics, gem, circuit)
+laser = TransformationRegistry.apply(Machines.LASER_MAKER, optics, gem, circuit)
 table2.append(laser)
-power_core = tm.PowerCoreAssemblerTransformation().transform(
-    metal_casing, superconductor, electromagnet
+power_core = TransformationRegistry.apply(
+    Machines.POWER_CORE_ASSEMBLER, metal_casing, superconductor, electromagnet
 )
 table2.append(power_core)
 
@@ -0,0 +1,55 @@
+"""
+Simulator of item crafting of UMT.\n
+Package attributes are loaded on first access (PEP 562), so `import umt_craftsim` is cheap\n
+and `from umt_craftsim import ItemFactory` imports only modules ItemFactory needs,\n
+which keeps startup of CLI calls and process pool workers short.\n
+Example:
+    ```
+    from umt_craftsim import ItemFactory, Machines, TransformationRegistry
+
+    ore = ItemFactory.create_ore("Tin")
+    bar = TransformationRegistry.apply(Machines.ORE_SMELTER, ore)
+    ```
+"""
+
+from importlib import import_module
+
+# attribute -> module it is defined in
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "Gems": "umt_craftsim.constants",
+    "ItemTypes": "umt_craftsim.constants",
+    "Machines": "umt_craftsim.constants",
+    "Ores": "umt_craftsim.constants",
+    "Tags": "umt_craftsim.constants",
+    "CompactItem": "umt_craftsim.dataclasses.items",
+    "Item": "umt_craftsim.dataclasses.items",
+    "ItemBuilder": "umt_craftsim.item_builder",
+    "ItemFactory": "umt_craftsim.item_factory",
+    "TransformationRegistry": "umt_craftsim.transformations.transformation_registry",
+    "RecipeGraph": "umt_craftsim.recipe_graph",
+    "ParallelExecutor": "umt_craftsim.executors",
+    "ChainOptimizer": "umt_craftsim.optimizer",
+    "best_chains": "umt_craftsim.optimizer",
+    "RecipeSolver": "umt_craftsim.recipe_solver",
+    "solve_recipe": "umt_craftsim.recipe_solver",
+    "RecipeBook": "umt_craftsim.recipe_dsl",
+    "compile_recipe": "umt_craftsim.recipe_dsl",
+    "run_recipe": "umt_craftsim.recipe_dsl",
+    "trace_recipes": "umt_craftsim.tracing",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    # next access is plain module attribute lookup
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -3,11 +3,12 @@ Module full of constants, contains next classes:
 ItemTypes, for item_type
 Machines, for names of machines
 Tags, for names of item tags
+TagFlags, for bitmask representation of Tags
 Ores, for named ores and their values
 Gems, for gems and their values
 """
 
-from enum import IntEnum, StrEnum, auto
+from enum import IntEnum, IntFlag, StrEnum, auto
 
 
 class ItemTypes(StrEnum):
@@ -168,6 +169,20 @@ class Tags(StrEnum):
     GILDED = "Gilded"
 
 
+TagFlags = IntFlag("TagFlags", [(tag.name, 1 << index) for index, tag in enumerate(Tags)])
+TagFlags.__doc__ = """
+    Bitmask twin of Tags, generated from it, so member names always match Tags names.\n
+    Used by compact items, where tag checks and unions become single integer operations.\n
+    Attributes:
+        UNKNOWN: value 1
+        ALLOYED: value 2
+        ... (one bit per Tags member, in Tags order)
+    """
+
+TAG_FLAGS: dict[str, TagFlags] = {tag.value: TagFlags[tag.name] for tag in Tags}
+"""Mapping of tag value (works with plain str and Tags members) to its TagFlags bit"""
+
+
 class Machines(StrEnum):
     """
     Represents all Machines existing in game.\n
@@ -0,0 +1,30 @@
+"""
+Items and their history.\n
+Attributes are loaded on first access (PEP 562), so ItemBatch (and numpy) is imported\n
+only by code which uses it.
+"""
+
+from importlib import import_module
+
+# attribute -> module it is defined in
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "CompactItem": "umt_craftsim.dataclasses.items",
+    "Item": "umt_craftsim.dataclasses.items",
+    "HistoryNode": "umt_craftsim.dataclasses.history",
+    "ItemBatch": "umt_craftsim.dataclasses.batch",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,392 @@
+"""
+Columnar container of many items for vectorized transformations.\n
+Defines ItemBatch, which stores item_type, value, materials and tags bitmask\n
+as parallel NumPy arrays, so one transform_batch() call of transformation\n
+processes whole batch instead of one transform() call per item.\n
+Requires numpy (optional dependency, "pip install numpy"), rest of package works without it.
+"""
+
+from collections.abc import Iterable, Sequence
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError(
+        "ItemBatch and transform_batch() require numpy, install it with 'pip install numpy'"
+    ) from error
+
+from umt_craftsim import constants
+from umt_craftsim.dataclasses.history import HistoryNode
+from umt_craftsim.dataclasses.items import CompactItem, Item, mask_to_tags, tags_to_mask
+from umt_craftsim.service.exceptions import (
+    InvalidItemTypeError,
+    ItemProcessingError,
+    TagConflictError,
+    TagMissingError,
+)
+
+# String table for item_type and dustwork_type columns, enum members registered first,
+# so decoded values are same objects as in scalar path. Unknown strings are appended on demand.
+_STRINGS: list[str] = [*constants.ItemTypes, *constants.DustTypes]
+_CODES: dict[str, int] = {}
+for _index, _string in enumerate(_STRINGS):
+    _CODES.setdefault(_string, _index)
+
+
+def string_code(string: str) -> int:
+    """Returns code of item_type or dustwork_type string in ItemBatch columns.
+
+    Args:
+        string (str): item type or dust type, better to use ItemTypes or DustTypes constants
+
+    Returns:
+        int: code, stable for whole process
+    """
+    code = _CODES.get(string)
+    if code is None:
+        _STRINGS.append(string)
+        code = _CODES.setdefault(string, len(_STRINGS) - 1)
+    return code
+
+
+def round_half_even(values: np.ndarray) -> np.ndarray:
+    """Vectorized round(), bit-identical to builtin round() of float.\n
+    Both round exact float64 value half to even, so round(2.5) == 2 in both paths.
+
+    Args:
+        values (np.ndarray): float64 values
+
+    Returns:
+        np.ndarray: int64 rounded values
+    """
+    return np.rint(values).astype(np.int64)
+
+
+class ItemBatch:
+    """
+    Represents many items as parallel columns.\n
+    Transformations process ItemBatch with transform_batch(), applying validation and value formula to all rows at once.\n
+    Crafting steps of whole batch are kept as pending suffix and applied to per-row histories only when needed.\n
+    Batch of Item rows keeps tags of every row in their order, tags added to whole batch are kept as pending suffix too.\n
+    Attributes:
+        item_type (np.ndarray): int16 codes of item types, see string_code()
+        value (np.ndarray): int64 values, float64 if any item has float value
+        materials (np.ndarray): float64 materials
+        tag_mask (np.ndarray): int64 TagFlags bitmasks
+        dustwork_type (np.ndarray): int16 codes of dust types, see string_code()
+        item_class (type): Item or CompactItem, class of items returned by to_items(). Defaults to Item.
+    """
+
+    def __init__(
+        self,
+        item_type: np.ndarray,
+        value: np.ndarray,
+        materials: np.ndarray,
+        tag_mask: np.ndarray,
+        dustwork_type: np.ndarray,
+        histories: Sequence[HistoryNode],
+        pending: tuple[str, ...] = (),
+        item_class: type = Item,
+        tags: Sequence[tuple[str, ...]] | None = None,
+        pending_tags: tuple[str, ...] = (),
+    ):
+        """ItemBatch init, prefer ItemBatch.from_items, columns must have same length.
+
+        Args:
+            item_type, value, materials, tag_mask, dustwork_type (np.ndarray): columns
+            histories (Sequence[HistoryNode]): per-row histories, without pending steps
+            pending (tuple[str, ...]): steps applied to every row after its history. Defaults to ().
+            item_class (type): Item or CompactItem. Defaults to Item.
+            tags (Sequence[tuple[str, ...]] | None): per-row tags of Item rows, without pending tags,
+                None gives tags of tag_mask in Tags declaration order. Defaults to None.
+            pending_tags (tuple[str, ...]): tags appended to tags of every row. Defaults to ().
+        """
+        self.item_type = item_type
+        self.value = value
+        self.materials = materials
+        self.tag_mask = tag_mask
+        self.dustwork_type = dustwork_type
+        self._histories = histories
+        self._pending = pending
+        self.item_class = item_class
+        self._tags = tags
+        self._pending_tags = pending_tags
+
+    @classmethod
+    def from_items(cls, items: Iterable[Item | CompactItem]) -> "ItemBatch":
+        """Creates batch from items, value column is float64 if any value is float,
+        so int values of such batch come back as equal floats.
+
+        Args:
+            items (Iterable[Item | CompactItem]): items, tags must be Tags constants
+
+        Raises:
+            ItemValidationError: if item has tag which is not one of Tags
+
+        Returns:
+            ItemBatch: batch with one row per item
+        """
+        items = list(items)
+        item_class = CompactItem if items and all(i.__class__ is CompactItem for i in items) else Item
+        values = [i.value for i in items]
+        # float values are kept, as scalar path keeps them, int64 column would truncate them
+        value_type = np.float64 if any(v.__class__ is float for v in values) else np.int64
+        return cls(
+            item_type=np.fromiter((string_code(i.item_type) for i in items), np.int16, len(items)),
+            value=np.fromiter(values, value_type, len(items)),
+            materials=np.fromiter((i.materials for i in items), np.float64, len(items)),
+            tag_mask=np.fromiter(
+                (i.tag_mask if i.__class__ is CompactItem else tags_to_mask(i.tags) for i in items),
+                np.int64,
+                len(items),
+            ),
+            dustwork_type=np.fromiter(
+                (string_code(i.dustwork_type) for i in items), np.int16, len(items)
+            ),
+            histories=[HistoryNode.from_sequence(i.sequence) for i in items],
+            item_class=item_class,
+            tags=[tuple(i.tags) for i in items] if item_class is Item else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    @property
+    def histories(self) -> list[HistoryNode]:
+        """Per-row histories with pending steps applied.
+
+        Returns:
+            list[HistoryNode]: one history per row
+        """
+        if self._pending:
+            self._histories = [history.extend(self._pending) for history in self._histories]
+            self._pending = ()
+        return list(self._histories)
+
+    def item(self, index: int) -> Item | CompactItem:
+        """Materializes one row as item.
+
+        Args:
+            index (int): row index
+
+        Returns:
+            Item | CompactItem: item of batch item_class
+        """
+        history = self._histories[index].extend(self._pending)
+        tag_mask = int(self.tag_mask[index])
+        if self.item_class is CompactItem:
+            tags = tag_mask
+        elif self._tags is not None:
+            tags = [*self._tags[index], *self._pending_tags]
+        else:
+            tags = list(mask_to_tags(tag_mask))
+        return self.item_class(
+            item_type=_STRINGS[self.item_type[index]],
+            value=self.value[index].item(),
+            materials=float(self.materials[index]),
+            dustwork_type=_STRINGS[self.dustwork_type[index]],
+            tags=tags,
+            sequence=history,
+        )
+
+    def __getitem__(self, index: int) -> Item | CompactItem:
+        return self.item(index)
+
+    def to_items(self) -> list[Item | CompactItem]:
+        """Materializes all rows as items, tags of Item rows are in same order as in scalar path.
+
+        Returns:
+            list[Item | CompactItem]: items of batch item_class
+        """
+        return [self.item(index) for index in range(len(self))]
+
+    def rounded_value(self, multiplier: float) -> np.ndarray:
+        """Vectorized round(item.value * multiplier), bit-identical to scalar path.
+
+        Args:
+            multiplier (float): value multiplier
+
+        Returns:
+            np.ndarray: int64 values
+        """
+        return round_half_even(self.value * multiplier)
+
+    def constant_value(self, value: int) -> np.ndarray:
+        """Column of same value for every row.
+
+        Args:
+            value (int): value
+
+        Returns:
+            np.ndarray: int64 values
+        """
+        return np.full(len(self), value, np.int64)
+
+    def validate_type(self, excepted_item_type: str):
+        """Vectorized TransformationHelperMixin.validate_type.
+
+        Raises:
+            InvalidItemTypeError: for first row with other item type
+        """
+        wrong = self.item_type != string_code(excepted_item_type)
+        if wrong.any():
+            index = int(wrong.argmax())
+            raise InvalidItemTypeError(
+                excepted_item_type, _STRINGS[self.item_type[index]], self.item(index)
+            )
+
+    def validate_multiple_types(self, excepted_item_types: list[str]):
+        """Vectorized TransformationHelperMixin.validate_multiple_items_types.
+
+        Raises:
+            InvalidItemTypeError: for first row with item type not in excepted_item_types
+        """
+        codes = [string_code(item_type) for item_type in excepted_item_types]
+        wrong = ~np.isin(self.item_type, codes)
+        if wrong.any():
+            index = int(wrong.argmax())
+            raise InvalidItemTypeError(
+                excepted_item_types, _STRINGS[self.item_type[index]], self.item(index)
+            )
+
+    def validate_tag_absence(self, tag: str):
+        """Vectorized TransformationHelperMixin.validate_tag_absence.
+
+        Raises:
+            TagConflictError: for first row with prohibited tag
+        """
+        present = (self.tag_mask & int(constants.TAG_FLAGS[tag])) != 0
+        if present.any():
+            raise TagConflictError(tag, self.item(int(present.argmax())))
+
+    def validate_tag_present(self, tag: str):
+        """Vectorized TransformationHelperMixin.validate_tag_present.
+
+        Raises:
+            TagMissingError: for first row without required tag
+        """
+        missing = (self.tag_mask & int(constants.TAG_FLAGS[tag])) == 0
+        if missing.any():
+            raise TagMissingError(tag, self.item(int(missing.argmax())))
+
+    def derive(
+        self,
+        machine: str,
+        value: np.ndarray,
+        item_type: str | np.ndarray | None = None,
+        materials: np.ndarray | float | None = None,
+        add_tag: str | None = None,
+        tag_mask: np.ndarray | int | None = None,
+        tags_of: "ItemBatch | None" = None,
+    ) -> "ItemBatch":
+        """Creates batch of transformation outputs, vectorized version of creating Item in transform().
+
+        Args:
+            machine (str): machine appended to every history, better to use Machines constants
+            value (np.ndarray): new values
+            item_type (str | np.ndarray | None): new item type or codes, None keeps types. Defaults to None.
+            materials (np.ndarray | float | None): new materials, None keeps materials. Defaults to None.
+            add_tag (str | None): tag added to every row. Defaults to None.
+            tag_mask (np.ndarray | int | None): new tags bitmasks, None keeps tags. Defaults to None.
+            tags_of (ItemBatch | None): batch whose tags (with their order) replace tags, instead of tag_mask. Defaults to None.
+
+        Returns:
+            ItemBatch: new batch, columns of self are not changed, dustwork_type is reset as in transform()
+        """
+        size = len(self)
+        if item_type is None:
+            item_type = self.item_type
+        elif not isinstance(item_type, np.ndarray):
+            item_type = np.full(size, string_code(item_type), np.int16)
+        if materials is None:
+            materials = self.materials
+        elif not isinstance(materials, np.ndarray):
+            materials = np.full(size, materials, np.float64)
+        tags, pending_tags = self._tags, self._pending_tags
+        if tags_of is not None:
+            tag_mask = tags_of.tag_mask
+            tags, pending_tags = tags_of._tags, tags_of._pending_tags
+        elif tag_mask is None:
+            tag_mask = self.tag_mask
+        else:
+            # rows get tags of new bitmask in declaration order
+            tags, pending_tags = None, ()
+            if not isinstance(tag_mask, np.ndarray):
+                tag_mask = np.full(size, tag_mask, np.int64)
+        if add_tag is not None:
+            tag_mask = tag_mask | int(constants.TAG_FLAGS[add_tag])
+            pending_tags = pending_tags + (add_tag,)
+        return ItemBatch(
+            item_type=item_type,
+            value=value,
+            materials=materials,
+            tag_mask=tag_mask,
+            dustwork_type=np.full(size, string_code(constants.DustTypes.UNKNOWN), np.int16),
+            histories=self._histories,
+            pending=self._pending + (machine,),
+            item_class=self.item_class,
+            tags=tags,
+            pending_tags=pending_tags,
+        )
+
+    @staticmethod
+    def totals(batches: Sequence["ItemBatch"]) -> "ItemBatch":
+        """Vectorized TransformationHelperMixin.properties_totals, row i of result aggregates rows i of batches.
+
+        Args:
+            batches (Sequence[ItemBatch]): batches with same length, one per transformation input
+
+        Raises:
+            ItemProcessingError: if batches have different length
+
+        Returns:
+            ItemBatch: batch with summed value and materials, united tags, merged histories and unknown type
+        """
+        size = len(batches[0])
+        if any(len(batch) != size for batch in batches):
+            raise ItemProcessingError(
+                f"Batches must have same length, got {[len(batch) for batch in batches]}"
+            )
+        tag_mask = batches[0].tag_mask.copy()
+        for batch in batches[1:]:
+            tag_mask |= batch.tag_mask
+        all_compact = all(batch.item_class is CompactItem for batch in batches)
+        tags = None
+        if not all_compact:
+            # tags of all inputs in first seen order, as multiple inputs machines unite them
+            tags = [
+                tuple(dict.fromkeys(tag for row_tags in row for tag in row_tags))
+                for row in zip(*(batch._row_tags() for batch in batches))
+            ]
+        return ItemBatch(
+            item_type=np.full(size, string_code(constants.ItemTypes.UNKNOWN), np.int16),
+            value=sum(batch.value for batch in batches),  # type: ignore
+            materials=sum(batch.materials for batch in batches),  # type: ignore
+            tag_mask=tag_mask,
+            dustwork_type=np.full(size, string_code(constants.DustTypes.UNKNOWN), np.int16),
+            histories=[
+                HistoryNode.merge(row)
+                for row in zip(*(batch.histories for batch in batches))
+            ],
+            item_class=CompactItem if all_compact else Item,
+            tags=tags,
+        )
+
+    def _row_tags(self) -> list[tuple[str, ...]]:
+        """Tags of every row, pending tags included."""
+        if self._tags is None:
+            return [mask_to_tags(int(mask)) for mask in self.tag_mask]
+        if self._pending_tags:
+            return [row_tags + self._pending_tags for row_tags in self._tags]
+        return list(self._tags)
+
+    def totals_with(self, *others: "ItemBatch") -> "ItemBatch":
+        """Same as ItemBatch.totals([self, *others]).
+
+        Args:
+            *others (ItemBatch): batches of other transformation inputs
+
+        Returns:
+            ItemBatch: aggregated batch
+        """
+        return ItemBatch.totals([self, *others])
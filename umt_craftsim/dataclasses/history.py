@@ -0,0 +1,224 @@
+"""
+Structurally shared crafting history.\n
+Defines HistoryNode, immutable hash-consed node of recipe history DAG.\n
+Every node points to its parent, so appending machine to history is O(1),\n
+and identical histories (or sub-histories) are always the same node object,\n
+so one intermediate used in many recipes costs one node, not a copy per recipe.\n
+HistoryNode behaves as read-only view of old nested sequence lists:\n
+["Ore Cleaner", "Polisher"] or [[...], [...], "Alloy Furnace", "Tempering Forge"]
+"""
+
+from threading import Lock
+from weakref import WeakValueDictionary
+
+
+def _restore_node(step, parent, merged) -> "HistoryNode":
+    """Pickle helper, rebuilds node through intern table."""
+    return HistoryNode._intern(step, parent, merged)
+
+
+class HistoryNode:
+    """
+    Immutable node of crafting history, used as Item.sequence.\n
+    There are 3 kinds of nodes:\n
+    - empty history, HistoryNode.EMPTY, looks as []\n
+    - step node, one machine (step) appended to parent history\n
+    - merge node, histories of several inputs (merged) appended to parent history as nested entries\n
+    Nodes are hash-consed, equal histories are the same object, so comparing nodes is identity check.\n
+    Supports len(), iteration, indexing, == with lists and + with lists of steps, as old sequence lists did.\n
+    Attributes:
+        step (str | None): machine of step node, better to use Machines constants, None for other nodes
+        parent (HistoryNode | None): previous history, None only for HistoryNode.EMPTY
+        merged (tuple[HistoryNode, ...]): histories of merged inputs, empty for other nodes
+        length (int): number of top-level entries, same as len() of old sequence list
+    """
+
+    __slots__ = ("step", "parent", "merged", "length", "__weakref__")
+
+    _nodes: "WeakValueDictionary[tuple, HistoryNode]" = WeakValueDictionary()
+    _lock = Lock()
+    EMPTY: "HistoryNode"
+
+    def __init__(self, step, parent, merged):
+        """Don't create nodes directly, use HistoryNode.EMPTY, from_sequence, merge and add_step."""
+        self.step = step
+        self.parent = parent
+        self.merged = merged
+        if parent is None:
+            self.length = 0
+        elif step is not None:
+            self.length = parent.length + 1
+        else:
+            self.length = parent.length + len(merged)
+
+    @classmethod
+    def _intern(cls, step, parent, merged) -> "HistoryNode":
+        """Returns canonical node for given fields, creates it if needed.
+
+        Children are canonical themselves, so key compares them by identity.
+        """
+        key = (step, parent, merged)
+        node = cls._nodes.get(key)
+        if node is None:
+            with cls._lock:
+                node = cls._nodes.get(key)
+                if node is None:
+                    node = cls(step, parent, merged)
+                    cls._nodes[key] = node
+        return node
+
+    @classmethod
+    def from_sequence(cls, sequence) -> "HistoryNode":
+        """Converts old style sequence list into history node.
+
+        Args:
+            sequence (list | HistoryNode): list of steps, nested lists (or nodes) are histories of merged inputs
+
+        Returns:
+            HistoryNode: canonical node of given history
+        """
+        if sequence.__class__ is cls:
+            return sequence
+        return cls.EMPTY.extend(sequence)
+
+    @classmethod
+    def merge(cls, histories) -> "HistoryNode":
+        """Creates history of item made from several inputs, same as [seq1, seq2, ...].
+
+        Args:
+            histories (Iterable[HistoryNode | list]): histories of inputs, in inputs order
+
+        Returns:
+            HistoryNode: merge node
+        """
+        return cls._intern(None, cls.EMPTY, tuple(cls.from_sequence(h) for h in histories))
+
+    def add_step(self, step: str) -> "HistoryNode":
+        """Returns history with one more machine, O(1), node itself is not changed.
+
+        Args:
+            step (str): machine name, better to use Machines constants
+
+        Returns:
+            HistoryNode: new (or already existing) step node
+        """
+        return self._intern(step, self, ())
+
+    def extend(self, entries) -> "HistoryNode":
+        """Returns history with appended entries, node itself is not changed.
+
+        Args:
+            entries (Iterable[str | list | HistoryNode]): steps, nested lists or nodes are merged histories
+
+        Returns:
+            HistoryNode: resulting node
+        """
+        node = self
+        run: list[HistoryNode] = []
+        for entry in entries:
+            if isinstance(entry, (list, tuple, HistoryNode)):
+                run.append(self.from_sequence(entry))
+                continue
+            if run:
+                node = self._intern(None, node, tuple(run))
+                run = []
+            node = self._intern(entry, node, ())
+        if run:
+            node = self._intern(None, node, tuple(run))
+        return node
+
+    def entries(self) -> list:
+        """Top-level entries in crafting order, steps as str and merged histories as nodes.
+
+        Returns:
+            list: entries, same as old sequence list, but nested lists are nodes
+        """
+        reversed_entries: list = []
+        node = self
+        while node.parent is not None:
+            if node.step is not None:
+                reversed_entries.append(node.step)
+            else:
+                reversed_entries.extend(reversed(node.merged))
+            node = node.parent
+        reversed_entries.reverse()
+        return reversed_entries
+
+    def to_list(self) -> list:
+        """Materializes history as old style nested lists.
+
+        Returns:
+            list: sequence list, merged histories are nested lists
+        """
+        return [
+            entry.to_list() if entry.__class__ is HistoryNode else entry
+            for entry in self.entries()
+        ]
+
+    @property
+    def last(self):
+        """Last entry of history, O(1).
+
+        Raises:
+            IndexError: if history is empty
+
+        Returns:
+            str | HistoryNode: last machine or last merged history
+        """
+        if self.step is not None:
+            return self.step
+        if self.merged:
+            return self.merged[-1]
+        raise IndexError("history is empty")
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __bool__(self) -> bool:
+        return self.length != 0
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def __getitem__(self, index):
+        if index == -1:
+            return self.last
+        return self.entries()[index]
+
+    def __add__(self, other) -> "HistoryNode":
+        if isinstance(other, (list, tuple, HistoryNode)):
+            return self.extend(other)
+        return NotImplemented
+
+    def __radd__(self, other) -> "HistoryNode":
+        if isinstance(other, (list, tuple)):
+            return self.from_sequence(other).extend(self.entries())
+        return NotImplemented
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is HistoryNode:
+            return self is other
+        if isinstance(other, (list, tuple)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return repr(self.to_list())
+
+    def __reduce__(self):
+        if self.parent is None:
+            return "EMPTY_HISTORY"
+        return (_restore_node, (self.step, self.parent, self.merged))
+
+    def __copy__(self) -> "HistoryNode":
+        return self
+
+    def __deepcopy__(self, memo) -> "HistoryNode":
+        return self
+
+
+HistoryNode.EMPTY = HistoryNode(None, None, ())
+EMPTY_HISTORY = HistoryNode.EMPTY
+"""Empty crafting history, default sequence of items"""
@@ -1,46 +1,70 @@
 """
 Core item representation for a crafting system.\n
 Defines the Item dataclass that serves as the fundamental building block\n
-for all craftable entities in the system.\n
+for all craftable entities in the system, and CompactItem, slotted variant\n
+of Item which stores tags as TagFlags bitmask.\n
 Each Item tracks:\n
 - Core properties (type, value, material cost)\n
-- Processing history (tags, sequence)
+- Processing history (tags, sequence), sequence is stored as shared HistoryNode
 """
 
 from dataclasses import dataclass, field
+from functools import lru_cache
 
 from umt_craftsim import constants
+from umt_craftsim.dataclasses.history import EMPTY_HISTORY, HistoryNode
 from umt_craftsim.service.exceptions import ItemValidationError
 
+_FLAG_TAG_PAIRS: tuple[tuple[int, str], ...] = tuple(
+    (int(constants.TAG_FLAGS[tag]), tag) for tag in constants.Tags
+)
+# plain int bits of tags, | of TagFlags members is slow enum operation
+_TAG_BITS: dict[str, int] = {tag: flag for flag, tag in _FLAG_TAG_PAIRS}
 
-@dataclass
-class Item:
-    """Represents a item with processing history, tags, etc.\n
-    Attributes:
-        item_type (str): type of item, better to use ItemTypes constants. Defaults to "unknown"
-        value (int): Monetary worth. Defaults to 0.
-        materials (float): Resource units consumed for creation, both, ores and gems. Defaults to 1.0.
-        tags (list[str]): Applied tags (Cleaned, Alloyed etc), better to use Tags constants. Defaults to empty list.
-        sequence (list[str] | list): Crafting steps (machines), better to use Machines constants. Defaults to empty list.
-        value_per_materials (float): value devided by materials, automatically generated after every update of value or materials.
-        dustwork_type (str): type of dust of item after crushing item or when item_type is dust already. Defaults to "unknown".
+
+def tags_to_mask(tags: "list[str] | int") -> int:
+    """Converts list of tags into TagFlags bitmask.
+
+    Args:
+        tags (list[str] | int): tags, better to use Tags constants, or ready bitmask
+
+    Raises:
+        ItemValidationError: if tag is not one of Tags and can't be stored in bitmask
+
+    Returns:
+        int: bitmask with bit of every tag set
     """
+    if isinstance(tags, int):
+        return tags
+    mask = 0
+    for tag in tags:
+        flag = _TAG_BITS.get(tag)
+        if flag is None:
+            raise ItemValidationError(f"Tag {tag} is not one of Tags, can't be stored in bitmask")
+        mask |= flag
+    return mask
 
-    item_type: str = constants.ItemTypes.UNKNOWN.value
-    value: int = 0
-    materials: float = 1.0
-    dustwork_type: str = constants.DustTypes.UNKNOWN.value
-    tags: list[str] = field(default_factory=list)
-    sequence: list[str] | list = field(default_factory=list)
 
-    def __post_init__(self):
-        """Validates item properties after initialization.
+@lru_cache(maxsize=4096)
+def mask_to_tags(mask: int) -> tuple[str, ...]:
+    """Converts TagFlags bitmask back into tags, in Tags declaration order.
 
-        Raises:
-            ItemValidationError: if materials value is negative
-        """
-        if self.materials < 0:
-            raise ItemValidationError("Materials cannot be negative", self)
+    Args:
+        mask (int): TagFlags bitmask
+
+    Returns:
+        tuple[str, ...]: Tags members which bits are set in mask
+    """
+    return tuple(tag for flag, tag in _FLAG_TAG_PAIRS if mask & flag)
+
+
+class ItemBase:
+    """
+    Shared behaviour of Item and CompactItem: value efficiency, tag checks and text represenations.\n
+    Subclasses must provide item_type, value, materials, tags and sequence attributes.
+    """
+
+    __slots__ = ()
 
     @property
     def value_per_materials(self) -> float:
@@ -49,7 +73,18 @@ class Item:
         Returns:
             float: value/materials ratio, or 0 if materials = 0
         """
-        return self.value / self.materials if self.materials != 0 else 0
+        return self.value / self.materials if self.materials != 0 else 0  # type: ignore
+
+    def has_tag(self, tag: str) -> bool:
+        """Checks if item has tag.
+
+        Args:
+            tag (str): Tag constant (from Tags)
+
+        Returns:
+            bool: True if tag applied to item
+        """
+        return tag in self.tags  # type: ignore
 
     def short_sequence(self) -> str:
         """Compress crafting sequence into compact str representation.\n
@@ -58,16 +93,17 @@ class Item:
         Returns:
             str: Compact sequence represenation or "no sequence"
         """
+        sequence = self.sequence  # type: ignore
         short_seq = "no sequence"
-        if self.sequence:
-            short_seq = ""
-            for i in range(len(self.sequence)):
-                part = ""
-                if isinstance(self.sequence[i], list):
-                    part = f"{self.sequence[i][-1]} + "
+        if sequence:
+            parts = []
+            for entry in sequence:
+                if isinstance(entry, (list, HistoryNode)):
+                    parts.append(f"{entry[-1]} + ")
                 else:
-                    part = f"{self.sequence[i]} <-|"
-                short_seq = part + short_seq
+                    parts.append(f"{entry} <-|")
+            parts.reverse()
+            short_seq = "".join(parts)
             while not short_seq[-1].isalnum():
                 short_seq = short_seq[:-1]
         return short_seq
@@ -81,10 +117,12 @@ class Item:
             str: Formatted single-line summary
         """
         shorter_seq = "no sequence"
-        if self.sequence:
-            shorter_seq = self.sequence[-1]
+        if self.sequence:  # type: ignore
+            shorter_seq = self.sequence[-1]  # type: ignore
+            if isinstance(shorter_seq, HistoryNode):
+                shorter_seq = shorter_seq.to_list()
         return (
-            f"{self.item_type:16} | Val: {self.value:8} | Mats: {self.materials:4.1f} | "
+            f"{self.item_type:16} | Val: {self.value:8} | Mats: {self.materials:4.1f} | "  # type: ignore
             f"VPM: {self.value_per_materials:11.2f} | {shorter_seq}"
         )
 
@@ -97,6 +135,167 @@ class Item:
             str: Formatted single-line summary
         """
         return (
-            f"{self.item_type:16} | Val: {self.value:8} | Mats: {self.materials:4.1f} | "
+            f"{self.item_type:16} | Val: {self.value:8} | Mats: {self.materials:4.1f} | "  # type: ignore
             f"VPM: {self.value_per_materials:11.2f} | {self.short_sequence()}"
         )
+
+
+@dataclass
+class Item(ItemBase):
+    """Represents a item with processing history, tags, etc.\n
+    Attributes:
+        item_type (str): type of item, better to use ItemTypes constants. Defaults to "unknown"
+        value (int): Monetary worth. Defaults to 0.
+        materials (float): Resource units consumed for creation, both, ores and gems. Defaults to 1.0.
+        tags (list[str]): Applied tags (Cleaned, Alloyed etc), better to use Tags constants. Defaults to empty list.
+        sequence (HistoryNode): Crafting steps (machines), better to use Machines constants, can be given as list\n
+            of steps with nested lists for merged inputs, stored as HistoryNode view of shared history. Defaults to empty history.
+        value_per_materials (float): value devided by materials, automatically generated after every update of value or materials.
+        dustwork_type (str): type of dust of item after crushing item or when item_type is dust already. Defaults to "unknown".
+    """
+
+    item_type: str = constants.ItemTypes.UNKNOWN.value
+    value: int = 0
+    materials: float = 1.0
+    dustwork_type: str = constants.DustTypes.UNKNOWN.value
+    tags: list[str] = field(default_factory=list)
+    sequence: HistoryNode | list = EMPTY_HISTORY
+
+    def __post_init__(self):
+        """Validates item properties after initialization, converts sequence list into HistoryNode.
+
+        Raises:
+            ItemValidationError: if materials value is negative
+        """
+        if self.sequence.__class__ is not HistoryNode:
+            self.sequence = HistoryNode.from_sequence(self.sequence)
+        if self.materials < 0:
+            raise ItemValidationError("Materials cannot be negative", self)
+
+    @property
+    def tag_mask(self) -> int:
+        """TagFlags bitmask of item tags.
+
+        Raises:
+            ItemValidationError: if item has tag which is not one of Tags
+
+        Returns:
+            int: bitmask with bit of every tag set
+        """
+        return tags_to_mask(self.tags)
+
+
+class CompactItem(ItemBase):
+    """Memory-compact variant of Item, uses __slots__ and stores tags as TagFlags bitmask.\n
+    Behaves as Item, transformations output CompactItem when they got CompactItem.\n
+    Only tags from Tags can be stored, list of tags is still available as derived property.\n
+    Attributes:
+        item_type (str): type of item, better to use ItemTypes constants. Defaults to "unknown"
+        value (int): Monetary worth. Defaults to 0.
+        materials (float): Resource units consumed for creation, both, ores and gems. Defaults to 1.0.
+        tag_mask (int): TagFlags bitmask of applied tags. Defaults to 0.
+        tags (list[str]): Applied tags in Tags declaration order, derived from tag_mask, read only.
+        sequence (HistoryNode): Crafting steps (machines), same as Item.sequence. Defaults to empty history.
+        dustwork_type (str): type of dust of item after crushing item or when item_type is dust already. Defaults to "unknown".
+    """
+
+    __slots__ = ("item_type", "value", "materials", "dustwork_type", "tag_mask", "sequence")
+
+    def __init__(
+        self,
+        item_type: str = constants.ItemTypes.UNKNOWN.value,
+        value: int = 0,
+        materials: float = 1.0,
+        dustwork_type: str = constants.DustTypes.UNKNOWN.value,
+        tags: list[str] | int = 0,
+        sequence: HistoryNode | list = EMPTY_HISTORY,
+    ):
+        """CompactItem init, same arguments as Item, except tags can be TagFlags bitmask.
+
+        Raises:
+            ItemValidationError: if materials value is negative
+            ItemValidationError: if tag is not one of Tags
+        """
+        if materials < 0:
+            raise ItemValidationError("Materials cannot be negative")
+        self.item_type = item_type
+        self.value = value
+        self.materials = materials
+        self.dustwork_type = dustwork_type
+        self.tag_mask = tags_to_mask(tags)
+        self.sequence = HistoryNode.from_sequence(sequence)
+
+    @property
+    def tags(self) -> list[str]:
+        """Applied tags, derived from tag_mask, in Tags declaration order.
+
+        Returns:
+            list[str]: new list of Tags members
+        """
+        return list(mask_to_tags(self.tag_mask))
+
+    def has_tag(self, tag: str) -> bool:
+        """Checks if item has tag, single bitwise operation.
+
+        Args:
+            tag (str): Tag constant (from Tags)
+
+        Returns:
+            bool: True if tag applied to item
+        """
+        return bool(self.tag_mask & _TAG_BITS.get(tag, 0))
+
+    @classmethod
+    def from_item(cls, item: Item) -> "CompactItem":
+        """Creates CompactItem with same properties as given Item.
+
+        Args:
+            item (Item): item to convert
+
+        Returns:
+            CompactItem: compact copy of item
+        """
+        return cls(
+            item_type=item.item_type,
+            value=item.value,
+            materials=item.materials,
+            dustwork_type=item.dustwork_type,
+            tags=item.tags,
+            sequence=item.sequence,
+        )
+
+    def to_item(self) -> Item:
+        """Converts CompactItem back into regular Item.
+
+        Returns:
+            Item: item with same properties
+        """
+        return Item(
+            item_type=self.item_type,
+            value=self.value,
+            materials=self.materials,
+            dustwork_type=self.dustwork_type,
+            tags=self.tags,
+            sequence=self.sequence,
+        )
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self.item_type == other.item_type
+            and self.value == other.value
+            and self.materials == other.materials
+            and self.dustwork_type == other.dustwork_type
+            and self.tag_mask == other.tag_mask
+            and self.sequence == other.sequence
+        )
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return (
+            f"CompactItem(item_type={self.item_type!r}, value={self.value!r}, "
+            f"materials={self.materials!r}, dustwork_type={self.dustwork_type!r}, "
+            f"tags={self.tags!r}, sequence={self.sequence!r})"
+        )
@@ -0,0 +1,162 @@
+"""
+Parallel execution of recipe graphs and catalog-wide jobs.\n
+ParallelExecutor runs independent branches of RecipeGraph (nodes whose inputs are ready)\n
+on thread pool, and maps function over independent catalog entries (ores, gems, recipes)\n
+in chunks on thread or process pool. Results are always in deterministic order and\n
+equal to serial execution, mode="serial" runs everything in calling thread.\n
+Example:
+    ```
+    executor = ParallelExecutor(mode="process", workers=8)
+    results = executor.map(best_recipe_for_ore, list(Ores))
+    power_core, = ParallelExecutor(mode="thread").execute(graph, power_core_node)
+    ```
+"""
+
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Callable, Iterable, Sequence, TypeVar
+
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.recipe_graph import RecipeGraph, RecipeNode
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MODES = ("serial", "thread", "process")
+
+
+def _run_chunk(function: Callable[[T], R], chunk: Sequence[T]) -> list[R]:
+    """Worker job of ParallelExecutor.map(), module level so process pool can pickle it."""
+    return [function(item) for item in chunk]
+
+
+class ParallelExecutor:
+    """
+    Scheduler of independent crafting work on concurrent.futures pools.\n
+    Attributes:
+        mode (str): "serial", "thread" or "process"
+        workers (int): number of pool workers
+        chunksize (int | None): catalog entries per job of map(), None picks 4 jobs per worker
+    """
+
+    def __init__(
+        self, mode: str = "thread", workers: int | None = None, chunksize: int | None = None
+    ):
+        """ParallelExecutor init.
+
+        Args:
+            mode (str): "serial", "thread" or "process". Defaults to "thread".
+            workers (int | None): number of pool workers, None uses os.cpu_count(). Defaults to None.
+            chunksize (int | None): catalog entries per job of map(), None picks 4 jobs per worker. Defaults to None.
+
+        Raises:
+            ValueError: if mode is unknown or workers/chunksize is less than 1
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode}")
+        if workers is not None and workers < 1:
+            raise ValueError(f"workers must be positive, got {workers}")
+        if chunksize is not None and chunksize < 1:
+            raise ValueError(f"chunksize must be positive, got {chunksize}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+
+    def _pool(self, processes: bool) -> Executor:
+        if processes:
+            return ProcessPoolExecutor(self.workers)
+        return ThreadPoolExecutor(self.workers)
+
+    def map(self, function: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """Calls function for every catalog entry, entries are split into chunks, one job per chunk.
+
+        With mode="process" function and entries must be picklable (function defined on module level).
+
+        Args:
+            function (Callable[[T], R]): job of one entry, must not depend on other entries
+            items (Iterable[T]): catalog entries
+
+        Raises:
+            Exception: first error in entries order, same as serial execution raises
+
+        Returns:
+            list[R]: results in entries order
+        """
+        items = list(items)
+        if self.mode == "serial" or self.workers == 1 or len(items) < 2:
+            return _run_chunk(function, items)
+        chunksize = self.chunksize or max(1, -(-len(items) // (self.workers * 4)))
+        chunks = [items[start : start + chunksize] for start in range(0, len(items), chunksize)]
+        with self._pool(self.mode == "process") as pool:
+            futures = [pool.submit(_run_chunk, function, chunk) for chunk in chunks]
+            results: list[R] = []
+            for future in futures:
+                results.extend(future.result())
+        return results
+
+    def execute(
+        self, graph: RecipeGraph, *outputs: RecipeNode, trusted: bool = False
+    ) -> list[Item | CompactItem]:
+        """Computes outputs of graph, node is submitted as soon as all its inputs are computed.
+
+        Branches of one graph share intermediates, so they run on threads in "thread" and
+        "process" modes, use map() to spread whole graphs over processes.
+
+        Args:
+            graph (RecipeGraph): recipe graph
+            *outputs (RecipeNode): nodes to compute, no nodes computes all sinks
+            trusted (bool): check graph statically first and skip per-item validation. Defaults to False.
+
+        Raises:
+            PlanValidationError: if trusted and graph.check() rejects graph
+            Exception: same error as serial RecipeGraph.execute() raises
+
+        Returns:
+            list[Item | CompactItem]: items of outputs, in outputs order
+        """
+        if self.mode == "serial" or self.workers == 1:
+            return graph.execute(*outputs, trusted=trusted)
+        outputs = outputs or tuple(graph.sinks())
+        if trusted:
+            graph.check(*outputs)
+        nodes = graph.required(outputs)
+        values: dict[int, Item | CompactItem] = {}
+        waiting: dict[int, int] = {}
+        dependents: dict[int, list[RecipeNode]] = {}
+        ready: list[RecipeNode] = []
+        for node in nodes:
+            inputs = {child.index for child in node.inputs}
+            waiting[node.index] = len(inputs)
+            for index in inputs:
+                dependents.setdefault(index, []).append(node)
+            if not inputs:
+                ready.append(node)
+
+        failed = False
+        with self._pool(False) as pool:
+            running = {}
+            while ready or running:
+                for node in ready:
+                    running[pool.submit(graph.run_node, node, values, trusted)] = node
+                ready = []
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    if future.exception() is not None:
+                        failed = True
+                        continue
+                    values[node.index] = future.result()
+                    for dependent in dependents.get(node.index, ()):
+                        waiting[dependent.index] -= 1
+                        if waiting[dependent.index] == 0 and not failed:
+                            ready.append(dependent)
+        if failed:
+            # branches finish in any order, serial run raises same error as RecipeGraph.execute()
+            return graph.execute(*outputs, trusted=trusted)
+        return [values[node.index] for node in outputs]
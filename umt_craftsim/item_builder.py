@@ -1,9 +1,16 @@
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
 from umt_craftsim.dataclasses.items import Item
+from umt_craftsim.service.exceptions import ItemProcessingError
+from umt_craftsim.transformations.engine import compile_chain
+from umt_craftsim.transformations.plan_checker import ItemState, check_chain, state_of
+from umt_craftsim.transformations.transformation_registry import compiled_machine
 from umt_craftsim.transformations.transformations_single import Transformation_Single
 
 
 class ItemBuilder:
-    def __init__(self, item: Item):
+    def __init__(self, item: Item | None = None):
         self.item = item
         self.transformations = []
 
@@ -12,7 +19,123 @@ class ItemBuilder:
         return self
 
     def execute(self) -> Item:
+        if self.item is None:
+            raise ItemProcessingError("ItemBuilder has no item, use map() to run plan on items")
         current_item = self.item
         for transformation in self.transformations:
             current_item = transformation.transform(current_item)
         return current_item
+
+    def check(self, states: Iterable[ItemState | Item] | None = None) -> frozenset[ItemState]:
+        """Statically checks queued transformations, without processing any item.
+
+        Args:
+            states (Iterable[ItemState | Item] | None): possible inputs, None checks builder item. Defaults to None.
+
+        Raises:
+            PlanValidationError: if some transformation would reject possible input
+
+        Returns:
+            frozenset[ItemState]: possible (item_type, tags) states of output
+        """
+        if states is None:
+            if self.item is None:
+                raise ItemProcessingError("ItemBuilder has no item, pass states to check")
+            states = [state_of(self.item)]
+        return check_chain(
+            [transformation.machine for transformation in self.transformations], states
+        )
+
+    def compile(
+        self, trusted: bool = False, states: Iterable[ItemState | Item] | None = None
+    ) -> Callable[[Item], Item]:
+        """Folds queued transformations into one function, which can be run on any number of items.\n
+        Consecutive declarative machines are fused: added tags, history suffix and output type are\n
+        precomputed, value is calculated with same rounding as step by step execution,\n
+        and only output item is created. Hand-written transformations are called as they are.\n
+        With trusted=True plan is checked by check() first and fused machines skip validation,\n
+        so every item passed to compiled function must be in one of checked states.
+
+        Example:
+            ```
+            chain = ItemBuilder(tin).add_transformation_single(OreCleanerTransformation()) \\
+                .add_transformation_single(OreSmelterTransformation()).compile()
+            bars = [chain(ore) for ore in ores]
+            ```
+
+        Args:
+            trusted (bool): check plan once and skip per-item validation. Defaults to False.
+            states (Iterable[ItemState | Item] | None): possible inputs for trusted check,
+                None checks builder item. Defaults to None.
+
+        Raises:
+            PlanValidationError: if trusted and plan is rejected by check()
+
+        Returns:
+            Callable[[Item], Item]: function returning same item as execute() for given input
+        """
+        if trusted:
+            self.check(states)
+        return compile_chain(
+            [
+                compiled_machine(transformation) or transformation.transform
+                for transformation in self.transformations
+            ],
+            trusted,
+        )
+
+    def map(
+        self,
+        items: Iterable[Item],
+        trusted: bool = False,
+        states: Iterable[ItemState | Item] | None = None,
+    ) -> Iterator[Item]:
+        """Lazily runs queued transformations on every item of iterable, see compile().\n
+        Plan is compiled when iteration starts, outputs are yielded one by one,\n
+        so generator of any length is processed in constant memory.
+
+        Example:
+            ```
+            plan = ItemBuilder().add_transformation_single(OreSmelterTransformation())
+            best = max(plan.map(spawned_ores()), key=lambda bar: bar.value)
+            ```
+
+        Args:
+            items (Iterable[Item]): inputs, can be generator
+            trusted (bool): check plan once and skip per-item validation, see compile(). Defaults to False.
+            states (Iterable[ItemState | Item] | None): possible inputs for trusted check. Defaults to None.
+
+        Yields:
+            Item: output for every input, in inputs order
+        """
+        chain = self.compile(trusted, states)
+        for item in items:
+            yield chain(item)
+
+    def map_chunks(
+        self,
+        items: Iterable[Item],
+        chunksize: int = 1024,
+        trusted: bool = False,
+        states: Iterable[ItemState | Item] | None = None,
+    ) -> Iterator[list[Item]]:
+        """Same as map(), but yields lists of up to chunksize outputs, at most one chunk is held in memory.
+
+        Args:
+            items (Iterable[Item]): inputs, can be generator
+            chunksize (int): outputs per chunk. Defaults to 1024.
+            trusted (bool): check plan once and skip per-item validation, see compile(). Defaults to False.
+            states (Iterable[ItemState | Item] | None): possible inputs for trusted check. Defaults to None.
+
+        Raises:
+            ValueError: if chunksize is less than 1
+
+        Yields:
+            list[Item]: outputs of next chunksize inputs
+        """
+        if chunksize < 1:
+            raise ValueError(f"chunksize must be positive, got {chunksize}")
+        chain = self.compile(trusted, states)
+        iterator = iter(items)
+        while chunk := [chain(item) for item in islice(iterator, chunksize)]:
+            yield chunk
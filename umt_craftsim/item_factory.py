@@ -2,12 +2,106 @@
 Factory for creating game items with predefined names and recipes
 """
 
+from functools import lru_cache
+from typing import Callable, Iterable, Sequence
+
 from umt_craftsim.constants import Gems, ItemTypes, Machines, Ores
-from umt_craftsim.dataclasses.items import Item
+from umt_craftsim.dataclasses.items import CompactItem, Item
 from umt_craftsim.service.exceptions import ItemProcessingError
 from umt_craftsim.service.mixins import TransformationHelperMixin
-from umt_craftsim.transformations import transformations_multiple as tmultiple
-from umt_craftsim.transformations import transformations_single as tsingle
+from umt_craftsim.transformations.engine import compile_chain
+from umt_craftsim.transformations.machine_specs import MACHINE_SPECS
+from umt_craftsim.transformations.memoization import TransformationCache
+from umt_craftsim.transformations.transformation_registry import (
+    TransformationRegistry,
+    compiled_machine,
+)
+
+# Fixed processing order of process_mats_*: (machine, item type it is applied to or None for any,
+# number of inputs, all of them are same item)
+_SIMPLE_ORDER: tuple[tuple[str, str | None, int], ...] = (
+    (Machines.ORE_UPGRADER, ItemTypes.ORE, 1),
+    (Machines.ORE_CLEANER, ItemTypes.ORE, 1),
+    (Machines.POLISHER, None, 1),
+    (Machines.PHILOSOPHERS_STONE, ItemTypes.ORE, 1),
+    (Machines.ORE_SMELTER, ItemTypes.ORE, 1),
+    (Machines.BLAST_FURNACE, ItemTypes.ORE, 1),
+    (Machines.BAR_TO_GEM_TRANSMUTER, ItemTypes.BAR, 1),
+    (Machines.PRISMATIC_GEM_CRUCIBLE, ItemTypes.GEM, 2),
+    (Machines.GEM_CUTTER, ItemTypes.GEM, 1),
+    (Machines.GEM_TO_BAR_TRANSMUTER, ItemTypes.GEM, 1),
+    (Machines.ALLOY_FURNACE, ItemTypes.BAR, 2),
+    (Machines.TEMPERING_FORGE, ItemTypes.BAR, 1),
+)
+_COMPLEX_STAGE1 = _SIMPLE_ORDER[:7]
+_COMPLEX_STAGE3 = _SIMPLE_ORDER[8:10]
+# item types process_mats_* items can have between steps
+_PLAN_TYPES = (ItemTypes.ORE, ItemTypes.BAR, ItemTypes.GEM)
+
+
+def _runner(machine: str, cache: TransformationCache | None) -> Callable[..., Item]:
+    """Function running machine, memoized if registry memoization is enabled."""
+    instance = TransformationRegistry.get_instance(machine)
+    compiled = compiled_machine(instance)
+    run = compiled.run if compiled is not None else instance.transform
+    if cache is not None:
+        return cache.wrap(machine, run)
+    return run
+
+
+def _chain(
+    machines: frozenset, item_type: str, order, cache: TransformationCache | None
+) -> Callable[[Item], Item]:
+    """Compiles machines of order applicable to item type into one function.\n
+    Item type is tracked statically, as every machine has fixed output type,\n
+    so chain contains only machines which process item and can be fused by compile_chain.
+    """
+    steps = []
+    for machine, applies_to, arity in order:
+        if machine not in machines or applies_to not in (None, item_type):
+            continue
+        compiled = compiled_machine(TransformationRegistry.get_instance(machine))
+        if arity == 1 and compiled is not None and cache is None:
+            steps.append(compiled)
+        elif arity == 1:
+            steps.append(_runner(machine, cache))
+        else:
+            run = _runner(machine, cache)
+            steps.append(lambda item, run=run, arity=arity: run(*(item,) * arity))
+        spec = MACHINE_SPECS.get(machine)
+        if spec is not None and spec.output_type is not None:
+            item_type = spec.output_type
+    return compile_chain(steps)
+
+
+class _MaterialsPlan:
+    """Compiled process_mats_* for one machine set, chains are keyed by input item type."""
+
+    def __init__(self, machines: frozenset, cache: TransformationCache | None):
+        self.crucible = Machines.PRISMATIC_GEM_CRUCIBLE in machines
+        self.alloy = Machines.ALLOY_FURNACE in machines
+        self.crucible_run = _runner(Machines.PRISMATIC_GEM_CRUCIBLE, cache)
+        self.alloy_run = _runner(Machines.ALLOY_FURNACE, cache)
+        self.simple, self.stage1, self.stage3, self.tempering = (
+            {item_type: _chain(machines, item_type, order, cache) for item_type in _PLAN_TYPES}
+            for order in (
+                _SIMPLE_ORDER,
+                _COMPLEX_STAGE1,
+                _COMPLEX_STAGE3,
+                _SIMPLE_ORDER[-1:],
+            )
+        )
+
+
+@lru_cache(maxsize=256)
+def _materials_plan(machines: frozenset, cache: TransformationCache | None) -> _MaterialsPlan:
+    """Cached plan of machine set, cache is TransformationRegistry.cache at compile time."""
+    return _MaterialsPlan(machines, cache)
+
+
+def _plan(machines: Iterable[Machines]) -> _MaterialsPlan:
+    """Compiled plan of machine set, same set (in any order) always gives same plan object."""
+    return _materials_plan(frozenset(machines), TransformationRegistry.cache)
 
 
 class ItemFactory:
@@ -27,29 +121,35 @@ class ItemFactory:
         self.gem: Item | None = gem if gem else None
 
     @staticmethod
-    def create_ore(ore_name: str | Ores) -> Item:
+    def create_ore(ore_name: str | Ores, compact: bool = False) -> Item:
         """Creates Item object with type ore and value based on name
 
         Args:
             ore_name (str): constant from constants.OreNames class
+            compact (bool): create CompactItem instead of Item. Defaults to False.
 
         Returns:
             Item: Item obj, Item(item_type=ItemTypes.ORE, value=value from OreNames by name)
         """
         value = Ores[ore_name.upper()].value if isinstance(ore_name, str) else ore_name.value
+        if compact:
+            return CompactItem(item_type=ItemTypes.ORE, value=value)  # type: ignore
         return Item(item_type=ItemTypes.ORE, value=value)
 
     @staticmethod
-    def create_gem(gem_name: str | Gems) -> Item:
+    def create_gem(gem_name: str | Gems, compact: bool = False) -> Item:
         """Creates Item object with type gem and value based on name
 
         Args:
             gem_name (str): constant from constants.GemNames class
+            compact (bool): create CompactItem instead of Item. Defaults to False.
 
         Returns:
             Item: Item obj, Item(item_type=ItemTypes.GEM, value=value from GemNames by name)
         """
         value = Gems[gem_name.upper()].value if isinstance(gem_name, str) else gem_name.value
+        if compact:
+            return CompactItem(item_type=ItemTypes.GEM, value=value)  # type: ignore
         return Item(item_type=ItemTypes.GEM, value=value)
 
     @staticmethod
@@ -70,34 +170,29 @@ class ItemFactory:
         TransformationHelperMixin.validate_multiple_items_types(
             [ore_or_gem], [ItemTypes.ORE, ItemTypes.GEM]
         )
+        return _plan(machines).simple[ore_or_gem.item_type](ore_or_gem)
+
+    @staticmethod
+    def process_mats_simple_batch(
+        ores_or_gems: Iterable[Item], machines: Iterable[Machines]
+    ) -> list[Item]:
+        """Same as process_mats_simple() for every item, machines are compiled once for whole batch.
 
-        if Machines.ORE_UPGRADER in machines and ore_or_gem.item_type == ItemTypes.ORE:
-            ore_or_gem = tsingle.OreUpgraderTransformation().transform(ore_or_gem)
-        if Machines.ORE_CLEANER in machines and ore_or_gem.item_type == ItemTypes.ORE:
-            ore_or_gem = tsingle.OreCleanerTransformation().transform(ore_or_gem)
-        if Machines.POLISHER in machines:
-            ore_or_gem = tsingle.PolisherTransformation().transform(ore_or_gem)
-        if Machines.PHILOSOPHERS_STONE in machines and ore_or_gem.item_type == ItemTypes.ORE:
-            ore_or_gem = tsingle.PhilosophersStoneTransformation().transform(ore_or_gem)
-        if Machines.ORE_SMELTER in machines and ore_or_gem.item_type == ItemTypes.ORE:
-            ore_or_gem = tsingle.OreSmelterTransformation().transform(ore_or_gem)
-        elif Machines.BLAST_FURNACE in machines and ore_or_gem.item_type == ItemTypes.ORE:
-            ore_or_gem = tsingle.BlastFurnaceTransformation().transform(ore_or_gem)
-        if Machines.BAR_TO_GEM_TRANSMUTER in machines and ore_or_gem.item_type == ItemTypes.BAR:
-            ore_or_gem = tsingle.BTGTransformation().transform(ore_or_gem)
-        if Machines.PRISMATIC_GEM_CRUCIBLE in machines and ore_or_gem.item_type == ItemTypes.GEM:
-            ore_or_gem = tmultiple.PrismaticGemCrucibleTransformation().transform(
-                ore_or_gem, ore_or_gem
+        Args:
+            ores_or_gems (Iterable[Item]): ores or gems before processing
+            machines (Iterable[Machines]): allowed machines for item processing
+
+        Returns:
+            list[Item]: items after processing sequence, in input order
+        """
+        chains = _plan(machines).simple
+        results = []
+        for ore_or_gem in ores_or_gems:
+            TransformationHelperMixin.validate_multiple_items_types(
+                [ore_or_gem], [ItemTypes.ORE, ItemTypes.GEM]
             )
-        if Machines.GEM_CUTTER in machines and ore_or_gem.item_type == ItemTypes.GEM:
-            ore_or_gem = tsingle.GemCutterTransformation().transform(ore_or_gem)
-        if Machines.GEM_TO_BAR_TRANSMUTER in machines and ore_or_gem.item_type == ItemTypes.GEM:
-            ore_or_gem = tsingle.GTBTransformation().transform(ore_or_gem)
-        if Machines.ALLOY_FURNACE in machines and ore_or_gem.item_type == ItemTypes.BAR:
-            ore_or_gem = tmultiple.AlloyFurnaceTransformation().transform(ore_or_gem, ore_or_gem)
-        if Machines.TEMPERING_FORGE in machines and ore_or_gem.item_type == ItemTypes.BAR:
-            ore_or_gem = tsingle.TemperingForgeTransformation().transform(ore_or_gem)
-        return ore_or_gem
+            results.append(chains[ore_or_gem.item_type](ore_or_gem))
+        return results
 
     @staticmethod
     def process_mats_complex(
@@ -132,76 +227,69 @@ class ItemFactory:
             Item: item after processing sequence
         """
         items: list[Item] = [item for item in [item1, item2, item3, item4] if item]
+        return ItemFactory._process_complex(_plan(machines), items)
+
+    @staticmethod
+    def process_mats_complex_batch(
+        machines: Iterable[Machines], item_groups: Iterable[Sequence[Item]]
+    ) -> list[Item]:
+        """Same as process_mats_complex() for every group of 2-4 items, machines are compiled once for whole batch.
+
+        Args:
+            machines (Iterable[Machines]): allowed machines for item processing
+            item_groups (Iterable[Sequence[Item]]): groups of items, as item1..item4 of process_mats_complex()
+
+        Raises:
+            ItemProcessingError: same as process_mats_complex()
+
+        Returns:
+            list[Item]: processed item of every group, in input order
+        """
+        plan = _plan(machines)
+        return [
+            ItemFactory._process_complex(plan, [item for item in group if item])
+            for group in item_groups
+        ]
+
+    @staticmethod
+    def _process_complex(plan: _MaterialsPlan, items: list[Item]) -> Item:
+        """process_mats_complex() with compiled plan of machines."""
         TransformationHelperMixin.validate_multiple_items_types(
             items, [ItemTypes.ORE, ItemTypes.GEM]
         )
-        if len(items) == 4 and (
-            Machines.ALLOY_FURNACE not in machines
-            or Machines.PRISMATIC_GEM_CRUCIBLE not in machines
-        ):
+        if len(items) == 4 and (not plan.alloy or not plan.crucible):
             raise ItemProcessingError(
                 f"For 4 items must be both {Machines.ALLOY_FURNACE} and {Machines.PRISMATIC_GEM_CRUCIBLE}"
             )
-        if (
-            Machines.ALLOY_FURNACE not in machines
-            and Machines.PRISMATIC_GEM_CRUCIBLE not in machines
-        ):
+        if not plan.alloy and not plan.crucible:
             raise ItemProcessingError(
                 f"Must be present {Machines.ALLOY_FURNACE} or {Machines.PRISMATIC_GEM_CRUCIBLE}"
             )
-        step1: list[Item] = []
-        for item in items:
-            if Machines.ORE_UPGRADER in machines and item.item_type == ItemTypes.ORE:
-                item = tsingle.OreUpgraderTransformation().transform(item)
-            if Machines.ORE_CLEANER in machines and item.item_type == ItemTypes.ORE:
-                item = tsingle.OreCleanerTransformation().transform(item)
-            if Machines.POLISHER in machines:
-                item = tsingle.PolisherTransformation().transform(item)
-            if Machines.PHILOSOPHERS_STONE in machines and item.item_type == ItemTypes.ORE:
-                item = tsingle.PhilosophersStoneTransformation().transform(item)
-            if Machines.ORE_SMELTER in machines and item.item_type == ItemTypes.ORE:
-                item = tsingle.OreSmelterTransformation().transform(item)
-            elif Machines.BLAST_FURNACE in machines and item.item_type == ItemTypes.ORE:
-                item = tsingle.BlastFurnaceTransformation().transform(item)
-            if Machines.BAR_TO_GEM_TRANSMUTER in machines and item.item_type == ItemTypes.BAR:
-                item = tsingle.BTGTransformation().transform(item)
-            step1.append(item)
+        step1: list[Item] = [plan.stage1[item.item_type](item) for item in items]
         gems = [gem for gem in step1 if gem.item_type == ItemTypes.GEM]
         step2 = [item for item in step1 if item not in gems]
-        if Machines.PRISMATIC_GEM_CRUCIBLE in machines:
+        if plan.crucible:
             if len(gems) % 2 != 0:
                 raise ItemProcessingError(
                     f"Excepted 2 or 4 gems to be processed by {Machines.PRISMATIC_GEM_CRUCIBLE} got {len(gems)}"
                 )
-            combined = [tmultiple.PrismaticGemCrucibleTransformation().transform(gems[0], gems[1])]
+            combined = [plan.crucible_run(gems[0], gems[1])]
             if len(gems) == 4:
-                combined.append(
-                    tmultiple.PrismaticGemCrucibleTransformation().transform(gems[2], gems[3])
-                )
+                combined.append(plan.crucible_run(gems[2], gems[3]))
             gems = combined
         step2 = step2 + gems
-        step3: list[Item] = []
-        for item in step2:
-            if Machines.GEM_CUTTER in machines and item.item_type == ItemTypes.GEM:
-                item = tsingle.GemCutterTransformation().transform(item)
-            if Machines.GEM_TO_BAR_TRANSMUTER in machines and item.item_type == ItemTypes.GEM:
-                item = tsingle.GTBTransformation().transform(item)
-            step3.append(item)
+        step3: list[Item] = [plan.stage3[item.item_type](item) for item in step2]
         if len(step3) > 2:
             raise ItemProcessingError(
                 f"Something went wrong, excepted 1 or 2 items, got {len(step3)} items"
             )
         final_item: Item = step3[0]
         if len(step3) == 2:
-            if Machines.ALLOY_FURNACE in machines:
+            if plan.alloy:
                 if step3[0].item_type == ItemTypes.BAR == step3[1].item_type:
-                    final_item = tmultiple.AlloyFurnaceTransformation().transform(
-                        step3[0], step3[1]
-                    )
+                    final_item = plan.alloy_run(step3[0], step3[1])
                 else:
                     raise ItemProcessingError(
                         f"{Machines.ALLOY_FURNACE} involved, but last 2 items types is {step3[0].item_type} and {step3[1].item_type}"
                     )
-        if Machines.TEMPERING_FORGE in machines and final_item.item_type == ItemTypes.BAR:
-            final_item = tsingle.TemperingForgeTransformation().transform(final_item)
-        return final_item
+        return plan.tempering[final_item.item_type](final_item)
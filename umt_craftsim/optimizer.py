@@ -0,0 +1,317 @@
+"""
+Search of best machine chains for single ore or gem.\n
+ChainOptimizer tries every sequence of registry machines which can process item: single input\n
+machines, and two input machines (Alloy Furnace, Prismatic Gem Crucible) fed with item and its copy.\n
+Search is depth-first branch-and-bound: every (item_type, tags) state gets optimistic affine bound\n
+of reachable score, derived from multipliers and offsets of machines, and branches which can't beat\n
+N-th best chain found so far are cut. Equal (item_type, tags, value, materials) states reached by\n
+different orderings are expanded once.\n
+Example:
+    ```
+    optimizer = ChainOptimizer(objective="value_per_materials")
+    for result in optimizer.best_chains(ItemFactory.create_ore(Ores.GOLD), top=3):
+        print(result.score, " -> ".join(result.machines))
+    ```
+"""
+
+import heapq
+from math import inf
+from typing import Iterable, NamedTuple
+
+from umt_craftsim.constants import Machines
+from umt_craftsim.dataclasses.items import CompactItem, Item, mask_to_tags, tags_to_mask
+from umt_craftsim.service.exceptions import ItemError, PlanValidationError
+from umt_craftsim.transformations.machine_specs import MACHINE_SPECS
+from umt_craftsim.transformations.plan_checker import ItemState, check_machine
+from umt_craftsim.transformations.transformation_registry import (
+    TransformationRegistry,
+    compiled_machine,
+)
+from umt_craftsim.transformations.transformations_single import (
+    OreUpgraderTransformation,
+    Transformation_Single,
+)
+
+OBJECTIVES = ("value", "value_per_materials")
+# bounds are computed in floats, slack keeps them above exact score
+_SLACK = 1 + 1e-9
+
+# Hand-written machines: (multiplier, offset), output value <= value * multiplier + offset
+_HANDWRITTEN_BOUNDS: dict[str, tuple[float, float]] = {
+    Machines.ORE_UPGRADER: (
+        max(
+            upgraded / value
+            for value, upgraded in zip(
+                OreUpgraderTransformation.ores, OreUpgraderTransformation.ores[1:]
+            )
+        ),
+        0,
+    ),
+}
+
+
+class ChainResult(NamedTuple):
+    """One found chain.\n
+    Attributes:
+        score (float): value or value_per_materials of item, depends on objective
+        machines (tuple[str, ...]): machines in crafting order, two input machine is fed with item and its copy
+        item (Item | CompactItem): output of chain, same class as input
+    """
+
+    score: float
+    machines: tuple[str, ...]
+    item: Item | CompactItem
+
+
+class _Move:
+    """Machine applicable to abstract state, with its bound parameters for optimizer objective."""
+
+    __slots__ = ("machine", "run", "arity", "target", "factor", "offset", "divisor")
+
+    def __init__(self, machine, run, arity, target, factor, offset, divisor):
+        self.machine = machine
+        self.run = run
+        self.arity = arity
+        self.target = target
+        self.factor = factor
+        self.offset = offset
+        self.divisor = divisor
+
+
+class ChainOptimizer:
+    """
+    Exhaustive search of best chains, move tables and bounds are shared by all searched items.\n
+    Attributes:
+        objective (str): "value" or "value_per_materials"
+        machines (tuple[str, ...]): machines search can use
+        max_steps (int | None): maximum length of chain, None for unlimited
+    """
+
+    def __init__(
+        self,
+        objective: str = "value",
+        machines: Iterable[str] | None = None,
+        max_steps: int | None = None,
+    ):
+        """ChainOptimizer init.
+
+        Args:
+            objective (str): "value" or "value_per_materials". Defaults to "value".
+            machines (Iterable[str] | None): allowed machines, None allows every implemented machine
+                of TransformationRegistry.registry. Defaults to None.
+            max_steps (int | None): maximum length of chain, None for unlimited. Defaults to None.
+
+        Raises:
+            ValueError: if objective is unknown or max_steps is negative
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"objective must be one of {OBJECTIVES}, got {objective}")
+        if max_steps is not None and max_steps < 0:
+            raise ValueError(f"max_steps must not be negative, got {max_steps}")
+        self.objective = objective
+        self.max_steps = max_steps
+        self.machines = tuple(TransformationRegistry.registry if machines is None else machines)
+        self._runners = []
+        for machine in self.machines:
+            try:
+                instance = TransformationRegistry.get_instance(machine)
+            except NotImplementedError:
+                continue
+            arity = 1 if isinstance(instance, Transformation_Single) else 2
+            compiled = compiled_machine(instance)
+            run = compiled.run_trusted if compiled is not None else instance.transform
+            self._runners.append((instance.machine, run, arity))
+        self._moves: dict[tuple[str, int], list[_Move]] = {}
+        self._bounds: dict[tuple[str, int], tuple[float, float]] = {}
+
+    def _bound_parameters(self, machine: str, arity: int) -> tuple[float, float, float]:
+        """(factor, offset, divisor) of machine, score after it is at most\n
+        factor * x + offset / divisor * y, with x, y as in _bound()."""
+        spec = MACHINE_SPECS.get(machine)
+        if spec is not None:
+            multiplier = spec.multiplier
+            offset = spec.offset + (0.5 if spec.rounding and multiplier != 1 else 0)
+            materials = spec.materials_multiplier
+        elif machine in _HANDWRITTEN_BOUNDS:
+            (multiplier, offset), materials = _HANDWRITTEN_BOUNDS[machine], 1
+        else:
+            return inf, inf, 1
+        if self.objective == "value":
+            return multiplier * arity, offset, 1
+        return multiplier / materials, offset, materials * arity
+
+    def _explore(self, root: tuple[str, int]):
+        """Builds moves of every abstract state reachable from root and recomputes bounds."""
+        if root in self._moves:
+            return
+        pending = [root]
+        while pending:
+            key = pending.pop()
+            if key in self._moves:
+                continue
+            state = ItemState(key[0], frozenset(mask_to_tags(key[1])))
+            moves = self._moves[key] = []
+            consumers = set(TransformationRegistry.consumers(state.item_type))
+            for machine, run, arity in self._runners:
+                if machine not in consumers:
+                    continue
+                try:
+                    (output,) = check_machine(machine, *[[state]] * arity)
+                except PlanValidationError:
+                    continue
+                target = (output.item_type, tags_to_mask(list(output.tags)))
+                parameters = self._bound_parameters(machine, arity)
+                moves.append(_Move(machine, run, arity, target, *parameters))
+                pending.append(target)
+        self._update_bounds()
+
+    def _update_bounds(self):
+        """Longest path (A, B) bounds of all states, score reachable from state is at most A * x + B * y.
+
+        Cycles (Gem to Bar and back) don't change value, so iteration converges,
+        states which don't converge get infinite bound and are never cut.
+        """
+        bounds = {key: (1.0, 0.0) for key in self._moves}
+        for _ in range(len(bounds) + 1):
+            changed = False
+            for key, moves in self._moves.items():
+                factor, offset = 1.0, 0.0
+                for move in moves:
+                    target_factor, target_offset = bounds[move.target]
+                    if inf in (move.factor, target_factor) or not move.divisor:
+                        factor = offset = inf
+                        break
+                    factor = max(factor, move.factor * target_factor)
+                    offset = max(
+                        offset, (target_factor * move.offset + target_offset) / move.divisor
+                    )
+                if (factor, offset) != bounds[key]:
+                    bounds[key] = (factor, offset)
+                    changed = True
+            if not changed:
+                break
+        else:
+            bounds = {key: (inf, inf) for key in bounds}
+        self._bounds = bounds
+
+    def _score(self, item: CompactItem) -> float:
+        return item.value if self.objective == "value" else item.value_per_materials
+
+    def _bound(self, item: CompactItem) -> float:
+        """Maximal score of any chain continuing from item."""
+        factor, offset = self._bounds[(item.item_type, item.tag_mask)]
+        if factor == inf:
+            return inf
+        if self.objective == "value":
+            bound = factor * item.value + offset
+        else:
+            bound = factor * item.value_per_materials + offset * (
+                1 / item.materials if item.materials else 0
+            )
+        return bound * _SLACK
+
+    def best_chains(self, item: Item | CompactItem, top: int = 5) -> list[ChainResult]:
+        """Finds top chains with highest score for item, every result is different output state.
+
+        Empty chain (item itself) is candidate too.
+
+        Args:
+            item (Item | CompactItem): item to process, usually ore or gem
+            top (int): number of chains to return. Defaults to 5.
+
+        Raises:
+            ValueError: if top is less than 1
+            ItemValidationError: if item has tag which is not one of Tags
+
+        Returns:
+            list[ChainResult]: chains sorted by score (descending), then by length
+        """
+        if top < 1:
+            raise ValueError(f"top must be positive, got {top}")
+        start = CompactItem(
+            item.item_type, item.value, item.materials, item.dustwork_type, item.tags
+        )
+        self._explore((start.item_type, start.tag_mask))
+        max_steps = inf if self.max_steps is None else self.max_steps
+
+        best: list[tuple[float, int, tuple]] = []  # min-heap of top (score, order, state)
+        chains: dict[tuple, tuple[str, ...]] = {}  # shortest known chain of every visited state
+        stack = [(self._bound(start), start, ())]
+        while stack:
+            bound, current, chain = stack.pop()
+            if len(best) == top and bound <= best[0][0]:
+                continue
+            key = (current.item_type, current.tag_mask, current.value, current.materials)
+            known = chains.get(key)
+            if known is None:
+                candidate = (self._score(current), -len(chains), key)
+                if len(best) < top:
+                    heapq.heappush(best, candidate)
+                elif candidate[0] > best[0][0]:
+                    heapq.heapreplace(best, candidate)
+            elif len(known) <= len(chain):
+                continue
+            # state reached by shorter chain is expanded again, its successors get shorter chains too
+            chains[key] = chain
+            if len(chain) >= max_steps:
+                continue
+
+            children = []
+            for move in self._moves[(current.item_type, current.tag_mask)]:
+                try:
+                    child = move.run(*(current,) * move.arity)
+                except (ItemError, LookupError, ValueError):
+                    # hand-written machine rejected concrete item, as Ore Upgrader on last ore
+                    continue
+                children.append((self._bound(child), child, chain + (move.machine,)))
+            # most promising child is expanded first
+            children.sort(key=lambda entry: entry[0])
+            stack.extend(children)
+
+        results = [
+            ChainResult(score, chains[key], self.replay(item, chains[key]))
+            for score, _, key in best
+        ]
+        results.sort(key=lambda result: (-result.score, len(result.machines)))
+        return results
+
+    @staticmethod
+    def replay(item: Item | CompactItem, machines: Iterable[str]) -> Item | CompactItem:
+        """Runs chain of ChainResult on item through TransformationRegistry.apply().
+
+        Args:
+            item (Item | CompactItem): input of chain
+            machines (Iterable[str]): machines in crafting order
+
+        Returns:
+            Item | CompactItem: output of chain
+        """
+        for machine in machines:
+            instance = TransformationRegistry.get_instance(machine)
+            arity = 1 if isinstance(instance, Transformation_Single) else 2
+            item = TransformationRegistry.apply(machine, *(item,) * arity)
+        return item
+
+
+def best_chains(
+    item: Item | CompactItem,
+    top: int = 5,
+    objective: str = "value",
+    machines: Iterable[str] | None = None,
+    max_steps: int | None = None,
+) -> list[ChainResult]:
+    """Shortcut for ChainOptimizer(objective, machines, max_steps).best_chains(item, top).
+
+    Use one ChainOptimizer for many items, so move tables and bounds are built once.
+
+    Args:
+        item (Item | CompactItem): item to process, usually ore or gem
+        top (int): number of chains to return. Defaults to 5.
+        objective (str): "value" or "value_per_materials". Defaults to "value".
+        machines (Iterable[str] | None): allowed machines, None allows every implemented machine. Defaults to None.
+        max_steps (int | None): maximum length of chain, None for unlimited. Defaults to None.
+
+    Returns:
+        list[ChainResult]: chains sorted by score (descending), then by length
+    """
+    return ChainOptimizer(objective, machines, max_steps).best_chains(item, top)
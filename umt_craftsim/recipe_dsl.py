@@ -0,0 +1,494 @@
+"""
+Text language of recipes.\n
+One recipe is one line: statements separated by ";", last statement is result of recipe.\n
+Statement is pipeline, optionally bound to name by "name =". Pipeline is term followed by\n
+"> Machine" stages, piped item is first input of stage, "> Machine(x)" gives more inputs.\n
+Term is "Machine(inputs)", "(pipeline)", name bound by earlier statement, base item name,\n
+ore or gem name. Statement without name is bound to type of its item ("bar", "coil"...),\n
+so later statements refer to it by type. Machine names are resolved by TransformationRegistry,\n
+names are case-insensitive, "_" and " " are same. "label:" before recipe names it,\n
+"#" starts comment.\n
+Recipe is compiled once into RecipePlan: steps of DAG with machines resolved and checked\n
+statically by plan_checker. Plans are cached by source text and types of bases, so repeated\n
+recipes of large files are compiled once. RecipeBook adds all recipes of file into one\n
+RecipeGraph, shared steps of different recipes are computed once by one execute().\n
+Example:
+    ```
+    plan = compile_recipe("Tin > Ore Cleaner > Polisher > Ore Smelter; Alloy Furnace(bar, bar)")
+    alloy = run_recipe("Tin > Ore Smelter; Alloy Furnace(bar, bar) > Tempering Forge")
+
+    book = RecipeBook.load("recipes.txt", bases={"glass": Item("glass", 30)})
+    items = book.evaluate()  # recipe name -> item
+    ```
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Mapping, NamedTuple
+
+from umt_craftsim.constants import Gems, ItemTypes, Machines, Ores
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.item_factory import ItemFactory
+from umt_craftsim.recipe_graph import RecipeGraph, RecipeNode
+from umt_craftsim.service.exceptions import (
+    ItemProcessingError,
+    PlanValidationError,
+    RecipeSyntaxError,
+)
+from umt_craftsim.transformations.plan_checker import (
+    ItemState,
+    check_machine,
+    machine_rules,
+    state_of,
+)
+from umt_craftsim.transformations.transformation_registry import TransformationRegistry
+
+# operator or name, names are runs of other characters and may contain spaces
+_TOKEN = re.compile(r"\s*(?:([>;=(),])|([^>;=(),:#\s](?:[^>;=(),:#]*[^>;=(),:#\s])?))")
+_LABEL = re.compile(r"\s*([^>;=(),:#]+?)\s*:")
+
+# (kind, name): ("ore", "TIN"), ("gem", "PAINITE") or ("base", "glass")
+Source = tuple[str, str]
+# (name, state) of every base item, part of plan cache key
+_Signature = tuple[tuple[str, ItemState], ...]
+_ORE_STATES = frozenset({ItemState(ItemTypes.ORE)})
+_GEM_STATES = frozenset({ItemState(ItemTypes.GEM)})
+
+
+def _key(name: str) -> str:
+    """Spelling-independent name: "Power_Core" and "power core" are same."""
+    return " ".join(name.lower().replace("_", " ").split())
+
+
+class RecipeStep(NamedTuple):
+    """Step of RecipePlan, either source item or machine.\n
+    Attributes:
+        machine (Machines | None): machine of step, None for source step
+        inputs (tuple[int, ...]): indexes of input steps in transform() arguments order
+        source (Source | None): (kind, name) of source item, None for machine step
+    """
+
+    machine: Machines | None
+    inputs: tuple[int, ...] = ()
+    source: Source | None = None
+
+
+class RecipePlan(NamedTuple):
+    """Compiled recipe, independent of graph it is added to.\n
+    Attributes:
+        steps (tuple[RecipeStep, ...]): steps result depends on, inputs of step before step,
+            last step is result
+        states (frozenset[ItemState] | None): possible states of result, None if machine
+            without static rules is used
+    """
+
+    steps: tuple[RecipeStep, ...]
+    states: frozenset[ItemState] | None
+
+    def add_to(
+        self,
+        graph: RecipeGraph,
+        bases: Mapping[str, Item | CompactItem] | None = None,
+        compact: bool = False,
+    ) -> RecipeNode:
+        """Adds steps of recipe into graph, existing equal steps are reused.
+
+        Args:
+            graph (RecipeGraph): graph to add recipe to
+            bases (Mapping[str, Item | CompactItem] | None): base items by name. Defaults to None.
+            compact (bool): create ores and gems as CompactItem. Defaults to False.
+
+        Raises:
+            ItemProcessingError: if recipe uses base item which isn't given
+
+        Returns:
+            RecipeNode: node of result
+        """
+        return self._add(_SourceNodes(graph, bases or {}, compact))
+
+    def _add(self, sources: "_SourceNodes") -> RecipeNode:
+        nodes: list[RecipeNode] = []
+        for step in self.steps:
+            if step.source is not None:
+                nodes.append(sources[step.source])
+            else:
+                nodes.append(sources.graph.add(step.machine, *(nodes[i] for i in step.inputs)))
+        return nodes[-1]
+
+
+class _SourceNodes(dict):
+    """Input node of every source of graph, ores and gems are created on first use."""
+
+    def __init__(self, graph: RecipeGraph, bases: Mapping[str, Item | CompactItem], compact: bool):
+        super().__init__()
+        self.graph = graph
+        self.bases = {_key(name): item for name, item in bases.items()}
+        self.compact = compact
+
+    def __missing__(self, source: Source) -> RecipeNode:
+        kind, name = source
+        if kind == "ore":
+            item = ItemFactory.create_ore(name, self.compact)
+        elif kind == "gem":
+            item = ItemFactory.create_gem(name, self.compact)
+        else:
+            item = self.bases.get(name)
+            if item is None:
+                raise ItemProcessingError(f"Recipe needs base item {name}, which isn't given")
+        return self.setdefault(source, self.graph.input(item))
+
+
+class _Token(NamedTuple):
+    text: str
+    column: int
+    is_name: bool
+
+
+def _tokenize(text: str) -> list[_Token]:
+    tokens = []
+    position = 0
+    while text[position:].strip():
+        match = _TOKEN.match(text, position)
+        if match is None:
+            column = len(text) - len(text[position:].lstrip()) + 1
+            raise RecipeSyntaxError(f"Unexpected character {text[column - 1]!r}", column=column)
+        operator, name = match.groups()
+        tokens.append(_Token(operator or name, match.start(1 if operator else 2) + 1, not operator))
+        position = match.end()
+    return tokens
+
+
+class _Compiler:
+    """Recursive descent parser, emits steps while parsing.
+
+    recipe    := statement (";" statement)* [";"]
+    statement := [name "="] pipeline
+    pipeline  := term (">" name ["(" args ")"])*
+    term      := "(" pipeline ")" | name "(" args ")" | name
+    args      := pipeline ("," pipeline)*
+    """
+
+    def __init__(self, text: str, bases: dict[str, ItemState]):
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.bases = bases
+        self.names: dict[str, int] = {}
+        self.steps: list[RecipeStep] = []
+        self.states: list[frozenset[ItemState] | None] = []
+        self.indexes: dict[RecipeStep, int] = {}
+
+    def peek(self, offset: int = 0) -> _Token | None:
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else None
+
+    def take(self, expected: str | None = None) -> _Token:
+        token = self.peek()
+        if token is None:
+            raise RecipeSyntaxError(f"Expected {expected or 'name'}, recipe ended")
+        if (expected is None) != token.is_name or expected is not None and token.text != expected:
+            raise RecipeSyntaxError(
+                f"Expected {expected or 'name'}, got {token.text!r}", column=token.column
+            )
+        self.position += 1
+        return token
+
+    def at(self, operator: str) -> bool:
+        token = self.peek()
+        return token is not None and not token.is_name and token.text == operator
+
+    def compile(self) -> RecipePlan:
+        if not self.tokens:
+            raise RecipeSyntaxError("Recipe is empty")
+        result = self.statement()
+        while self.at(";"):
+            self.position += 1
+            if self.peek() is not None:
+                result = self.statement()
+        token = self.peek()
+        if token is not None:
+            raise RecipeSyntaxError(f"Unexpected {token.text!r}", column=token.column)
+
+        # statements result doesn't depend on are dropped
+        used = {result}
+        for index in range(result, -1, -1):
+            if index in used:
+                used.update(self.steps[index].inputs)
+        renumbered: dict[int, int] = {}
+        steps = []
+        for index in sorted(used):
+            step = self.steps[index]
+            renumbered[index] = len(steps)
+            steps.append(step._replace(inputs=tuple(renumbered[i] for i in step.inputs)))
+        return RecipePlan(tuple(steps), self.states[result])
+
+    def statement(self) -> int:
+        token = self.peek()
+        following = self.peek(1)
+        if token is not None and token.is_name and following is not None:
+            if not following.is_name and following.text == "=":
+                self.position += 2
+                index = self.pipeline()
+                self.names[_key(token.text)] = index
+                return index
+        index = self.pipeline()
+        states = self.states[index]
+        if states and len({state.item_type for state in states}) == 1:
+            self.names[_key(next(iter(states)).item_type)] = index
+        return index
+
+    def pipeline(self) -> int:
+        index = self.term()
+        while self.at(">"):
+            self.position += 1
+            index = self.call(self.take(), [index])
+        return index
+
+    def term(self) -> int:
+        if self.at("("):
+            self.position += 1
+            index = self.pipeline()
+            self.take(")")
+            return index
+        token = self.take()
+        if self.at("("):
+            return self.call(token, [])
+        return self.value(token)
+
+    def call(self, token: _Token, inputs: list[int]) -> int:
+        try:
+            machine = TransformationRegistry.resolve(token.text)
+            TransformationRegistry.get_instance(machine)
+        except KeyError as error:
+            raise RecipeSyntaxError(error.args[0], column=token.column) from None
+        except NotImplementedError:
+            raise RecipeSyntaxError(f"{machine} isn't implemented", column=token.column) from None
+        if self.at("("):
+            self.position += 1
+            if not self.at(")"):
+                inputs.append(self.pipeline())
+                while self.at(","):
+                    self.position += 1
+                    inputs.append(self.pipeline())
+            self.take(")")
+        if not inputs:
+            raise RecipeSyntaxError(f"{machine} is given no inputs", column=token.column)
+
+        step = RecipeStep(machine, tuple(inputs))
+        index = self.indexes.get(step)
+        if index is not None:
+            return index
+        states = None
+        if all(self.states[i] is not None for i in inputs):
+            try:
+                machine_rules(machine)
+            except KeyError:
+                pass
+            else:
+                try:
+                    states = check_machine(
+                        machine, *(self.states[i] for i in inputs), step=len(self.steps)
+                    )
+                except PlanValidationError as error:
+                    error.add_note(f"at column {token.column}")
+                    raise
+        return self.add(step, states)
+
+    def value(self, token: _Token) -> int:
+        name = _key(token.text)
+        index = self.names.get(name)
+        if index is not None:
+            return index
+        if name in self.bases:
+            return self.add(RecipeStep(None, source=("base", name)), frozenset({self.bases[name]}))
+        member = name.upper().replace(" ", "_")
+        if member in Ores.__members__:
+            return self.add(RecipeStep(None, source=("ore", member)), _ORE_STATES)
+        if member in Gems.__members__:
+            return self.add(RecipeStep(None, source=("gem", member)), _GEM_STATES)
+        try:
+            TransformationRegistry.resolve(token.text)
+        except KeyError:
+            raise RecipeSyntaxError(
+                f"Unknown name {token.text!r}, it isn't bound, base item, ore or gem",
+                column=token.column,
+            ) from None
+        raise RecipeSyntaxError(
+            f"{token.text} is machine, give its inputs as {token.text}(...)", column=token.column
+        )
+
+    def add(self, step: RecipeStep, states: frozenset[ItemState] | None) -> int:
+        index = self.indexes.get(step)
+        if index is None:
+            index = self.indexes[step] = len(self.steps)
+            self.steps.append(step)
+            self.states.append(states)
+        return index
+
+
+def _signature(bases: Mapping[str, Item | CompactItem] | None) -> _Signature:
+    return tuple(sorted((_key(name), state_of(item)) for name, item in (bases or {}).items()))
+
+
+@lru_cache(maxsize=65536)
+def _compile(text: str, signature: _Signature) -> RecipePlan:
+    return _Compiler(text, dict(signature)).compile()
+
+
+def compile_recipe(
+    source: str, bases: Mapping[str, Item | CompactItem] | None = None
+) -> RecipePlan:
+    """Compiles one recipe, plans are cached by source text and types of bases.
+
+    Args:
+        source (str): recipe, without label and comment
+        bases (Mapping[str, Item | CompactItem] | None): base items by name, as glass.
+            Defaults to None.
+
+    Raises:
+        RecipeSyntaxError: if recipe can't be parsed or name can't be resolved
+        PlanValidationError: if machine of recipe rejects its inputs
+
+    Returns:
+        RecipePlan: compiled recipe
+    """
+    return _compile(source.strip(), _signature(bases))
+
+
+def run_recipe(
+    source: str, bases: Mapping[str, Item | CompactItem] | None = None, compact: bool = False
+) -> Item | CompactItem:
+    """Compiles and executes one recipe.
+
+    Args:
+        source (str): recipe, without label and comment
+        bases (Mapping[str, Item | CompactItem] | None): base items by name. Defaults to None.
+        compact (bool): create ores and gems as CompactItem. Defaults to False.
+
+    Returns:
+        Item | CompactItem: result of recipe
+    """
+    graph = RecipeGraph()
+    node = compile_recipe(source, bases).add_to(graph, bases, compact)
+    return graph.execute(node)[0]
+
+
+class RecipeBook:
+    """
+    Named recipes, evaluated together in one RecipeGraph.\n
+    Attributes:
+        bases (dict[str, Item | CompactItem]): base items by name
+        compact (bool): ores and gems are created as CompactItem
+        recipes (dict[str, RecipePlan]): compiled recipes by name, in order of adding
+    """
+
+    def __init__(
+        self, bases: Mapping[str, Item | CompactItem] | None = None, compact: bool = False
+    ):
+        """RecipeBook init.
+
+        Args:
+            bases (Mapping[str, Item | CompactItem] | None): base items by name. Defaults to None.
+            compact (bool): create ores and gems as CompactItem. Defaults to False.
+        """
+        self.bases = dict(bases or {})
+        self.compact = compact
+        self.recipes: dict[str, RecipePlan] = {}
+        self._signature = _signature(self.bases)
+
+    @classmethod
+    def load(
+        cls,
+        path: str | Path,
+        bases: Mapping[str, Item | CompactItem] | None = None,
+        compact: bool = False,
+    ) -> "RecipeBook":
+        """Creates book with every recipe of text file.
+
+        Args:
+            path (str | Path): file, one recipe per line
+            bases (Mapping[str, Item | CompactItem] | None): base items by name. Defaults to None.
+            compact (bool): create ores and gems as CompactItem. Defaults to False.
+
+        Returns:
+            RecipeBook: book
+        """
+        book = cls(bases, compact)
+        book.add(Path(path).read_text(encoding="utf-8"))
+        return book
+
+    def add(self, text: str, first_line: int = 1) -> list[str]:
+        """Compiles every recipe of text, one recipe per line.
+
+        Recipe without "label:" is named "line N".
+
+        Args:
+            text (str): recipes
+            first_line (int): number of first line of text, used in names and errors. Defaults to 1.
+
+        Raises:
+            RecipeSyntaxError: if recipe can't be parsed, or its name is already used
+            PlanValidationError: if machine of recipe rejects its inputs
+
+        Returns:
+            list[str]: names of added recipes
+        """
+        names = []
+        for number, line in enumerate(text.splitlines(), first_line):
+            line = line.split("#", 1)[0]
+            if not line.strip():
+                continue
+            label = _LABEL.match(line)
+            offset = label.end() if label else 0
+            body = line[offset:]
+            name = label.group(1) if label else f"line {number}"
+            if name in self.recipes:
+                raise RecipeSyntaxError(f"Recipe {name} is already defined", number)
+            try:
+                self.recipes[name] = _compile(body.strip(), self._signature)
+            except RecipeSyntaxError as error:
+                column = None
+                if error.column is not None:
+                    column = error.column + offset + len(body) - len(body.lstrip())
+                raise RecipeSyntaxError(error.reason, number, column) from None
+            except PlanValidationError as error:
+                error.add_note(f"in recipe {name} at line {number}")
+                raise
+            names.append(name)
+        return names
+
+    def build(self, *names: str) -> tuple[RecipeGraph, dict[str, RecipeNode]]:
+        """Adds recipes into new graph, shared steps of recipes are one node.
+
+        Args:
+            *names (str): recipes to add, no names adds all
+
+        Returns:
+            tuple[RecipeGraph, dict[str, RecipeNode]]: graph and node of every recipe by name
+        """
+        sources = _SourceNodes(RecipeGraph(), self.bases, self.compact)
+        nodes: dict[str, RecipeNode] = {}
+        # same recipe text is same cached plan object, it is added once
+        added: dict[int, RecipeNode] = {}
+        for name in names or self.recipes:
+            plan = self.recipes[name]
+            node = added.get(id(plan))
+            if node is None:
+                node = added[id(plan)] = plan._add(sources)
+            nodes[name] = node
+        return sources.graph, nodes
+
+    def evaluate(self, *names: str, trusted: bool = False) -> dict[str, Item | CompactItem]:
+        """Computes recipes with one RecipeGraph.execute().
+
+        Args:
+            *names (str): recipes to compute, no names computes all
+            trusted (bool): passed to RecipeGraph.execute(). Defaults to False.
+
+        Returns:
+            dict[str, Item | CompactItem]: result of every recipe by name
+        """
+        graph, nodes = self.build(*names)
+        if not nodes:
+            return {}
+        return dict(zip(nodes, graph.execute(*nodes.values(), trusted=trusted)))
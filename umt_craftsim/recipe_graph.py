@@ -0,0 +1,381 @@
+"""
+Builder of multi-input recipes.\n
+RecipeGraph describes recipe as DAG: leaves are input items, every other node is machine\n
+applied to other nodes. Nodes are hash-consed, adding same machine with same inputs\n
+(or same input item) twice returns existing node, so shared intermediates, as alloy used\n
+by bolts, coil, plate and frame, are computed once per execute().\n
+Example:
+    ```
+    graph = RecipeGraph()
+    bar = graph.add(Machines.ORE_SMELTER, ore)
+    alloy = graph.add(Machines.ALLOY_FURNACE, bar, bar)
+    bolts = graph.add(Machines.BOLT_MACHINE, alloy)
+    frame = graph.add(Machines.FRAME_MAKER, alloy, bolts)
+    frame_item, bolts_item = graph.execute(frame, bolts)
+    ```
+"""
+
+from umt_craftsim.constants import Machines
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.service.exceptions import ItemProcessingError
+from umt_craftsim.transformations.memoization import fingerprint
+from umt_craftsim.transformations.plan_checker import ItemState, check_machine, state_of
+from umt_craftsim.transformations.transformation_registry import (
+    TransformationRegistry,
+    compiled_machine,
+)
+from umt_craftsim.transformations.transformations_multiple import Transformation_Multiple
+from umt_craftsim.transformations.transformations_single import Transformation_Single
+
+
+class RecipeNode:
+    """
+    Node of RecipeGraph, create nodes with RecipeGraph.input() and RecipeGraph.add().\n
+    Attributes:
+        index (int): position in graph, inputs of node always have smaller index
+        machine (str | None): machine of node, None for input nodes
+        transformation (Transformation_Single | Transformation_Multiple | None): transformation, None for input nodes
+        inputs (tuple[RecipeNode, ...]): input nodes in transform() arguments order
+        item (Item | CompactItem | None): item of input node, None for machine nodes
+        revision (int): number of changes of node by RecipeGraph.set_input() or set_transformation()
+    """
+
+    __slots__ = ("index", "machine", "transformation", "inputs", "item", "revision", "key")
+
+    def __init__(self, index, machine, transformation, inputs, item, key):
+        self.index = index
+        self.machine = machine
+        self.transformation = transformation
+        self.inputs = inputs
+        self.item = item
+        self.revision = 0
+        self.key = key
+
+    @property
+    def is_input(self) -> bool:
+        """True for input (leaf) nodes."""
+        return self.transformation is None
+
+    def __repr__(self) -> str:
+        if self.is_input:
+            return f"RecipeNode({self.index}, input {self.item.item_type})"  # type: ignore
+        return f"RecipeNode({self.index}, {self.machine} <- {[node.index for node in self.inputs]})"
+
+
+class RecipeGraph:
+    """
+    DAG of crafting steps with common-subexpression elimination.\n
+    Nodes are stored in creation order, which is topological order, as inputs of node\n
+    must exist before node. execute() runs only nodes requested outputs depend on,\n
+    every node at most once.\n
+    Attributes:
+        nodes (list[RecipeNode]): all nodes in creation order
+    """
+
+    def __init__(self):
+        self.nodes: list[RecipeNode] = []
+        self._keys: dict[tuple, RecipeNode] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def _node(self, key: tuple, machine, transformation, inputs, item) -> RecipeNode:
+        """Returns existing node with key, or creates new one."""
+        node = self._keys.get(key)
+        if node is None:
+            node = RecipeNode(len(self.nodes), machine, transformation, inputs, item, key)
+            self.nodes.append(node)
+            self._keys[key] = node
+        return node
+
+    def input(self, item: Item | CompactItem) -> RecipeNode:
+        """Adds input item, equal items (same properties and history) share one node.
+
+        Args:
+            item (Item | CompactItem): input item
+
+        Returns:
+            RecipeNode: input node
+        """
+        return self._node(self._input_key(item), None, None, (), item)
+
+    @staticmethod
+    def _input_key(item: Item | CompactItem) -> tuple:
+        return ("input", fingerprint(item), item.dustwork_type, item.sequence)
+
+    def add(
+        self,
+        machine: str | Machines | Transformation_Single | Transformation_Multiple,
+        *inputs: "RecipeNode | Item | CompactItem",
+    ) -> RecipeNode:
+        """Adds machine applied to inputs, returns existing node if same step already exists.
+
+        Args:
+            machine (str | Machines | Transformation_Single | Transformation_Multiple): machine
+                name (resolved by TransformationRegistry) or transformation instance
+            *inputs (RecipeNode | Item | CompactItem): inputs in transform() arguments order,
+                items are added with input()
+
+        Raises:
+            KeyError: For invalid/unregistered machine names
+            NotImplementedError: if transformation for machine is found, but not implemented
+            ItemProcessingError: if input node belongs to other graph
+
+        Returns:
+            RecipeNode: node of step
+        """
+        transformation = self._transformation(machine)
+        nodes = tuple(
+            node if isinstance(node, RecipeNode) else self.input(node) for node in inputs
+        )
+        for node in nodes:
+            if node.index >= len(self.nodes) or self.nodes[node.index] is not node:
+                raise ItemProcessingError(f"{node} doesn't belong to this graph")
+        key = self._step_key(transformation, nodes)
+        return self._node(key, transformation.machine, transformation, nodes, None)
+
+    @staticmethod
+    def _transformation(machine) -> Transformation_Single | Transformation_Multiple:
+        if isinstance(machine, str):
+            return TransformationRegistry.get_instance(machine)
+        return machine
+
+    @staticmethod
+    def _step_key(transformation, inputs: tuple[RecipeNode, ...]) -> tuple:
+        """CSE key of machine step."""
+        # transformations are stateless, so every instance of class is same step, wrappers
+        # (MemoizedTransformation) share one class for all machines, so every wrapper is own step
+        if getattr(type(transformation), "transform", None) is None:
+            step = id(transformation)
+        else:
+            step = type(transformation)
+        return (transformation.machine, step, tuple(node.index for node in inputs))
+
+    def _rekey(self, node: RecipeNode, key: tuple):
+        """Moves node to new CSE key, old key is dropped, new key is kept by existing node if any."""
+        if self._keys.get(node.key) is node:
+            del self._keys[node.key]
+        self._keys.setdefault(key, node)
+        node.key = key
+        node.revision += 1
+
+    def set_input(self, node: RecipeNode, item: Item | CompactItem):
+        """Replaces item of input node, nodes depending on it are recomputed by IncrementalEvaluator.
+
+        Args:
+            node (RecipeNode): input node of graph
+            item (Item | CompactItem): new item
+
+        Raises:
+            ItemProcessingError: if node is not input node
+        """
+        if not node.is_input:
+            raise ItemProcessingError(f"{node} is not input node")
+        node.item = item
+        self._rekey(node, self._input_key(item))
+
+    def set_transformation(
+        self,
+        node: RecipeNode,
+        machine: str | Machines | Transformation_Single | Transformation_Multiple,
+    ):
+        """Replaces transformation of machine node (e.g. with one generated from changed MachineSpec),
+        nodes depending on it are recomputed by IncrementalEvaluator.
+
+        Args:
+            node (RecipeNode): machine node of graph
+            machine (str | Machines | Transformation_Single | Transformation_Multiple): new machine
+
+        Raises:
+            ItemProcessingError: if node is input node
+        """
+        if node.is_input:
+            raise ItemProcessingError(f"{node} is input node, use set_input()")
+        transformation = self._transformation(machine)
+        node.transformation = transformation
+        node.machine = transformation.machine
+        self._rekey(node, self._step_key(transformation, node.inputs))
+
+    def sinks(self) -> list[RecipeNode]:
+        """Nodes which aren't input of any other node, in creation order.
+
+        Returns:
+            list[RecipeNode]: final products of graph
+        """
+        used = {node.index for step in self.nodes for node in step.inputs}
+        return [node for node in self.nodes if node.index not in used]
+
+    def required(self, outputs) -> list[RecipeNode]:
+        """Nodes outputs depend on, outputs included.
+
+        Args:
+            outputs (Iterable[RecipeNode]): nodes of graph
+
+        Returns:
+            list[RecipeNode]: nodes in topological (index) order
+        """
+        required = set()
+        stack = list(outputs)
+        while stack:
+            node = stack.pop()
+            if node.index not in required:
+                required.add(node.index)
+                stack.extend(node.inputs)
+        return [self.nodes[index] for index in sorted(required)]
+
+    def check(self, *outputs: RecipeNode) -> dict[RecipeNode, frozenset[ItemState]]:
+        """Statically checks steps outputs depend on, see plan_checker.
+
+        Args:
+            *outputs (RecipeNode): nodes to check, no nodes checks all sinks
+
+        Raises:
+            PlanValidationError: for first step (by node index) which rejects possible input
+
+        Returns:
+            dict[RecipeNode, frozenset[ItemState]]: possible states of every checked node
+        """
+        states: dict[RecipeNode, frozenset[ItemState]] = {}
+        for node in self.required(outputs or self.sinks()):
+            if node.is_input:
+                states[node] = frozenset([state_of(node.item)])  # type: ignore
+            else:
+                states[node] = check_machine(
+                    node.machine,  # type: ignore
+                    *(states[child] for child in node.inputs),
+                    step=node.index,
+                )
+        return states
+
+    def run_node(
+        self, node: RecipeNode, values: dict[int, Item | CompactItem], trusted: bool = False
+    ) -> Item | CompactItem:
+        """Computes one node from already computed items of its inputs.
+
+        Args:
+            node (RecipeNode): node of graph
+            values (dict[int, Item | CompactItem]): computed items by node index, must contain inputs of node
+            trusted (bool): skip per-item validation of declarative machines. Defaults to False.
+
+        Returns:
+            Item | CompactItem: item of node
+        """
+        if node.is_input:
+            return node.item  # type: ignore
+        compiled = compiled_machine(node.transformation)  # type: ignore
+        if compiled is None:
+            run = node.transformation.transform  # type: ignore
+        else:
+            run = compiled.run_trusted if trusted else compiled.run
+        return run(*(values[child.index] for child in node.inputs))
+
+    def execute(self, *outputs: RecipeNode, trusted: bool = False) -> list[Item | CompactItem]:
+        """Computes outputs, every required node is computed once, in topological order.
+
+        Args:
+            *outputs (RecipeNode): nodes to compute, no nodes computes all sinks
+            trusted (bool): check graph statically with check() first and skip per-item validation
+                of declarative machines. Defaults to False.
+
+        Raises:
+            PlanValidationError: if trusted and check() rejects graph
+
+        Returns:
+            list[Item | CompactItem]: items of outputs, in outputs order
+        """
+        outputs = outputs or tuple(self.sinks())
+        if trusted:
+            self.check(*outputs)
+        values = self.evaluate(self.required(outputs), {}, trusted)
+        return [values[node.index] for node in outputs]
+
+    def evaluate(
+        self, nodes: list[RecipeNode], values: dict[int, Item | CompactItem], trusted: bool = False
+    ) -> dict[int, Item | CompactItem]:
+        """Computes nodes in given order, inputs of every node must be computed before it.
+
+        Args:
+            nodes (list[RecipeNode]): nodes in topological order
+            values (dict[int, Item | CompactItem]): already computed items by node index, updated in place
+            trusted (bool): skip per-item validation of declarative machines. Defaults to False.
+
+        Returns:
+            dict[int, Item | CompactItem]: values
+        """
+        for node in nodes:
+            values[node.index] = self.run_node(node, values, trusted)
+        return values
+
+
+class IncrementalEvaluator:
+    """
+    Keeps computed items of RecipeGraph nodes between evaluations.\n
+    Every cached item records revision of its node and stamps of items of its inputs,\n
+    evaluate() recomputes only nodes which were changed (RecipeGraph.set_input(),\n
+    set_transformation()) or which inputs got different items, other intermediates are reused.\n
+    If recomputed node gives item equal to previous one, it keeps its stamp,\n
+    so its dependents are not recomputed.\n
+    Example:
+        ```
+        evaluator = IncrementalEvaluator(graph)
+        tablet_item, = evaluator.evaluate(tablet)
+        graph.set_input(glass, Item("glass", 45))
+        tablet_item, = evaluator.evaluate(tablet)  # only glass -> circuit -> tablet recomputed
+        ```
+    Attributes:
+        graph (RecipeGraph): evaluated graph
+        recomputed (list[RecipeNode]): nodes computed by last evaluate()
+    """
+
+    def __init__(self, graph: RecipeGraph):
+        self.graph = graph
+        self.recomputed: list[RecipeNode] = []
+        self._values: dict[int, Item | CompactItem] = {}
+        self._stamps: dict[int, int] = {}
+        self._dependencies: dict[int, tuple] = {}
+        self._next_stamp = 0
+
+    def invalidate(self, *nodes: RecipeNode):
+        """Drops cached items of nodes, no nodes drops everything.
+
+        Args:
+            *nodes (RecipeNode): nodes to recompute on next evaluate()
+        """
+        if not nodes:
+            self._dependencies.clear()
+        for node in nodes:
+            self._dependencies.pop(node.index, None)
+
+    def _dependency(self, node: RecipeNode) -> tuple:
+        """Everything item of node depends on: node revision and stamps of input items."""
+        return (node.revision, *(self._stamps[child.index] for child in node.inputs))
+
+    def evaluate(self, *outputs: RecipeNode, trusted: bool = False) -> list[Item | CompactItem]:
+        """Computes outputs, reusing cached items of unaffected nodes.
+
+        Args:
+            *outputs (RecipeNode): nodes to compute, no nodes computes all sinks
+            trusted (bool): check graph statically first and skip per-item validation. Defaults to False.
+
+        Returns:
+            list[Item | CompactItem]: items of outputs, in outputs order
+        """
+        graph = self.graph
+        outputs = outputs or tuple(graph.sinks())
+        if trusted:
+            graph.check(*outputs)
+        self.recomputed = []
+        for node in graph.required(outputs):
+            index = node.index
+            dependency = self._dependency(node)
+            if self._dependencies.get(index) == dependency:
+                continue
+            item = graph.run_node(node, self._values, trusted)
+            self.recomputed.append(node)
+            previous = self._values.get(index)
+            if previous is None or previous.__class__ is not item.__class__ or previous != item:
+                self._next_stamp += 1
+                self._stamps[index] = self._next_stamp
+            self._values[index] = item
+            self._dependencies[index] = dependency
+        return [self._values[node.index] for node in outputs]
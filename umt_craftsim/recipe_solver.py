@@ -0,0 +1,266 @@
+"""
+Solver of best (highest value) recipe tree for target item type.\n
+Goal is (item_type, forbidden tags, required tags): item of type which can still be fed into\n
+machines waiting for it. Every machine which outputs item_type is option of goal, its inputs are\n
+sub-goals, tags forbidden for output are forbidden for every input (tags are inherited) and\n
+required tags are distributed among inputs. Value of every machine grows with values of inputs,\n
+so best item of goal is machine applied to best items of sub-goals, each sub-goal is solved once\n
+and shared by all parents and all later targets of same solver.\n
+Items which can't be crafted from ores and gems (glass, lens, ceramic casing) are given as bases.\n
+Example:
+    ```
+    glass = Item(ItemTypes.GLASS, value=40, materials=0)
+    solver = RecipeSolver(bases=[glass, ceramic_casing, lens])
+    solution = solver.solve(ItemTypes.POWER_CORE)
+    print(solution.item.table_full())
+    same_item, = solution.graph.execute(solution.node)
+    ```
+"""
+
+from itertools import product
+from typing import Iterable, NamedTuple
+
+from umt_craftsim.constants import Gems, Ores
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.item_factory import ItemFactory
+from umt_craftsim.recipe_graph import RecipeGraph, RecipeNode
+from umt_craftsim.service.exceptions import ItemProcessingError, PlanValidationError
+from umt_craftsim.transformations.machine_specs import InputSpec
+from umt_craftsim.transformations.plan_checker import (
+    ItemState,
+    check_machine,
+    machine_rules,
+    state_of,
+)
+from umt_craftsim.transformations.transformation_registry import TransformationRegistry
+
+# (item_type, forbidden tags, required tags)
+Goal = tuple[str, frozenset, frozenset]
+# (machine, input specs, input types, tags added by machine)
+Producer = tuple[str, tuple[InputSpec, ...], tuple[str, ...], frozenset]
+
+
+class RecipeSolution(NamedTuple):
+    """Best recipe of target.\n
+    Attributes:
+        item (Item | CompactItem): best crafted item
+        graph (RecipeGraph): recipe, shared sub-recipes are shared nodes
+        node (RecipeNode): node of item in graph
+    """
+
+    item: Item | CompactItem
+    graph: RecipeGraph
+    node: RecipeNode
+
+
+class _Best:
+    """Best known item of goal and how it is made: base item or (machine, input goals)."""
+
+    __slots__ = ("item", "machine", "inputs")
+
+    def __init__(self, item, machine=None, inputs=()):
+        self.item = item
+        self.machine = machine
+        self.inputs = inputs
+
+
+class RecipeSolver:
+    """
+    Dynamic programming over goals, solved goals are kept for next solve() calls.\n
+    Attributes:
+        bases (list[Item | CompactItem]): items recipes start from
+        machines (tuple[str, ...]): machines recipes can use
+    """
+
+    def __init__(
+        self,
+        bases: Iterable[Item | CompactItem] | None = None,
+        machines: Iterable[str] | None = None,
+        catalog: bool = True,
+    ):
+        """RecipeSolver init.
+
+        Args:
+            bases (Iterable[Item | CompactItem] | None): extra base items, as glass or ceramic casing. Defaults to None.
+            machines (Iterable[str] | None): allowed machines, None allows every implemented machine
+                of TransformationRegistry.registry. Defaults to None.
+            catalog (bool): add every Ores and Gems entry to bases. Defaults to True.
+        """
+        self.bases = list(bases or [])
+        if catalog:
+            self.bases += [ItemFactory.create_ore(ore) for ore in Ores]
+            self.bases += [ItemFactory.create_gem(gem) for gem in Gems]
+        self._bases_by_type: dict[str, list[Item | CompactItem]] = {}
+        for base in self.bases:
+            self._bases_by_type.setdefault(base.item_type, []).append(base)
+
+        self.machines = tuple(TransformationRegistry.registry if machines is None else machines)
+        self._rules: list[tuple[str, tuple[InputSpec, ...], object]] = []
+        for machine in self.machines:
+            try:
+                TransformationRegistry.get_instance(machine)
+                specs, output = machine_rules(machine)
+            except (KeyError, NotImplementedError):
+                continue
+            self._rules.append((machine, specs, output))
+        self._producers: dict[str, list[Producer]] = {}
+        self._options: dict[Goal, list[tuple[str, tuple[Goal, ...]]]] = {}
+        self._best: dict[Goal, _Best] = {}
+
+    def _producers_of(self, item_type: str) -> list[Producer]:
+        """Every way to make item_type."""
+        producers = self._producers.get(item_type)
+        if producers is None:
+            producers = self._producers[item_type] = []
+            machines = set(TransformationRegistry.producers(item_type))
+            for machine, specs, output in self._rules:
+                if machine not in machines:
+                    continue
+                # input accepting any type keeps it, so only item_type itself is useful
+                for types in product(*(spec.types or (item_type,) for spec in specs)):
+                    try:
+                        state = output(*(ItemState(input_type) for input_type in types))
+                    except ItemProcessingError:
+                        continue
+                    if state.item_type == item_type:
+                        producers.append((machine, specs, types, state.tags))
+        return producers
+
+    def _goal_options(self, goal: Goal) -> list[tuple[str, tuple[Goal, ...]]]:
+        """(machine, input goals) of every machine which can make item satisfying goal."""
+        item_type, forbidden, required = goal
+        options = []
+        for machine, specs, types, added in self._producers_of(item_type):
+            if added & forbidden:
+                continue
+            remaining = sorted(required - added)
+            # every required tag must come from at least one input
+            for owners in product(range(len(specs)), repeat=len(remaining)):
+                inputs = []
+                for index, (spec, input_type) in enumerate(zip(specs, types)):
+                    needs = frozenset(spec.required_tags).union(
+                        tag for tag, owner in zip(remaining, owners) if owner == index
+                    )
+                    avoid = forbidden | frozenset(spec.forbidden_tags)
+                    if needs & avoid:
+                        break
+                    inputs.append((input_type, avoid, needs))
+                else:
+                    options.append((machine, tuple(inputs)))
+        return options
+
+    @staticmethod
+    def _satisfies(item: Item | CompactItem, goal: Goal) -> bool:
+        tags = set(item.tags)
+        return item.item_type == goal[0] and not tags & goal[1] and goal[2] <= tags
+
+    def _explore(self, root: Goal) -> list[Goal]:
+        """Collects options of root and every new sub-goal, returns new goals, inputs first."""
+        order: list[Goal] = []
+        stack = [(root, False)]
+        while stack:
+            goal, expanded = stack.pop()
+            if expanded:
+                order.append(goal)
+                continue
+            if goal in self._options:
+                continue
+            options = self._options[goal] = self._goal_options(goal)
+            stack.append((goal, True))
+            for _, inputs in options:
+                stack.extend((child, False) for child in inputs if child not in self._options)
+        return order
+
+    def _solve_goals(self, goals: list[Goal]):
+        """Relaxes new goals until no best item improves, solved goals are final already."""
+        for goal in goals:
+            candidates = [
+                base for base in self._bases_by_type.get(goal[0], ()) if self._satisfies(base, goal)
+            ]
+            if candidates:
+                self._best[goal] = _Best(max(candidates, key=lambda base: base.value))
+
+        # values only grow and no cycle of machines adds value, cap is only safety net
+        for _ in range(len(goals) + 1):
+            changed = False
+            for goal in goals:
+                for machine, inputs in self._options[goal]:
+                    best_inputs = [self._best.get(child) for child in inputs]
+                    if None in best_inputs:
+                        continue
+                    items = [entry.item for entry in best_inputs]  # type: ignore
+                    current = self._best.get(goal)
+                    try:
+                        check_machine(machine, *([state_of(item)] for item in items))
+                        crafted = TransformationRegistry.apply(machine, *items)
+                    except (PlanValidationError, LookupError, ValueError):
+                        # hand-written machine rejected concrete item, as Ore Upgrader on last ore
+                        continue
+                    if not self._satisfies(crafted, goal):
+                        continue
+                    if current is None or crafted.value > current.item.value:
+                        self._best[goal] = _Best(crafted, machine, inputs)
+                        changed = True
+            if not changed:
+                break
+
+    def solve(
+        self,
+        target: str,
+        required_tags: Iterable[str] = (),
+        forbidden_tags: Iterable[str] = (),
+    ) -> RecipeSolution:
+        """Finds highest value item of target type and its recipe.
+
+        Args:
+            target (str): item type, better to use ItemTypes constants
+            required_tags (Iterable[str]): tags item must have. Defaults to ().
+            forbidden_tags (Iterable[str]): tags item must not have, e.g. to tune it later. Defaults to ().
+
+        Raises:
+            ItemProcessingError: if target can't be made from bases with allowed machines
+
+        Returns:
+            RecipeSolution: best item, its recipe graph and node
+        """
+        goal = (target, frozenset(forbidden_tags), frozenset(required_tags))
+        self._solve_goals(self._explore(goal))
+        if goal not in self._best:
+            raise ItemProcessingError(
+                f"No recipe of {target} from given bases, add bases for missing inputs"
+            )
+        graph = RecipeGraph()
+        nodes: dict[Goal, RecipeNode] = {}
+
+        def build(goal: Goal) -> RecipeNode:
+            node = nodes.get(goal)
+            if node is None:
+                best = self._best[goal]
+                if best.machine is None:
+                    node = graph.input(best.item)
+                else:
+                    node = graph.add(best.machine, *(build(child) for child in best.inputs))
+                nodes[goal] = node
+            return node
+
+        return RecipeSolution(self._best[goal].item, graph, build(goal))
+
+
+def solve_recipe(
+    target: str,
+    bases: Iterable[Item | CompactItem] | None = None,
+    machines: Iterable[str] | None = None,
+) -> RecipeSolution:
+    """Shortcut for RecipeSolver(bases, machines).solve(target).
+
+    Use one RecipeSolver for many targets, so shared sub-recipes are solved once.
+
+    Args:
+        target (str): item type, better to use ItemTypes constants
+        bases (Iterable[Item | CompactItem] | None): extra base items, ores and gems are always included. Defaults to None.
+        machines (Iterable[str] | None): allowed machines, None allows every implemented machine. Defaults to None.
+
+    Returns:
+        RecipeSolution: best item, its recipe graph and node
+    """
+    return RecipeSolver(bases, machines).solve(target)
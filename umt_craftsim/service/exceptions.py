@@ -12,6 +12,8 @@ Exceptions:
     InvalidItemTypeError: Raised when an item has an unexpected type.
     TagConflictError: Raised when tag operations cause conflicts.
     TagMissingError: Raised when a required tag is missing from an item.
+    PlanValidationError: Raised when a crafting plan is rejected before execution.
+    RecipeSyntaxError: Raised when recipe text can't be parsed.
 """
 
 
@@ -105,3 +107,52 @@ class TagConflictError(ItemValidationError):
         self.tag = tag
         message = f"Prohibited tag {tag} is present"
         super().__init__(message, item)
+
+
+class PlanValidationError(ItemValidationError):
+    """
+    Exception raised when static check proves that a crafting plan would fail.
+
+    Raised by plan_checker before any item is processed, instead of the
+    validation error every item would raise during execution.
+
+    Attributes:
+        machine (str): Machine which rejects its input.
+        step (int): Index of the failing step in checking order.
+        state (ItemState | str | None): Input state(s) rejected by the machine, None if machine can't be checked.
+        cause (ItemError): Error the machine would raise on such item.
+    """
+
+    def __init__(self, machine, step, state, cause):
+        self.machine = machine
+        self.step = step
+        self.state = state
+        self.cause = cause
+        if state is None:
+            message = f"Step {step} ({machine}): {cause.message}"
+        else:
+            message = f"Step {step} ({machine}) rejects input {state}: {cause.message}"
+        super().__init__(message)
+
+
+class RecipeSyntaxError(ItemError):
+    """
+    Exception raised when recipe text can't be parsed or a name in it can't be resolved.
+
+    Attributes:
+        message (str): Explanation of the error, with line and column.
+        reason (str): Explanation of the error without line and column.
+        line (int | None): Line of the recipe in its file, None if unknown.
+        column (int | None): Column of the error in the line, counted from 1, None if unknown.
+    """
+
+    def __init__(self, message, line=None, column=None):
+        self.reason = message
+        self.line = line
+        self.column = column
+        location = [f"line {line}"] if line is not None else []
+        if column is not None:
+            location.append(f"column {column}")
+        if location:
+            message = f"{message} ({', '.join(location)})"
+        super().__init__(message)
@@ -7,7 +7,8 @@ Provides helper methods for:
 - Property aggregation
 """
 
-from umt_craftsim.dataclasses.items import Item
+from umt_craftsim.dataclasses.history import HistoryNode
+from umt_craftsim.dataclasses.items import CompactItem, Item
 from umt_craftsim.service.exceptions import InvalidItemTypeError, TagConflictError, TagMissingError
 
 
@@ -66,7 +67,7 @@ class TransformationHelperMixin:
         Raises:
             TagConflictError: If the prohibited tag is present
         """
-        if tag in item.tags:
+        if item.has_tag(tag):
             raise TagConflictError(tag, item)
 
     @staticmethod
@@ -83,7 +84,7 @@ class TransformationHelperMixin:
         """
         for item in items:
             for tag in tags:
-                if tag in item.tags:
+                if item.has_tag(tag):
                     raise TagConflictError(tag, item)
 
     @staticmethod
@@ -98,7 +99,7 @@ class TransformationHelperMixin:
         Raises:
             TagMissingError: If the required tag is absent
         """
-        if tag not in item.tags:
+        if not item.has_tag(tag):
             raise TagMissingError(tag, item)
 
     @staticmethod
@@ -115,7 +116,7 @@ class TransformationHelperMixin:
         """
         for item in items:
             for tag in tags:
-                if tag not in item.tags:
+                if not item.has_tag(tag):
                     raise TagMissingError(tag, item)
 
     @staticmethod
@@ -127,7 +128,9 @@ class TransformationHelperMixin:
         - Value: Sum of all item values
         - Materials: Sum of all material costs
         - Tags: Union of all unique tags
-        - Sequence: List of all item sequences
+        - Sequence: Merge node of all item sequences, shared, not copied
+
+        If all items are CompactItem, result is CompactItem and tags union is bitwise or.
 
         Args:
             items: List of items to aggregate
@@ -135,9 +138,19 @@ class TransformationHelperMixin:
         Returns:
             Item: New item containing aggregated properties
         """
+        if all(item.__class__ is CompactItem for item in items):
+            tag_mask = 0
+            for item in items:
+                tag_mask |= item.tag_mask
+            return CompactItem(
+                value=sum(item.value for item in items),
+                materials=sum(item.materials for item in items),
+                tags=tag_mask,
+                sequence=HistoryNode.merge(item.sequence for item in items),
+            )
         return Item(
             value=sum(item.value for item in items),
             materials=sum(item.materials for item in items),
             tags=list(set(items[0].tags).union(*[item.tags for item in items[1:]])),
-            sequence=[item.sequence for item in items],
+            sequence=HistoryNode.merge(item.sequence for item in items),
         )
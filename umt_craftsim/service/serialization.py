@@ -0,0 +1,445 @@
+"""
+Compact versioned binary format of items and their crafting histories.\n
+File is header, fixed-width item records, string table, history node table and merged\n
+children table. Record stores item_type, value, materials, dustwork_type, tags bitmask\n
+and index of history node, strings (item types, dust types, machines) are interned\n
+into one table and every shared sub-history (HistoryNode) is stored once, as shared\n
+node is stored once in memory.\n
+ItemWriter streams records to file and writes tables on close(), ItemReader maps file\n
+into memory and decodes only records (and history nodes) which are accessed.\n
+Tags are stored as TagFlags bitmask, Item whose tags aren't in Tags declaration order also\n
+stores its tag order as interned string, so loaded Item is equal to written one.\n
+Example:
+    ```
+    with ItemWriter("items.umti") as writer:
+        for item in items:
+            writer.write(item)
+    with ItemReader("items.umti") as reader:
+        print(len(reader), reader[12345].table_full())
+    ```
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import BinaryIO
+
+from umt_craftsim.constants import DustTypes, ItemTypes, Machines, Tags
+from umt_craftsim.dataclasses.history import EMPTY_HISTORY, HistoryNode
+from umt_craftsim.dataclasses.items import CompactItem, Item, mask_to_tags
+
+FORMAT_VERSION = 2
+# version 1 files have no tag orders, they are read as Item tags in declaration order
+_READABLE_VERSIONS = (1, FORMAT_VERSION)
+MAGIC = b"UMTI"
+
+# magic, version, record size, flags, record count, strings offset, nodes offset, node count,
+# children offset, children count
+_HEADER = struct.Struct("<4sHHI6Q4x")
+# value, materials, tags bitmask, item_type string, dustwork_type string, history node,
+# flags in low byte and tag order string + 1 (0 is declaration order) in high 3 bytes
+_RECORD = struct.Struct("<qdQIIII")
+_COMPACT = 1  # record is CompactItem
+_FLOAT_VALUE = 2  # value is float, its bits are stored in value field
+_TAG_ORDER_SHIFT = 8
+_TAG_SEPARATOR = "\x1e"
+_FLOAT = struct.Struct("<d")
+_INTEGER = struct.Struct("<q")
+# step string (-1 for merge and empty nodes), parent node (-1 for empty history),
+# first merged child, number of merged children
+_NODE = struct.Struct("<iiII")
+_LENGTH = struct.Struct("<I")
+# records decoded by one read of mapped file during iteration
+_CHUNK_RECORDS = 4096
+
+# decoded strings are same enum members, as in items made by transformations
+_MEMBERS: dict[str, str] = {
+    str(member): member for enum in (ItemTypes, DustTypes, Machines) for member in enum
+}
+_TAGS: dict[str, str] = {str(tag): tag for tag in Tags}
+
+
+class ItemWriter:
+    """
+    Streaming writer of binary item file.\n
+    Records are written as items come, tables of strings and history nodes are kept\n
+    in memory and appended by close(), which also fills header. File must be seekable.\n
+    Attributes:
+        count (int): number of written items
+    """
+
+    def __init__(self, file: str | os.PathLike | BinaryIO, buffer_records: int = 4096):
+        """ItemWriter init.
+
+        Args:
+            file (str | os.PathLike | BinaryIO): path, or binary file opened for writing
+            buffer_records (int): records collected before one write() to file. Defaults to 4096.
+
+        Raises:
+            ValueError: if buffer_records is less than 1
+        """
+        if buffer_records < 1:
+            raise ValueError(f"buffer_records must be positive, got {buffer_records}")
+        self._owns_file = isinstance(file, (str, os.PathLike))
+        self._file: BinaryIO = open(file, "wb") if self._owns_file else file  # type: ignore
+        self._start = self._file.tell()
+        self._buffer = bytearray()
+        self._buffer_size = buffer_records * _RECORD.size
+        self._strings: dict[str, int] = {}
+        self._nodes: dict[HistoryNode, int] = {EMPTY_HISTORY: 0}
+        self._node_table = bytearray(_NODE.pack(-1, -1, 0, 0))
+        self._children = array("I")
+        # tag order bits of record by tags of Item
+        self._tag_orders: dict[tuple[str, ...], int] = {}
+        self.count = 0
+        self._closed = False
+        # header is written again by close(), zero counts mark unfinished file
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, _RECORD.size, 0, 0, 0, 0, 0, 0, 0))
+
+    def _string(self, string: str) -> int:
+        index = self._strings.get(string)
+        if index is None:
+            index = self._strings[string] = len(self._strings)
+        return index
+
+    def _node(self, node: HistoryNode) -> int:
+        """Index of node in node table, missing node and sub-histories are added, inputs first."""
+        index = self._nodes.get(node)
+        if index is not None:
+            return index
+        nodes = self._nodes
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in nodes:
+                stack.pop()
+                continue
+            missing = [child for child in (current.parent, *current.merged) if child not in nodes]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            step = -1 if current.step is None else self._string(current.step)
+            self._node_table += _NODE.pack(
+                step, nodes[current.parent], len(self._children), len(current.merged)
+            )
+            self._children.extend(nodes[child] for child in current.merged)
+            nodes[current] = len(nodes)
+        return nodes[node]
+
+    def _tag_order(self, tags: tuple[str, ...], mask: int) -> int:
+        """Tag order bits of record, tags not in declaration order are interned as string."""
+        if tags == mask_to_tags(mask):
+            return 0
+        order = self._string(_TAG_SEPARATOR.join(map(str, tags))) + 1
+        if order >> (32 - _TAG_ORDER_SHIFT):
+            raise ValueError("Too many distinct tag orders for one item file")
+        return order << _TAG_ORDER_SHIFT
+
+    def write(self, item: Item | CompactItem) -> int:
+        """Appends item to file.
+
+        Args:
+            item (Item | CompactItem): item to store
+
+        Raises:
+            ValueError: if writer is closed or value doesn't fit into 64 bit integer
+            ItemValidationError: if item has tag which is not one of Tags
+
+        Returns:
+            int: index of item in file
+        """
+        if self._closed:
+            raise ValueError("ItemWriter is closed")
+        value = item.value
+        mask = item.tag_mask
+        if item.__class__ is CompactItem:
+            flags = _COMPACT
+        else:
+            tags = tuple(item.tags)
+            flags = self._tag_orders.get(tags)
+            if flags is None:
+                flags = self._tag_orders[tags] = self._tag_order(tags, mask)
+        if value.__class__ is float:
+            (value,) = _INTEGER.unpack(_FLOAT.pack(value))
+            flags |= _FLOAT_VALUE
+        try:
+            self._buffer += _RECORD.pack(
+                value,
+                item.materials,
+                mask,
+                self._string(item.item_type),
+                self._string(item.dustwork_type),
+                self._node(item.sequence),  # type: ignore
+                flags,
+            )
+        except struct.error as error:
+            raise ValueError(f"Item can't be stored in binary record: {error}") from error
+        if len(self._buffer) >= self._buffer_size:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+        self.count += 1
+        return self.count - 1
+
+    def write_many(self, items: Iterable[Item | CompactItem]) -> int:
+        """Appends every item to file.
+
+        Args:
+            items (Iterable[Item | CompactItem]): items to store
+
+        Returns:
+            int: number of items written by this call
+        """
+        start = self.count
+        for item in items:
+            self.write(item)
+        return self.count - start
+
+    def close(self):
+        """Writes buffered records, tables and final header, closes file opened by writer."""
+        if self._closed:
+            return
+        self._closed = True
+        file = self._file
+        file.write(self._buffer)
+        self._buffer.clear()
+
+        strings_offset = file.tell() - self._start
+        table = bytearray(_LENGTH.pack(len(self._strings)))
+        for string in self._strings:
+            data = str(string).encode()
+            table += _LENGTH.pack(len(data))
+            table += data
+        file.write(table)
+        nodes_offset = file.tell() - self._start
+        file.write(self._node_table)
+        children_offset = file.tell() - self._start
+        if sys.byteorder != "little":
+            self._children.byteswap()
+        file.write(self._children.tobytes())
+        end = file.tell()
+
+        file.seek(self._start)
+        file.write(
+            _HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                _RECORD.size,
+                0,
+                self.count,
+                strings_offset,
+                nodes_offset,
+                len(self._nodes),
+                children_offset,
+                len(self._children),
+            )
+        )
+        file.seek(end)
+        if self._owns_file:
+            file.close()
+        else:
+            file.flush()
+
+    def __enter__(self) -> "ItemWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ItemReader(Sequence):
+    """
+    Random access reader of binary item file, file is memory-mapped.\n
+    Records and history nodes are decoded on access, decoded nodes are cached,\n
+    so items sharing sub-history get same HistoryNode objects, as when they were written.\n
+    Supports len(), indexing, slicing and iteration.\n
+    Attributes:
+        version (int): format version of file
+    """
+
+    def __init__(self, file: str | os.PathLike):
+        """ItemReader init.
+
+        Args:
+            file (str | os.PathLike): path of file made by ItemWriter
+
+        Raises:
+            ValueError: if file isn't item file, is unfinished or has unsupported version
+        """
+        with open(file, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < _HEADER.size:
+            raise ValueError("File is too short to be item file")
+        (
+            magic,
+            self.version,
+            record_size,
+            _,
+            self._count,
+            strings_offset,
+            self._nodes_offset,
+            node_count,
+            self._children_offset,
+            _,
+        ) = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"Not an item file, magic is {magic!r}")
+        if self.version not in _READABLE_VERSIONS:
+            raise ValueError(
+                f"Item file version {self.version} is not supported, expected {FORMAT_VERSION}"
+            )
+        if record_size != _RECORD.size:
+            raise ValueError(f"Record size {record_size} doesn't match format, file is damaged")
+        if not strings_offset:
+            raise ValueError("Item file is unfinished, ItemWriter wasn't closed")
+
+        (count,) = _LENGTH.unpack_from(self._map, strings_offset)
+        position = strings_offset + _LENGTH.size
+        self._strings: list[str] = []
+        for _ in range(count):
+            (length,) = _LENGTH.unpack_from(self._map, position)
+            position += _LENGTH.size
+            string = self._map[position : position + length].decode()
+            self._strings.append(_MEMBERS.get(string, string))
+            position += length
+        self._histories: list[HistoryNode | None] = [None] * node_count
+        if node_count:
+            self._histories[0] = EMPTY_HISTORY
+        # decoded tag orders by string index + 1
+        self._tag_orders: dict[int, tuple[str, ...]] = {}
+
+    def history(self, index: int) -> HistoryNode:
+        """History node by index in node table, sub-histories are decoded first.
+
+        Args:
+            index (int): index of node
+
+        Returns:
+            HistoryNode: canonical node of history
+        """
+        histories = self._histories
+        node = histories[index]
+        if node is not None:
+            return node
+        stack = [index]
+        while stack:
+            current = stack[-1]
+            if histories[current] is not None:
+                stack.pop()
+                continue
+            step, parent, first, count = _NODE.unpack_from(
+                self._map, self._nodes_offset + current * _NODE.size
+            )
+            children = struct.unpack_from(
+                f"<{count}I", self._map, self._children_offset + first * 4
+            )
+            missing = [child for child in (parent, *children) if histories[child] is None]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            parent_node: HistoryNode = histories[parent]  # type: ignore
+            if step >= 0:
+                histories[current] = parent_node.add_step(self._strings[step])
+            else:
+                histories[current] = parent_node.extend(histories[child] for child in children)
+        return histories[index]  # type: ignore
+
+    def _item(self, record: tuple) -> Item | CompactItem:
+        value, materials, mask, item_type, dustwork_type, history, flags = record
+        strings = self._strings
+        if flags & _FLOAT_VALUE:
+            (value,) = _FLOAT.unpack(_INTEGER.pack(value))
+        if flags & _COMPACT:
+            return CompactItem(
+                strings[item_type],
+                value,
+                materials,
+                strings[dustwork_type],
+                mask,
+                self.history(history),
+            )
+        order = flags >> _TAG_ORDER_SHIFT
+        return Item(
+            strings[item_type],
+            value,
+            materials,
+            strings[dustwork_type],
+            list(self._tag_order(order) if order else mask_to_tags(mask)),
+            self.history(history),
+        )
+
+    def _tag_order(self, order: int) -> tuple[str, ...]:
+        """Tags of Item stored in own order, by string index + 1."""
+        tags = self._tag_orders.get(order)
+        if tags is None:
+            tags = self._tag_orders[order] = tuple(
+                _TAGS[tag] for tag in self._strings[order - 1].split(_TAG_SEPARATOR)
+            )
+        return tags
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"item index {index} out of range")
+        return self._item(_RECORD.unpack_from(self._map, _HEADER.size + index * _RECORD.size))
+
+    def __iter__(self) -> Iterator[Item | CompactItem]:
+        end = _HEADER.size + self._count * _RECORD.size
+        for start in range(_HEADER.size, end, _CHUNK_RECORDS * _RECORD.size):
+            chunk = self._map[start : min(end, start + _CHUNK_RECORDS * _RECORD.size)]
+            for record in _RECORD.iter_unpack(chunk):
+                yield self._item(record)
+
+    def close(self):
+        """Unmaps file, items read already stay valid."""
+        self._map.close()
+
+    def __enter__(self) -> "ItemReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def dump_items(items: Iterable[Item | CompactItem], file: str | os.PathLike | BinaryIO) -> int:
+    """Writes items into binary item file, shortcut for ItemWriter.write_many().
+
+    Args:
+        items (Iterable[Item | CompactItem]): items to store
+        file (str | os.PathLike | BinaryIO): path, or seekable binary file opened for writing
+
+    Returns:
+        int: number of written items
+    """
+    with ItemWriter(file) as writer:
+        return writer.write_many(items)
+
+
+def load_items(file: str | os.PathLike) -> list[Item | CompactItem]:
+    """Reads every item of binary item file.
+
+    Args:
+        file (str | os.PathLike): path of file made by ItemWriter
+
+    Returns:
+        list[Item | CompactItem]: items in written order, same classes as written
+    """
+    with ItemReader(file) as reader:
+        return list(reader)
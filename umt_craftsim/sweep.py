@@ -0,0 +1,245 @@
+"""
+Catalog-wide sweep of recipes.\n
+sweep() crafts every Ores and Gems entry with every given recipe on process pool, one job per\n
+catalog entry (item is created inside worker), and merges results into columnar SweepTable,\n
+ranked by final value and by value_per_materials, instead of one print() per crafted item.\n
+Recipe is machine set, processed by ItemFactory.process_mats_simple(), or module-level\n
+function Item -> Item (process pool pickles it).\n
+Example:
+    ```
+    report = sweep({
+        "smelt": [Machines.ORE_CLEANER, Machines.POLISHER, Machines.ORE_SMELTER],
+        "alloy": [Machines.ORE_SMELTER, Machines.ALLOY_FURNACE, Machines.TEMPERING_FORGE],
+    })
+    print(report.by_value.format(limit=10))
+    print(report.summary())
+    ```
+"""
+
+import time
+from functools import partial
+from typing import Callable, Iterable, Iterator, Mapping, NamedTuple
+
+from umt_craftsim.constants import Gems, Ores
+from umt_craftsim.dataclasses.items import Item
+from umt_craftsim.executors import ParallelExecutor
+from umt_craftsim.item_factory import ItemFactory
+
+Recipe = Iterable[str] | Callable[[Item], Item]
+
+
+class SweepTable:
+    """
+    Columnar table of sweep results, one list per column, rows share index.\n
+    Attributes:
+        COLUMNS (tuple[str, ...]): column names, in row order
+        columns (dict[str, list]): values of every column
+    """
+
+    COLUMNS = ("entry", "recipe", "item_type", "value", "materials", "value_per_materials")
+    _HEADERS = ("Entry", "Recipe", "Type", "Val", "Mats", "VPM")
+
+    def __init__(self, columns: dict[str, list] | None = None):
+        """SweepTable init.
+
+        Args:
+            columns (dict[str, list] | None): values of every column, None for empty table. Defaults to None.
+        """
+        self.columns = {name: list((columns or {}).get(name, ())) for name in self.COLUMNS}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "SweepTable":
+        """Creates table from rows, values in COLUMNS order.
+
+        Args:
+            rows (Iterable[tuple]): rows of table
+
+        Returns:
+            SweepTable: table with given rows
+        """
+        return cls(dict(zip(cls.COLUMNS, map(list, zip(*rows)))))
+
+    def __len__(self) -> int:
+        return len(self.columns["entry"])
+
+    def rows(self) -> Iterator[tuple]:
+        """Rows of table, values in COLUMNS order."""
+        return zip(*self.columns.values())
+
+    def sorted_by(self, column: str, descending: bool = True) -> "SweepTable":
+        """New table with rows sorted by column, ties keep catalog order.
+
+        Args:
+            column (str): one of COLUMNS
+            descending (bool): highest first. Defaults to True.
+
+        Raises:
+            KeyError: if column is not one of COLUMNS
+
+        Returns:
+            SweepTable: sorted table
+        """
+        values = self.columns[column]
+        order = sorted(range(len(values)), key=values.__getitem__, reverse=descending)
+        return SweepTable({name: [data[i] for i in order] for name, data in self.columns.items()})
+
+    def head(self, count: int) -> "SweepTable":
+        """New table with first count rows."""
+        return SweepTable({name: data[:count] for name, data in self.columns.items()})
+
+    def format(self, limit: int | None = None) -> str:
+        """Aligned text table, one line per row after header.
+
+        Args:
+            limit (int | None): maximum number of rows, None for all. Defaults to None.
+
+        Returns:
+            str: formatted table
+        """
+        cells = [self._HEADERS] + [
+            (
+                entry,
+                recipe,
+                item_type,
+                f"{value}",
+                f"{materials:.1f}",
+                f"{value_per_materials:.2f}",
+            )
+            for entry, recipe, item_type, value, materials, value_per_materials in self.head(
+                len(self) if limit is None else limit
+            ).rows()
+        ]
+        widths = [max(len(row[index]) for row in cells) for index in range(len(self._HEADERS))]
+        lines = []
+        for row in cells:
+            text = [f"{row[index]:<{widths[index]}}" for index in range(3)]
+            text += [f"{row[index]:>{widths[index]}}" for index in range(3, len(row))]
+            lines.append(" | ".join(text))
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+
+class SweepReport(NamedTuple):
+    """Result of sweep().\n
+    Attributes:
+        table (SweepTable): successful crafts, in catalog and recipes order
+        by_value (SweepTable): table sorted by final value
+        by_value_per_materials (SweepTable): table sorted by value_per_materials
+        errors (list[tuple[str, str, str]]): (entry, recipe, error) of failed crafts
+        crafts (int): number of recipe runs, failed included
+        seconds (float): wall time of sweep
+        workers (int): number of pool workers
+        mode (str): executor mode
+    """
+
+    table: SweepTable
+    by_value: SweepTable
+    by_value_per_materials: SweepTable
+    errors: list[tuple[str, str, str]]
+    crafts: int
+    seconds: float
+    workers: int
+    mode: str
+
+    @property
+    def crafts_per_second(self) -> float:
+        """Throughput of sweep, recipe runs per second of wall time."""
+        return self.crafts / self.seconds if self.seconds else 0
+
+    def summary(self) -> str:
+        """One line throughput report.
+
+        Returns:
+            str: crafts, failures, time, workers and crafts/sec
+        """
+        return (
+            f"{self.crafts} crafts ({len(self.errors)} failed) in {self.seconds:.3f}s "
+            f"on {self.workers} {self.mode} workers: {self.crafts_per_second:,.0f} crafts/sec"
+        )
+
+
+def catalog(ores: bool = True, gems: bool = True) -> list[Ores | Gems]:
+    """Entries of catalog, ores first, in constants declaration order.
+
+    Args:
+        ores (bool): include every Ores entry. Defaults to True.
+        gems (bool): include every Gems entry. Defaults to True.
+
+    Returns:
+        list[Ores | Gems]: catalog entries
+    """
+    return (list(Ores) if ores else []) + (list(Gems) if gems else [])
+
+
+def _sweep_entry(
+    recipes: tuple[tuple[str, Recipe], ...], entry: Ores | Gems
+) -> tuple[list[tuple], list[tuple[str, str, str]]]:
+    """Worker job of sweep(), crafts one catalog entry with every recipe."""
+    if isinstance(entry, Ores):
+        item = ItemFactory.create_ore(entry)
+    else:
+        item = ItemFactory.create_gem(entry)
+    name = entry.name.capitalize()
+    rows = []
+    errors = []
+    for recipe_name, recipe in recipes:
+        try:
+            if callable(recipe):
+                crafted = recipe(item)
+            else:
+                crafted = ItemFactory.process_mats_simple(item, recipe)  # type: ignore
+        except Exception as error:
+            # one bad combination, as Ore Upgrader on last ore, must not stop whole sweep
+            errors.append((name, recipe_name, f"{type(error).__name__}: {error}"))
+            continue
+        rows.append(
+            (
+                name,
+                recipe_name,
+                str(crafted.item_type),
+                crafted.value,
+                crafted.materials,
+                crafted.value_per_materials,
+            )
+        )
+    return rows, errors
+
+
+def sweep(
+    recipes: Mapping[str, Recipe],
+    entries: Iterable[Ores | Gems] | None = None,
+    executor: ParallelExecutor | None = None,
+) -> SweepReport:
+    """Crafts every catalog entry with every recipe and ranks results.
+
+    Args:
+        recipes (Mapping[str, Recipe]): recipe name to machine set or module-level function
+        entries (Iterable[Ores | Gems] | None): catalog entries, None for every ore and gem. Defaults to None.
+        executor (ParallelExecutor | None): executor of jobs, None uses process pool
+            with one entry per job. Defaults to None.
+
+    Returns:
+        SweepReport: ranking tables, errors and throughput
+    """
+    executor = executor or ParallelExecutor(mode="process", chunksize=1)
+    entries = catalog() if entries is None else list(entries)
+    recipe_items = tuple(
+        (name, recipe if callable(recipe) else tuple(recipe)) for name, recipe in recipes.items()
+    )
+    started = time.perf_counter()
+    shards = executor.map(partial(_sweep_entry, recipe_items), entries)
+    seconds = time.perf_counter() - started
+
+    table = SweepTable.from_rows(row for rows, _ in shards for row in rows)
+    return SweepReport(
+        table=table,
+        by_value=table.sorted_by("value"),
+        by_value_per_materials=table.sorted_by("value_per_materials"),
+        errors=[error for _, errors in shards for error in errors],
+        crafts=len(entries) * len(recipe_items),
+        seconds=seconds,
+        workers=1 if executor.mode == "serial" else executor.workers,
+        mode=executor.mode,
+    )
@@ -0,0 +1,226 @@
+"""
+Chrome trace export of recipe graph executions.\n
+Inside trace_recipes() block every machine node computed by RecipeGraph (execute(),\n
+IncrementalEvaluator, ParallelExecutor threads) is written as complete ("X") event with machine\n
+name, graph and node ids, input node ids, output item_type and duration, every execute() call\n
+is span around its nodes. Events of each thread are on own row, so trace viewer shows\n
+parallel branches side by side and longest chain of nodes as critical path.\n
+Events are written in batches of buffer_size, so memory doesn't grow with number of nodes.\n
+Open file in chrome://tracing, https://ui.perfetto.dev or speedscope (flame graph).\n
+Outside of block RecipeGraph methods are original, tracing costs nothing.\n
+Example:
+    ```
+    with trace_recipes("power_core.trace.json"):
+        ParallelExecutor(mode="thread", workers=4).execute(graph, power_core)
+    ```
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from itertools import count
+from time import perf_counter_ns
+from typing import Iterator
+from weakref import WeakKeyDictionary
+
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.recipe_graph import RecipeGraph, RecipeNode
+
+
+class TraceWriter:
+    """
+    Streaming writer of Chrome trace-event JSON array.\n
+    Attributes:
+        path (str): output file
+        buffer_size (int): number of events written at once
+        events (int): number of events written or buffered
+    """
+
+    def __init__(self, path: str | os.PathLike, buffer_size: int = 10_000):
+        """TraceWriter init, creates file.
+
+        Args:
+            path (str | os.PathLike): output file
+            buffer_size (int): number of events written at once. Defaults to 10_000.
+
+        Raises:
+            ValueError: if buffer_size is less than 1
+        """
+        if buffer_size < 1:
+            raise ValueError(f"buffer_size must be positive, got {buffer_size}")
+        self.path = os.fspath(path)
+        self.buffer_size = buffer_size
+        self.events = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[")
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._threads: set[int] = set()
+        self._graphs: WeakKeyDictionary = WeakKeyDictionary()
+        # dictionary shrinks when graphs are collected, so ids aren't taken from its length
+        self._graph_ids = count()
+        # timestamps are relative to writer creation
+        self._origin = perf_counter_ns()
+
+    def _emit(self, event: str):
+        """Buffers serialized event, call under lock."""
+        self._buffer.append(event)
+        self.events += 1
+        if len(self._buffer) >= self.buffer_size:
+            self._write()
+
+    def _write(self):
+        if self._buffer:
+            separator = ",\n" if self.events > len(self._buffer) else "\n"
+            self._file.write(separator + ",\n".join(self._buffer))
+            self._buffer.clear()
+
+    def _thread(self) -> int:
+        """Id of current thread, its name is written with first event of thread. Call under lock."""
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads.add(tid)
+            name = json.dumps(threading.current_thread().name)
+            self._emit(
+                f'{{"name":"thread_name","ph":"M","pid":{self._pid},"tid":{tid},'
+                f'"args":{{"name":{name}}}}}'
+            )
+        return tid
+
+    def graph_id(self, graph: RecipeGraph) -> int:
+        """Number of graph in trace, graphs are numbered from 0 in order of first event."""
+        with self._lock:
+            number = self._graphs.get(graph)
+            if number is None:
+                number = self._graphs[graph] = next(self._graph_ids)
+            return number
+
+    def span(self, name: str, category: str, started: int, args: str = "{}"):
+        """Writes complete event which started at perf_counter_ns() value and ends now.
+
+        Args:
+            name (str): event name
+            category (str): event category
+            started (int): perf_counter_ns() at start of event
+            args (str): serialized JSON object of event arguments. Defaults to "{}".
+        """
+        finished = perf_counter_ns()
+        with self._lock:
+            if self._file.closed:
+                return
+            tid = self._thread()
+            timestamp = (started - self._origin) / 1000
+            duration = (finished - started) / 1000
+            self._emit(
+                f'{{"name":{json.dumps(str(name))},"cat":"{category}","ph":"X",'
+                f'"ts":{timestamp:.3f},"dur":{duration:.3f},'
+                f'"pid":{self._pid},"tid":{tid},"args":{args}}}'
+            )
+
+    def node(
+        self,
+        graph: RecipeGraph,
+        node: RecipeNode,
+        started: int,
+        item: Item | CompactItem | None,
+        error: BaseException | None = None,
+    ):
+        """Writes event of computed node.
+
+        Args:
+            graph (RecipeGraph): graph of node
+            node (RecipeNode): computed node
+            started (int): perf_counter_ns() at start of computation
+            item (Item | CompactItem | None): output, None if computation failed
+            error (BaseException | None): error of failed computation. Defaults to None.
+        """
+        inputs = ",".join(str(child.index) for child in node.inputs)
+        result = (
+            f'"output":{json.dumps(str(item.item_type))}'
+            if item is not None
+            else f'"error":{json.dumps(type(error).__name__)}'
+        )
+        graph_id = self.graph_id(graph)
+        args = f'{{"graph":{graph_id},"node":{node.index},"inputs":[{inputs}],{result}}}'
+        self.span(node.machine, "node", started, args)
+
+    def flush(self):
+        """Writes buffered events into file."""
+        with self._lock:
+            if not self._file.closed:
+                self._write()
+                self._file.flush()
+
+    def close(self):
+        """Writes buffered events and closes JSON array, later events are dropped."""
+        with self._lock:
+            if not self._file.closed:
+                self._write()
+                self._file.write("\n]\n")
+                self._file.close()
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_tracing_lock = threading.Lock()
+_writer: TraceWriter | None = None
+
+
+@contextmanager
+def trace_recipes(path: str | os.PathLike, buffer_size: int = 10_000) -> Iterator[TraceWriter]:
+    """Writes every recipe graph node computed inside with block into Chrome trace file.
+
+    Args:
+        path (str | os.PathLike): output file
+        buffer_size (int): number of events written at once. Defaults to 10_000.
+
+    Raises:
+        RuntimeError: if other trace_recipes() block is active
+
+    Yields:
+        TraceWriter: writer, its span() adds custom events
+    """
+    global _writer
+    with _tracing_lock:
+        if _writer is not None:
+            raise RuntimeError(f"Recipes are already traced into {_writer.path}")
+        writer = _writer = TraceWriter(path, buffer_size)
+    run_node = RecipeGraph.run_node
+    execute = RecipeGraph.execute
+
+    def traced_run_node(graph, node, values, trusted=False):
+        if node.is_input:
+            return run_node(graph, node, values, trusted)
+        started = perf_counter_ns()
+        try:
+            item = run_node(graph, node, values, trusted)
+        except Exception as error:
+            writer.node(graph, node, started, None, error)
+            raise
+        writer.node(graph, node, started, item)
+        return item
+
+    def traced_execute(graph, *outputs, trusted=False):
+        started = perf_counter_ns()
+        try:
+            return execute(graph, *outputs, trusted=trusted)
+        finally:
+            args = f'{{"graph":{writer.graph_id(graph)},"outputs":{len(outputs)}}}'
+            writer.span("execute", "graph", started, args)
+
+    RecipeGraph.run_node = traced_run_node  # type: ignore
+    RecipeGraph.execute = traced_execute  # type: ignore
+    try:
+        yield writer
+    finally:
+        RecipeGraph.run_node = run_node  # type: ignore
+        RecipeGraph.execute = execute  # type: ignore
+        writer.close()
+        with _tracing_lock:
+            _writer = None
@@ -0,0 +1,38 @@
+"""
+Machines: declarative specs, compiled engine, transformation classes and their registry.\n
+Attributes are loaded on first access (PEP 562), transformation classes are loaded\n
+by TransformationRegistry only when machine is used first time.
+"""
+
+from importlib import import_module
+
+# attribute -> module it is defined in
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "TransformationRegistry": "umt_craftsim.transformations.transformation_registry",
+    "MACHINE_SPECS": "umt_craftsim.transformations.machine_specs",
+    "InputSpec": "umt_craftsim.transformations.machine_specs",
+    "MachineSpec": "umt_craftsim.transformations.machine_specs",
+    "CompiledMachine": "umt_craftsim.transformations.engine",
+    "TransformationCache": "umt_craftsim.transformations.memoization",
+    "ItemState": "umt_craftsim.transformations.plan_checker",
+    "check_chain": "umt_craftsim.transformations.plan_checker",
+    "check_machine": "umt_craftsim.transformations.plan_checker",
+    "check_recipe": "umt_craftsim.transformations.plan_checker",
+    "InstrumentationStats": "umt_craftsim.transformations.instrumentation",
+    "instrument": "umt_craftsim.transformations.instrumentation",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,501 @@
+"""
+Engine executing declarative machine specs.\n
+Every MachineSpec is compiled once into CompiledMachine, which precomputes\n
+type sets, tag bitmasks, value formula and output type, and then runs one\n
+generic code path per craft, without class dispatch and helper calls.\n
+Example:
+    ```
+    bar = run(Machines.ORE_SMELTER, ore)
+    alloy = run(Machines.ALLOY_FURNACE, bar, bar)
+    ```
+"""
+
+from typing import TYPE_CHECKING, Callable
+
+from umt_craftsim.constants import TAG_FLAGS
+from umt_craftsim.dataclasses.history import HistoryNode
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.service.exceptions import (
+    InvalidItemTypeError,
+    ItemProcessingError,
+    TagConflictError,
+    TagMissingError,
+)
+from umt_craftsim.transformations.machine_specs import MACHINE_SPECS, InputSpec, MachineSpec
+
+if TYPE_CHECKING:
+    from umt_craftsim.dataclasses.batch import ItemBatch
+
+# plain int bits of tags, & with TagFlags member is slow enum operation
+_TAG_BITS: dict[str, int] = {tag: int(flag) for tag, flag in TAG_FLAGS.items()}
+
+
+def _validate_batch_type(batch: "ItemBatch", spec: InputSpec):
+    if len(spec.types) == 1:
+        batch.validate_type(spec.types[0])
+    elif spec.types:
+        batch.validate_multiple_types(list(spec.types))
+
+
+def _validate_batch_tags(batch: "ItemBatch", spec: InputSpec):
+    for tag in spec.required_tags:
+        batch.validate_tag_present(tag)
+    for tag in spec.forbidden_tags:
+        batch.validate_tag_absence(tag)
+
+
+class CompiledMachine:
+    """
+    MachineSpec prepared for fast execution.\n
+    Call run(*items) for items or run_batch(*batches) for ItemBatch objects.\n
+    run_trusted(*items) skips validation, use it only for inputs proven valid by plan_checker.\n
+    Attributes:
+        spec (MachineSpec): source spec
+        machine (str): machine name
+        arity (int): number of inputs
+    """
+
+    __slots__ = (
+        "spec",
+        "machine",
+        "arity",
+        "run",
+        "run_trusted",
+        "_types",
+        "_expected",
+        "_required",
+        "_forbidden",
+        "_required_masks",
+        "_forbidden_masks",
+        "_types_first",
+        "_tags_first",
+        "_output_type",
+        "_output_type_from",
+        "_add_tag",
+        "_add_tags",
+        "_add_mask",
+        "_multiplier",
+        "_scaled",
+        "_rounding",
+        "_offset",
+        "_materials_multiplier",
+    )
+
+    def __init__(self, spec: MachineSpec):
+        """Precomputes everything transformation needs from spec.
+
+        Args:
+            spec (MachineSpec): machine description
+        """
+        self.spec = spec
+        self.machine = spec.machine
+        self.arity = len(spec.inputs)
+        self._types = tuple(frozenset(i.types) if i.types else None for i in spec.inputs)
+        self._expected = tuple(
+            (i.types[0] if len(i.types) == 1 else list(i.types)) for i in spec.inputs
+        )
+        self._required = tuple(i.required_tags for i in spec.inputs)
+        self._forbidden = tuple(i.forbidden_tags for i in spec.inputs)
+        self._required_masks = tuple(_mask(i.required_tags) for i in spec.inputs)
+        self._forbidden_masks = tuple(_mask(i.forbidden_tags) for i in spec.inputs)
+        self._types_first = spec.types_first
+        self._tags_first = spec.tags_first
+        self._output_type = spec.output_type
+        self._output_type_from = spec.output_type_from
+        self._add_tag = spec.add_tag
+        self._add_tags = [spec.add_tag] if spec.add_tag is not None else []
+        self._add_mask = _mask(self._add_tags)
+        self._multiplier = spec.multiplier
+        self._scaled = spec.multiplier != 1
+        self._rounding = spec.rounding
+        self._offset = spec.offset
+        self._materials_multiplier = spec.materials_multiplier
+        self.run = self._run_single if self.arity == 1 else self._run_multiple
+        self.run_trusted = self._trusted_single if self.arity == 1 else self._trusted_multiple
+
+    def _value(self, value):
+        """Value formula of spec."""
+        if self._scaled:
+            value = value * self._multiplier
+            if self._rounding:
+                value = round(value)
+        return value + self._offset
+
+    def _validate(self, items):
+        """Checks type and tags of every input in turn, or types of all inputs before any tags
+        (tags before types) when spec has types_first (tags_first), as transformation classes do.
+
+        Raises:
+            InvalidItemTypeError: if input type is not accepted
+            TagMissingError: if input has no required tag
+            TagConflictError: if input has prohibited tag
+        """
+        if self._types_first:
+            for index, item in enumerate(items):
+                self._validate_type(index, item)
+            for index, item in enumerate(items):
+                self._validate_tags(index, item)
+        elif self._tags_first:
+            for index, item in enumerate(items):
+                self._validate_tags(index, item)
+            for index, item in enumerate(items):
+                self._validate_type(index, item)
+        else:
+            for index, item in enumerate(items):
+                self._validate_type(index, item)
+                self._validate_tags(index, item)
+
+    def _validate_type(self, index: int, item: Item):
+        types = self._types[index]
+        if types is not None and item.item_type not in types:
+            raise InvalidItemTypeError(self._expected[index], item.item_type, item)
+
+    def _validate_tags(self, index: int, item: Item):
+        if item.__class__ is CompactItem:
+            mask = item.tag_mask
+            required_mask = self._required_masks[index]
+            if mask & required_mask != required_mask:
+                for tag in self._required[index]:
+                    if not mask & _TAG_BITS[tag]:
+                        raise TagMissingError(tag, item)
+            if mask & self._forbidden_masks[index]:
+                for tag in self._forbidden[index]:
+                    if mask & _TAG_BITS[tag]:
+                        raise TagConflictError(tag, item)
+        else:
+            tags = item.tags
+            for tag in self._required[index]:
+                if tag not in tags:
+                    raise TagMissingError(tag, item)
+            for tag in self._forbidden[index]:
+                if tag in tags:
+                    raise TagConflictError(tag, item)
+
+    def _run_single(self, item: Item) -> Item:
+        """Transformation of single input machine."""
+        if self._tags_first:
+            self._validate((item,))
+            return self._trusted_single(item)
+        types = self._types[0]
+        if types is not None and item.item_type not in types:
+            raise InvalidItemTypeError(self._expected[0], item.item_type, item)
+        if item.__class__ is CompactItem:
+            mask = item.tag_mask
+            if mask & self._required_masks[0] != self._required_masks[0] or (
+                mask & self._forbidden_masks[0]
+            ):
+                self._validate((item,))
+        elif self._required[0] or self._forbidden[0]:
+            self._validate((item,))
+        return self._trusted_single(item)
+
+    def _trusted_single(self, item: Item) -> Item:
+        """Transformation of single input machine without validation."""
+        item_class = item.__class__
+        return item_class(
+            item_type=self._output_type or item.item_type,
+            value=self._value(item.value),
+            materials=item.materials * self._materials_multiplier
+            if self._materials_multiplier != 1
+            else item.materials,
+            tags=item.tag_mask | self._add_mask
+            if item_class is CompactItem
+            else item.tags + self._add_tags,
+            sequence=item.sequence.add_step(self.machine),
+        )
+
+    def _run_multiple(self, *items: Item) -> Item:
+        """Transformation of multiple inputs machine."""
+        if len(items) != self.arity:
+            raise ItemProcessingError(f"{self.machine} takes {self.arity} items, got {len(items)}")
+        self._validate(items)
+        return self._trusted_multiple(*items)
+
+    def _trusted_multiple(self, *items: Item) -> Item:
+        """Transformation of multiple inputs machine without validation."""
+        if all(item.__class__ is CompactItem for item in items):
+            item_class = CompactItem
+            tags = self._add_mask
+            for item in items:
+                tags |= item.tag_mask
+        else:
+            item_class = Item
+            tags = list(dict.fromkeys(tag for item in items for tag in item.tags))
+            if self._add_tag is not None:
+                tags.append(self._add_tag)
+        materials = sum(item.materials for item in items)
+        if self._materials_multiplier != 1:
+            materials = materials * self._materials_multiplier
+        return item_class(
+            item_type=self._output_type or items[self._output_type_from].item_type,
+            value=self._value(sum(item.value for item in items)),
+            materials=materials,
+            tags=tags,
+            sequence=HistoryNode.merge(item.sequence for item in items).add_step(self.machine),
+        )
+
+    def run_batch(self, *batches: "ItemBatch") -> "ItemBatch":
+        """Vectorized run(), row i of result is run() of rows i of batches.
+
+        Args:
+            *batches (ItemBatch): one batch per input
+
+        Raises:
+            ItemProcessingError: if number of batches is not arity of machine
+
+        Returns:
+            ItemBatch: outputs
+        """
+        if len(batches) != self.arity:
+            raise ItemProcessingError(
+                f"{self.machine} takes {self.arity} batches, got {len(batches)}"
+            )
+        if self._types_first:
+            for batch, spec in zip(batches, self.spec.inputs):
+                _validate_batch_type(batch, spec)
+            for batch, spec in zip(batches, self.spec.inputs):
+                _validate_batch_tags(batch, spec)
+        elif self._tags_first:
+            for batch, spec in zip(batches, self.spec.inputs):
+                _validate_batch_tags(batch, spec)
+            for batch, spec in zip(batches, self.spec.inputs):
+                _validate_batch_type(batch, spec)
+        else:
+            for batch, spec in zip(batches, self.spec.inputs):
+                _validate_batch_type(batch, spec)
+                _validate_batch_tags(batch, spec)
+        totals = batches[0] if self.arity == 1 else batches[0].totals_with(*batches[1:])
+        if not self._scaled:
+            value = totals.value
+        elif self._rounding:
+            value = totals.rounded_value(self._multiplier)
+        else:
+            value = totals.value * self._multiplier
+        if self._offset:
+            value = value + self._offset
+        return totals.derive(
+            self.machine,
+            value,
+            item_type=self._output_type or batches[self._output_type_from].item_type,
+            materials=totals.materials * self._materials_multiplier
+            if self._materials_multiplier != 1
+            else None,
+            add_tag=self._add_tag,
+        )
+
+
+class FusedChain:
+    """
+    Consecutive single input compiled machines folded into one step.\n
+    Added tags, history suffix, output type and value formula of whole chain are precomputed,\n
+    so output is one item allocation instead of one per machine.\n
+    Validation of machines depends only on item type and tags, so first item of every\n
+    (item_type, tags) state is run machine by machine, which validates it and raises same\n
+    errors as unfused chain, and later items of that state skip validation.\n
+    run_trusted() skips validation for all items, use it only for inputs proven valid by plan_checker.\n
+    Attributes:
+        machines (tuple[CompiledMachine, ...]): fused machines in crafting order
+        steps (tuple[str, ...]): machine names appended to history
+    """
+
+    __slots__ = (
+        "machines",
+        "steps",
+        "_value_steps",
+        "_materials_multipliers",
+        "_output_type",
+        "_add_tags",
+        "_add_mask",
+        "_trusted",
+    )
+
+    def __init__(self, machines: "list[CompiledMachine]"):
+        """Folds machines.
+
+        Args:
+            machines (list[CompiledMachine]): single input machines in crafting order
+
+        Raises:
+            ItemProcessingError: if machine takes more than one input
+        """
+        for machine in machines:
+            if machine.arity != 1:
+                raise ItemProcessingError(f"{machine.machine} takes {machine.arity} items")
+        self.machines = tuple(machines)
+        self.steps = tuple(machine.machine for machine in machines)
+        # (multiplier or None, rounding, offset) per machine, offset-only machines are
+        # folded into offset of previous step, value is rounded exactly where machine rounds
+        value_steps: list[list] = []
+        for machine in machines:
+            if not machine._scaled and value_steps:
+                value_steps[-1][2] += machine._offset
+            else:
+                multiplier = machine._multiplier if machine._scaled else None
+                value_steps.append([multiplier, machine._rounding, machine._offset])
+        self._value_steps = tuple(tuple(step) for step in value_steps)
+        self._materials_multipliers = tuple(
+            machine._materials_multiplier
+            for machine in machines
+            if machine._materials_multiplier != 1
+        )
+        self._output_type = None
+        for machine in machines:
+            self._output_type = machine._output_type or self._output_type
+        self._add_tags = [tag for machine in machines for tag in machine._add_tags]
+        self._add_mask = _mask(self._add_tags)
+        self._trusted: set = set()
+
+    def run(self, item: Item) -> Item:
+        """Runs all fused machines on item.
+
+        Args:
+            item (Item): input of first machine
+
+        Returns:
+            Item: output of last machine
+        """
+        item_class = item.__class__
+        if item_class is CompactItem:
+            state = (item.item_type, item.tag_mask)
+        else:
+            state = (item.item_type, frozenset(item.tags))
+        if state not in self._trusted:
+            for machine in self.machines:
+                item = machine.run(item)
+            self._trusted.add(state)
+            return item
+        return self.run_trusted(item)
+
+    def run_trusted(self, item: Item) -> Item:
+        """Runs all fused machines on item without validation.
+
+        Args:
+            item (Item): input of first machine, must be valid for whole chain
+
+        Returns:
+            Item: output of last machine
+        """
+        item_class = item.__class__
+        value = item.value
+        for multiplier, rounding, offset in self._value_steps:
+            if multiplier is not None:
+                value = value * multiplier
+                if rounding:
+                    value = round(value)
+            value = value + offset
+        materials = item.materials
+        for multiplier in self._materials_multipliers:
+            materials = materials * multiplier
+        return item_class(
+            item_type=self._output_type or item.item_type,
+            value=value,
+            materials=materials,
+            tags=(
+                item.tag_mask | self._add_mask
+                if item_class is CompactItem
+                else item.tags + self._add_tags
+            ),
+            sequence=item.sequence.extend(self.steps),
+        )
+
+
+# instrumentation turns fusion off, so every machine of chain is run (and recorded) separately
+FUSE_CHAINS = True
+
+
+def compile_chain(steps: list, trusted: bool = False) -> "Callable[[Item], Item]":
+    """Compiles chain of single input steps into one callable.
+
+    Consecutive CompiledMachine steps are fused into FusedChain (unless FUSE_CHAINS is off),
+    other steps (transform() of hand-written transformations) are called as they are.
+
+    Args:
+        steps (list[CompiledMachine | Callable[[Item], Item]]): steps in crafting order
+        trusted (bool): skip validation of fused machines, only for inputs proven valid by
+            plan_checker. Defaults to False.
+
+    Returns:
+        Callable[[Item], Item]: function running whole chain on one item
+    """
+    stages: list = []
+    run: list[CompiledMachine] = []
+    for step in steps:
+        if isinstance(step, CompiledMachine):
+            if FUSE_CHAINS:
+                run.append(step)
+                continue
+            step = step.run_trusted if trusted else step.run
+        if run:
+            stages.append(_fused_stage(run, trusted))
+            run = []
+        stages.append(step)
+    if run:
+        stages.append(_fused_stage(run, trusted))
+
+    if not stages:
+        return lambda item: item
+    if len(stages) == 1:
+        return stages[0]
+
+    def chain(item: Item) -> Item:
+        for stage in stages:
+            item = stage(item)
+        return item
+
+    return chain
+
+
+def _fused_stage(machines: "list[CompiledMachine]", trusted: bool) -> "Callable[[Item], Item]":
+    """Stage of compile_chain() for consecutive compiled machines."""
+    fused = FusedChain(machines)
+    return fused.run_trusted if trusted else fused.run
+
+
+def _mask(tags) -> int:
+    """Bitmask of tags, tags are Tags constants."""
+    mask = 0
+    for tag in tags:
+        mask |= _TAG_BITS[tag]
+    return mask
+
+
+class _CompiledMachines(dict):
+    """Machine name to CompiledMachine of MACHINE_SPECS spec, compiled on first lookup."""
+
+    def __missing__(self, machine: str) -> CompiledMachine:
+        # setdefault keeps one compiled machine per spec when threads compile it together
+        return self.setdefault(machine, CompiledMachine(MACHINE_SPECS[machine]))
+
+
+COMPILED_MACHINES: dict[str, CompiledMachine] = _CompiledMachines()
+"""Compiled machine for every spec of MACHINE_SPECS, compiled on first lookup"""
+
+
+def compile_spec(spec: MachineSpec) -> CompiledMachine:
+    """Compiles spec, returns already compiled machine if spec is one of MACHINE_SPECS.
+
+    Args:
+        spec (MachineSpec): machine description
+
+    Returns:
+        CompiledMachine: compiled machine
+    """
+    if MACHINE_SPECS.get(spec.machine) is spec:
+        return COMPILED_MACHINES[spec.machine]
+    return CompiledMachine(spec)
+
+
+def run(machine: str, *items: Item) -> Item:
+    """Runs declarative machine on items.
+
+    Args:
+        machine (str): machine name, better to use Machines constants
+        *items (Item): inputs in spec order
+
+    Raises:
+        KeyError: if machine has no spec
+
+    Returns:
+        Item: output item
+    """
+    return COMPILED_MACHINES[machine].run(*items)
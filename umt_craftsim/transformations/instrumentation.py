@@ -0,0 +1,395 @@
+"""
+Opt-in per-machine instrumentation of transformations.\n
+While enabled, run() and run_trusted() of compiled machines, transform() of hand-written\n
+transformations, validate_* helpers of TransformationHelperMixin and input validation of\n
+compiled machines are replaced by recording wrappers, which count calls, time, validations,\n
+failures by exception type and items created, per machine.\n
+Chains of compiled machines aren't fused while enabled, so every machine is recorded separately.\n
+disable() puts original functions back and drops functions compiled with wrappers from caches\n
+of TransformationRegistry and ItemFactory, so disabled instrumentation costs nothing.\n
+Enable it by instrument() context manager or by UMT_CRAFTSIM_INSTRUMENT environment variable:\n
+"1" prints table to stderr at exit, path ending with ".json" gets JSON at exit.\n
+Only current process is recorded, workers of process pool have their own counters.\n
+Example:
+    ```
+    with instrument() as stats:
+        report = sweep(recipes)
+    print(stats.table())
+    stats.to_json("profile.json")
+    ```
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Iterator
+
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.service.mixins import TransformationHelperMixin
+from umt_craftsim.transformations import engine
+from umt_craftsim.transformations import transformations_multiple as tm
+from umt_craftsim.transformations import transformations_single as ts
+from umt_craftsim.transformations.machine_specs import MACHINE_SPECS
+from umt_craftsim.transformations.transformation_registry import TransformationRegistry
+
+ENVIRONMENT_VARIABLE = "UMT_CRAFTSIM_INSTRUMENT"
+# machine of validations and items made outside of any machine, as in ItemFactory checks
+OUTSIDE = "(no machine)"
+
+
+class MachineStats:
+    """
+    Counters of one machine.\n
+    Attributes:
+        calls (int): number of calls
+        seconds (float): time of all calls, validations included
+        items (int): Item and CompactItem objects created by calls
+        failures (dict[str, int]): number of failed calls by exception type name
+        validations (int): number of TransformationHelperMixin validator calls
+        validation_seconds (float): time of validator calls
+    """
+
+    __slots__ = ("calls", "seconds", "items", "failures", "validations", "validation_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.items = 0
+        self.failures: dict[str, int] = {}
+        self.validations = 0
+        self.validation_seconds = 0.0
+
+    def to_dict(self) -> dict:
+        """Counters as JSON-ready dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class InstrumentationStats:
+    """
+    Counters of all machines recorded while instrumentation was enabled.\n
+    Attributes:
+        machines (dict[str, MachineStats]): counters by machine name
+    """
+
+    def __init__(self):
+        self.machines: dict[str, MachineStats] = {}
+        self._lock = threading.Lock()
+
+    def _machine(self, machine: str) -> MachineStats:
+        stats = self.machines.get(machine)
+        if stats is None:
+            stats = self.machines.setdefault(machine, MachineStats())
+        return stats
+
+    def _call(self, machine: str, seconds: float, failure: str | None = None):
+        with self._lock:
+            stats = self._machine(machine)
+            stats.calls += 1
+            stats.seconds += seconds
+            if failure is not None:
+                stats.failures[failure] = stats.failures.get(failure, 0) + 1
+
+    def _validation(self, machine: str, seconds: float, failure: str | None = None):
+        with self._lock:
+            stats = self._machine(machine)
+            stats.validations += 1
+            stats.validation_seconds += seconds
+            # failures inside machine are counted once, by machine call
+            if failure is not None and machine == OUTSIDE:
+                stats.failures[failure] = stats.failures.get(failure, 0) + 1
+
+    def _item(self, machine: str):
+        with self._lock:
+            self._machine(machine).items += 1
+
+    def clear(self):
+        """Resets all counters."""
+        with self._lock:
+            self.machines.clear()
+
+    def to_dict(self) -> dict[str, dict]:
+        """Counters of every machine, most time consuming first.
+
+        Returns:
+            dict[str, dict]: MachineStats.to_dict() by machine name
+        """
+        with self._lock:
+            ordered = sorted(self.machines.items(), key=lambda entry: -entry[1].seconds)
+            return {str(machine): stats.to_dict() for machine, stats in ordered}
+
+    def to_json(self, path: str | os.PathLike | None = None) -> str:
+        """Counters as JSON, written into file if path is given.
+
+        Args:
+            path (str | os.PathLike | None): output file. Defaults to None.
+
+        Returns:
+            str: JSON text
+        """
+        text = json.dumps({"machines": self.to_dict()}, indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text + "\n")
+        return text
+
+    def table(self) -> str:
+        """Counters as text table, most time consuming machine first.
+
+        Returns:
+            str: table with header line
+        """
+        lines = [
+            f"{'machine':28} | {'calls':>9} | {'total ms':>10} | {'mean us':>9} | {'items':>9} | "
+            f"{'valid.':>8} | {'valid. ms':>9} | failures"
+        ]
+        for machine, stats in self.to_dict().items():
+            mean = stats["seconds"] / stats["calls"] * 1e6 if stats["calls"] else 0.0
+            failures = ", ".join(f"{name} x{count}" for name, count in stats["failures"].items())
+            lines.append(
+                f"{machine:28} | {stats['calls']:9} | {stats['seconds'] * 1e3:10.2f} | "
+                f"{mean:9.2f} | {stats['items']:9} | {stats['validations']:8} | "
+                f"{stats['validation_seconds'] * 1e3:9.2f} | {failures}"
+            )
+        return "\n".join(lines)
+
+
+_active: InstrumentationStats | None = None
+# (owner, attribute, original value) of every replaced attribute, in replacing order
+_replaced: list[tuple[object, str, object]] = []
+_state_lock = threading.Lock()
+# machine running in current thread
+_current = threading.local()
+
+
+def _run(stats: InstrumentationStats, machine: str, function: Callable, args: tuple):
+    """Calls function as machine of current thread and records call."""
+    outer = getattr(_current, "machine", OUTSIDE)
+    _current.machine = machine
+    started = perf_counter()
+    try:
+        item = function(*args)
+    except Exception as error:
+        stats._call(machine, perf_counter() - started, type(error).__name__)
+        raise
+    finally:
+        _current.machine = outer
+    stats._call(machine, perf_counter() - started)
+    return item
+
+
+def _record_machine(machine: str, function: Callable) -> Callable:
+    """Wrapper of compiled machine run function."""
+
+    @wraps(function)
+    def wrapper(*items):
+        stats = _active
+        if stats is None:
+            # function compiled while enabled, kept by caller after disable()
+            return function(*items)
+        return _run(stats, machine, function, items)
+
+    return wrapper
+
+
+def _record_transform(function: Callable) -> Callable:
+    """Wrapper of transform() method, machine is taken from transformation."""
+
+    @wraps(function)
+    def wrapper(self, *items):
+        stats = _active
+        if stats is None:
+            return function(self, *items)
+        return _run(stats, self.machine, function, (self, *items))
+
+    return wrapper
+
+
+def _record_validation(function: Callable) -> Callable:
+    """Wrapper of validator, counted for machine running in current thread."""
+
+    @wraps(function)
+    def wrapper(*args):
+        stats = _active
+        if stats is None:
+            return function(*args)
+        machine = getattr(_current, "machine", OUTSIDE)
+        started = perf_counter()
+        try:
+            result = function(*args)
+        except Exception as error:
+            stats._validation(machine, perf_counter() - started, type(error).__name__)
+            raise
+        stats._validation(machine, perf_counter() - started)
+        return result
+
+    return wrapper
+
+
+def _validated_run(machine: engine.CompiledMachine) -> Callable:
+    """run() of compiled machine validating every call by _validate(), so validation is recorded.
+
+    Single input run() checks item type inline and calls _validate() only for tags,
+    so it is replaced by _validate() and run_trusted(), which raise same errors.
+    """
+    run = machine.run
+    if machine.arity != 1:
+        return run
+    run_trusted = machine.run_trusted
+
+    @wraps(run)
+    def validated(item):
+        machine._validate((item,))
+        return run_trusted(item)
+
+    return validated
+
+
+def _record_init(function: Callable) -> Callable:
+    """Wrapper of item __init__, counted for machine running in current thread."""
+
+    @wraps(function)
+    def wrapper(self, *args, **kwargs):
+        function(self, *args, **kwargs)
+        stats = _active
+        if stats is not None:
+            stats._item(getattr(_current, "machine", OUTSIDE))
+
+    return wrapper
+
+
+def _subclasses(cls: type) -> Iterator[type]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def _replace(owner: object, attribute: str, value: object):
+    _replaced.append((owner, attribute, getattr(owner, attribute)))
+    setattr(owner, attribute, value)
+
+
+def _drop_compiled_callables():
+    """Forgets functions compiled from replaced (or original) attributes."""
+    with TransformationRegistry._lock:
+        TransformationRegistry._appliers.clear()
+    # item_factory may be partially initialized, when environment variable enables instrumentation
+    materials_plan = getattr(sys.modules.get("umt_craftsim.item_factory"), "_materials_plan", None)
+    if materials_plan is not None:
+        materials_plan.cache_clear()
+
+
+def enable(stats: InstrumentationStats | None = None) -> InstrumentationStats:
+    """Starts recording, calls of already enabled instrumentation return its counters.
+
+    Functions compiled before enable() (ItemBuilder.compile(), ChainOptimizer moves) run
+    without recording, compile them again.
+
+    Args:
+        stats (InstrumentationStats | None): counters to add to, None creates new. Defaults to None.
+
+    Returns:
+        InstrumentationStats: counters being recorded
+    """
+    global _active
+    with _state_lock:
+        if _active is not None:
+            return _active
+        compiled = {}
+        for machine in MACHINE_SPECS:
+            compiled[id(engine.COMPILED_MACHINES[machine])] = engine.COMPILED_MACHINES[machine]
+        for base in (ts.SpecTransformation_Single, tm.SpecTransformation_Multiple):
+            for cls in _subclasses(base):
+                compiled.setdefault(id(cls._compiled), cls._compiled)
+        for machine in compiled.values():
+            _replace(machine, "run", _record_machine(machine.machine, _validated_run(machine)))
+            _replace(machine, "run_trusted", _record_machine(machine.machine, machine.run_trusted))
+
+        for base in (ts.Transformation_Single, tm.Transformation_Multiple):
+            for cls in _subclasses(base):
+                # spec transformations call compiled machine, which is recorded already
+                if "transform" in vars(cls) and cls not in (
+                    ts.SpecTransformation_Single,
+                    tm.SpecTransformation_Multiple,
+                ):
+                    _replace(cls, "transform", _record_transform(vars(cls)["transform"]))
+
+        _replace(
+            engine.CompiledMachine,
+            "_validate",
+            _record_validation(vars(engine.CompiledMachine)["_validate"]),
+        )
+        for name, value in list(vars(TransformationHelperMixin).items()):
+            if name.startswith("validate") and isinstance(value, staticmethod):
+                wrapper = staticmethod(_record_validation(value.__func__))
+                _replaced.append((TransformationHelperMixin, name, value))
+                setattr(TransformationHelperMixin, name, wrapper)
+
+        for cls in (Item, CompactItem):
+            _replace(cls, "__init__", _record_init(vars(cls)["__init__"]))
+        _replace(engine, "FUSE_CHAINS", False)
+        _active = stats if stats is not None else InstrumentationStats()
+        _drop_compiled_callables()
+        return _active
+
+
+def disable() -> InstrumentationStats | None:
+    """Stops recording and restores original functions.
+
+    Returns:
+        InstrumentationStats | None: recorded counters, None if instrumentation wasn't enabled
+    """
+    global _active
+    with _state_lock:
+        stats = _active
+        _active = None
+        while _replaced:
+            owner, attribute, original = _replaced.pop()
+            setattr(owner, attribute, original)
+        _drop_compiled_callables()
+        return stats
+
+
+def is_enabled() -> bool:
+    """True while instrumentation is recording."""
+    return _active is not None
+
+
+@contextmanager
+def instrument(stats: InstrumentationStats | None = None) -> Iterator[InstrumentationStats]:
+    """Records machines inside with block, nested blocks share counters of outermost block.
+
+    Args:
+        stats (InstrumentationStats | None): counters to add to, None creates new. Defaults to None.
+
+    Yields:
+        InstrumentationStats: counters being recorded
+    """
+    if _active is not None:
+        yield _active
+        return
+    recorded = enable(stats)
+    try:
+        yield recorded
+    finally:
+        disable()
+
+
+def enable_from_environment():
+    """Enables instrumentation if UMT_CRAFTSIM_INSTRUMENT is set, report is written at exit."""
+    target = os.environ.get(ENVIRONMENT_VARIABLE, "")
+    if not target or target == "0":
+        return
+    stats = enable()
+
+    def report():
+        if target.endswith(".json"):
+            stats.to_json(target)
+        else:
+            print(stats.table(), file=sys.stderr)
+
+    atexit.register(report)
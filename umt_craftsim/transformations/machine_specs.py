@@ -0,0 +1,117 @@
+"""
+Declarative description of machines.\n
+Most machines do same thing: check input types and tags, calculate value as\n
+round(total_value * multiplier) + offset, add tag and machine to history.\n
+Such machines are described here as data (MachineSpec), one line per machine,\n
+and executed by umt_craftsim.transformations.engine.\n
+Machines which don't fit (Ore Upgrader, Explosives Maker, Blasting Powder Chamber)\n
+have hand-written transformation classes.
+"""
+
+from dataclasses import dataclass
+
+from umt_craftsim.constants import ItemTypes, Machines, Tags
+
+
+@dataclass(frozen=True, slots=True)
+class InputSpec:
+    """Requirements for one input of machine.\n
+    Attributes:
+        types (tuple[str, ...]): accepted item types, empty tuple accepts any type. Defaults to ().
+        required_tags (tuple[str, ...]): tags input must have. Defaults to ().
+        forbidden_tags (tuple[str, ...]): tags input must not have. Defaults to ().
+    """
+
+    types: tuple[str, ...] = ()
+    required_tags: tuple[str, ...] = ()
+    forbidden_tags: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class MachineSpec:
+    """Declarative description of machine.\n
+    Output value is round(sum of inputs values * multiplier) + offset, round() is skipped when\n
+    multiplier is 1 or rounding is False. Output tags are union of inputs tags plus add_tag.\n
+    Attributes:
+        machine (str): machine name, better to use Machines constants
+        inputs (tuple[InputSpec, ...]): requirements of every input, in transform() arguments order
+        output_type (str | None): item type of output, None keeps type of input output_type_from. Defaults to None.
+        output_type_from (int): index of input which type is kept when output_type is None. Defaults to 0.
+        add_tag (str | None): tag added to output. Defaults to None.
+        multiplier (float): value multiplier. Defaults to 1.
+        offset (int): value added after multiplication. Defaults to 0.
+        rounding (bool): round multiplied value half to even, as builtin round(). Defaults to True.
+        materials_multiplier (float): multiplier of summed materials. Defaults to 1.
+        types_first (bool): validate types of all inputs before any tags, otherwise type and tags of every input in turn. Defaults to False.
+        tags_first (bool): validate tags of all inputs before any types. Defaults to False.
+    """
+
+    machine: str
+    inputs: tuple[InputSpec, ...]
+    output_type: str | None = None
+    output_type_from: int = 0
+    add_tag: str | None = None
+    multiplier: float = 1
+    offset: int = 0
+    rounding: bool = True
+    materials_multiplier: float = 1
+    types_first: bool = False
+    tags_first: bool = False
+
+    def __post_init__(self):
+        if self.types_first and self.tags_first:
+            raise ValueError(f"{self.machine} spec can't validate both types first and tags first")
+
+
+def _input(*types: str, required: tuple[str, ...] = (), forbidden: tuple[str, ...] = ()) -> InputSpec:
+    """Shortcut for InputSpec, accepts types as positional arguments."""
+    return InputSpec(types, required, forbidden)
+
+
+_ORE = _input(ItemTypes.ORE)
+_GEM = _input(ItemTypes.GEM)
+_BAR = _input(ItemTypes.BAR)
+_PLATE = _input(ItemTypes.PLATE)
+_ELECTRONICS = (ItemTypes.CIRCUIT, ItemTypes.ELECTROMAGNET, ItemTypes.TABLET, ItemTypes.POWER_CORE)
+
+# fmt: off
+MACHINE_SPECS: dict[str, MachineSpec] = {spec.machine: spec for spec in [
+    # single input machines
+    MachineSpec(Machines.ORE_CLEANER, (_input(ItemTypes.ORE, forbidden=(Tags.CLEANED,)),), add_tag=Tags.CLEANED, offset=10),
+    MachineSpec(Machines.POLISHER, (_input(forbidden=(Tags.POLISHED,)),), add_tag=Tags.POLISHED, offset=10),
+    MachineSpec(Machines.ORE_SMELTER, (_ORE,), ItemTypes.BAR, add_tag=Tags.SMELTED, multiplier=1.2),
+    MachineSpec(Machines.COILER, (_BAR,), ItemTypes.COIL, add_tag=Tags.DRAWN, offset=20),
+    MachineSpec(Machines.BOLT_MACHINE, (_BAR,), ItemTypes.BOLTS, add_tag=Tags.BOLTS, offset=5),
+    MachineSpec(Machines.PLATE_STAMPER, (_BAR,), ItemTypes.PLATE, add_tag=Tags.PLATE, offset=20),
+    MachineSpec(Machines.PIPE_MAKER, (_PLATE,), ItemTypes.PIPE, add_tag=Tags.PIPE, offset=20),
+    MachineSpec(Machines.MECHANICAL_PARTS_MAKER, (_PLATE,), ItemTypes.MECHANICAL_PARTS, add_tag=Tags.MECHANICAL_PARTS, offset=30),
+    MachineSpec(Machines.ELECTRONIC_TUNER, (_input(*_ELECTRONICS, forbidden=(Tags.TUNED,)),), add_tag=Tags.TUNED, offset=50, tags_first=True),
+    MachineSpec(Machines.GEM_CUTTER, (_input(ItemTypes.GEM, forbidden=(Tags.CUT,)),), add_tag=Tags.CUT, multiplier=1.4),
+    MachineSpec(Machines.BLAST_FURNACE, (_ORE,), ItemTypes.BAR, add_tag=Tags.SMELTED, multiplier=0.8),
+    MachineSpec(Machines.CERAMIC_FURNACE, (_input(ItemTypes.CLAY_BLOCK),), ItemTypes.CERAMIC_CASING, add_tag=Tags.CERAMIC, multiplier=0, offset=150),
+    MachineSpec(Machines.TEMPERING_FORGE, (_input(ItemTypes.BAR, forbidden=(Tags.TEMPERED,)),), add_tag=Tags.TEMPERED, multiplier=2),
+    MachineSpec(Machines.FILIGREE_CUTTER, (_PLATE,), ItemTypes.FILIGREE, add_tag=Tags.FILIGREE, multiplier=1.1),
+    MachineSpec(Machines.LENS_CUTTER, (_input(ItemTypes.GLASS),), ItemTypes.LENS, offset=50),  # no tag in game
+    MachineSpec(Machines.QUALITY_ASSURANCE_MACHINE, (_input(forbidden=(Tags.QUALITY_ASSURED,)),), add_tag=Tags.QUALITY_ASSURED, multiplier=1.2),
+    MachineSpec(Machines.DUPLICATOR, (_input(forbidden=(Tags.DUPLICATED,)),), add_tag=Tags.DUPLICATED, multiplier=0.5, materials_multiplier=0.5),
+    MachineSpec(Machines.PHILOSOPHERS_STONE, (_input(ItemTypes.ORE, forbidden=(Tags.GOLD_INFUSED,)),), add_tag=Tags.GOLD_INFUSED, multiplier=1.25),
+    MachineSpec(Machines.GEM_TO_BAR_TRANSMUTER, (_GEM,), ItemTypes.BAR),
+    MachineSpec(Machines.BAR_TO_GEM_TRANSMUTER, (_BAR,), ItemTypes.GEM),
+    # multiple inputs machines
+    MachineSpec(Machines.FRAME_MAKER, (_BAR, _input(ItemTypes.BOLTS)), ItemTypes.FRAME, multiplier=1.25),
+    MachineSpec(Machines.RING_MAKER, (_GEM, _input(ItemTypes.COIL)), ItemTypes.RING, multiplier=1.7),
+    MachineSpec(Machines.CIRCUIT_MAKER, (_input(ItemTypes.GLASS), _input(ItemTypes.COIL)), ItemTypes.CIRCUIT, multiplier=2),
+    MachineSpec(Machines.CASING_MACHINE, (_input(ItemTypes.FRAME), _input(ItemTypes.BOLTS), _PLATE), ItemTypes.METAL_CASING, multiplier=1.3),
+    MachineSpec(Machines.PRISMATIC_GEM_CRUCIBLE, (_input(ItemTypes.GEM, forbidden=(Tags.PRISMATIC,)),) * 2, ItemTypes.GEM, add_tag=Tags.PRISMATIC, multiplier=1.15, types_first=True),
+    MachineSpec(Machines.ALLOY_FURNACE, (_input(ItemTypes.BAR, forbidden=(Tags.ALLOYED,)),) * 2, ItemTypes.BAR, add_tag=Tags.ALLOYED, multiplier=1.2, types_first=True),
+    MachineSpec(Machines.MAGNETIC_MACHINE, (_input(ItemTypes.COIL), _input(ItemTypes.METAL_CASING)), ItemTypes.ELECTROMAGNET, multiplier=1.5),
+    MachineSpec(Machines.OPTICS_MACHINE, (_input(ItemTypes.LENS), _input(ItemTypes.PIPE)), ItemTypes.OPTICS, multiplier=1.25),
+    MachineSpec(Machines.GILDER, (_input(ItemTypes.FILIGREE), _input(ItemTypes.RING, ItemTypes.AMULET, forbidden=(Tags.GILDED,))), output_type_from=1, add_tag=Tags.GILDED, multiplier=1.2),
+    MachineSpec(Machines.ENGINE_FACTORY, (_input(ItemTypes.MECHANICAL_PARTS), _input(ItemTypes.PIPE), _input(ItemTypes.METAL_CASING)), ItemTypes.ENGINE, multiplier=2),
+    MachineSpec(Machines.SUPERCONDUCTOR_CONSTRUCTOR, (_input(ItemTypes.BAR, required=(Tags.ALLOYED,)), _input(ItemTypes.CERAMIC_CASING)), ItemTypes.SUPERCONDUCTOR, multiplier=3),
+    MachineSpec(Machines.AMULET_MAKER, (_input(ItemTypes.RING), _input(ItemTypes.FRAME), _input(ItemTypes.GEM, required=(Tags.PRISMATIC,))), ItemTypes.AMULET, multiplier=2),
+    MachineSpec(Machines.TABLET_FACTORY, (_input(ItemTypes.METAL_CASING), _input(ItemTypes.GLASS), _input(ItemTypes.CIRCUIT)), ItemTypes.TABLET, multiplier=3),
+    MachineSpec(Machines.LASER_MAKER, (_input(ItemTypes.OPTICS), _GEM, _input(ItemTypes.CIRCUIT)), ItemTypes.LASER, multiplier=2.5),
+    MachineSpec(Machines.POWER_CORE_ASSEMBLER, (_input(ItemTypes.METAL_CASING), _input(ItemTypes.SUPERCONDUCTOR), _input(ItemTypes.ELECTROMAGNET)), ItemTypes.POWER_CORE, multiplier=2.5),
+]}
+# fmt: on
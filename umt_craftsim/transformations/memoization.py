@@ -0,0 +1,214 @@
+"""
+Opt-in memoization of transformation results.\n
+Same (machine, inputs) pairs are crafted many times while recipes are searched,\n
+so TransformationCache keeps outputs of recent crafts in size-bounded LRU table.\n
+Key is cheap fingerprint of inputs: item_type, value, materials and tags, history is\n
+not part of key. Cached output is stored without history, history of hit is built\n
+from histories of actual inputs, so one entry serves every recipe reaching same inputs.\n
+Example:
+    ```
+    cache = TransformationCache(maxsize=10_000)
+    polisher = MemoizedTransformation(PolisherTransformation(), cache)
+    polished = polisher.transform(ore)
+    cache.cache_info()  # CacheInfo(hits=0, misses=1, maxsize=10000, currsize=1)
+    ```
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, NamedTuple
+
+from umt_craftsim.dataclasses.history import HistoryNode
+from umt_craftsim.dataclasses.items import CompactItem, Item
+
+if TYPE_CHECKING:
+    from umt_craftsim.transformations.transformations_multiple import Transformation_Multiple
+    from umt_craftsim.transformations.transformations_single import Transformation_Single
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of TransformationCache, same fields as functools.lru_cache has."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+def fingerprint(item: Item | CompactItem) -> tuple:
+    """Cheap hashable key of item properties transformations depend on.
+
+    Args:
+        item (Item | CompactItem): item
+
+    Returns:
+        tuple: class, item_type, value, materials and tags (tuple or bitmask)
+    """
+    if item.__class__ is CompactItem:
+        return (CompactItem, item.item_type, item.value, item.materials, item.tag_mask)
+    return (item.__class__, item.item_type, item.value, item.materials, tuple(item.tags))
+
+
+def _expected_history(machine: str, items: tuple) -> HistoryNode:
+    """History every transformation gives to its output: merged inputs histories plus machine."""
+    if len(items) == 1:
+        return HistoryNode.from_sequence(items[0].sequence).add_step(machine)
+    return HistoryNode.merge(item.sequence for item in items).add_step(machine)
+
+
+class TransformationCache:
+    """
+    Size-bounded LRU table of transformation outputs.\n
+    Thread-safe, one cache can be shared by any number of transformations,\n
+    machine is part of key.\n
+    Attributes:
+        maxsize (int): maximum number of stored outputs, least recently used are evicted
+        hits (int): number of lookups answered from cache
+        misses (int): number of lookups which ran transformation
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """TransformationCache init.
+
+        Args:
+            maxsize (int): maximum number of stored outputs. Defaults to 4096.
+
+        Raises:
+            ValueError: if maxsize is less than 1
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cache_info(self) -> CacheInfo:
+        """Returns hits, misses, maxsize and current size.
+
+        Returns:
+            CacheInfo: statistics
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        """Removes all stored outputs and resets counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def call(self, machine: str, transform: Callable, *items: Item) -> Item:
+        """Returns transform(*items), from cache when same inputs were already transformed.
+
+        Output of hit is new item with history of given inputs, stored entry is never changed.
+        Outputs which history doesn't follow usual rule (inputs histories + machine) are not stored.
+
+        Args:
+            machine (str): machine of transform, better to use Machines constants
+            transform (Callable): transform() of transformation
+            *items (Item): inputs
+
+        Returns:
+            Item: output
+        """
+        key = (machine, *(fingerprint(item) for item in items))
+        entry = self._get(key)
+        if entry is not None:
+            item_class, item_type, value, materials, dustwork_type, tags = entry
+            return item_class(
+                item_type=item_type,
+                value=value,
+                materials=materials,
+                dustwork_type=dustwork_type,
+                tags=tags if item_class is CompactItem else list(tags),
+                sequence=_expected_history(machine, items),
+            )
+
+        output = transform(*items)
+        entry = None
+        if output.sequence is _expected_history(machine, items):
+            entry = (
+                output.__class__,
+                output.item_type,
+                output.value,
+                output.materials,
+                output.dustwork_type,
+                output.tag_mask if output.__class__ is CompactItem else tuple(output.tags),
+            )
+        self._put(key, entry)
+        return output
+
+    def _get(self, key: tuple) -> tuple | None:
+        """Stored entry of key, None if key is not stored, counts hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        return entry
+
+    def _put(self, key: tuple, entry: tuple | None):
+        """Counts miss and stores entry of key, None entry (output can't be cached) isn't stored."""
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self._entries[key] = entry
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def wrap(self, machine: str, transform: Callable) -> Callable:
+        """Returns memoized version of transform.
+
+        Args:
+            machine (str): machine of transform, better to use Machines constants
+            transform (Callable): transform() of transformation
+
+        Returns:
+            Callable: function with same signature as transform
+        """
+
+        def memoized(*items: Item) -> Item:
+            return self.call(machine, transform, *items)
+
+        return memoized
+
+
+class MemoizedTransformation:
+    """
+    Transformation wrapper which answers repeated transform() calls from TransformationCache.\n
+    Example:
+        ```
+        cache = TransformationCache()
+        smelter = MemoizedTransformation(OreSmelterTransformation(), cache)
+        bar = smelter.transform(ore)
+        ```
+    Attributes:
+        transformation (Transformation_Single | Transformation_Multiple): wrapped transformation
+        cache (TransformationCache): cache of outputs
+        machine (str): machine of wrapped transformation
+    """
+
+    def __init__(
+        self,
+        transformation: "Transformation_Single | Transformation_Multiple",
+        cache: TransformationCache | None = None,
+    ):
+        """MemoizedTransformation init.
+
+        Args:
+            transformation (Transformation_Single | Transformation_Multiple): transformation instance
+            cache (TransformationCache | None): cache to use, None creates new one. Defaults to None.
+        """
+        self.transformation = transformation
+        self.cache = cache if cache is not None else TransformationCache()
+        self.machine = transformation.machine
+        self.transform = self.cache.wrap(self.machine, transformation.transform)
+
+    def transform_batch(self, *batches):
+        """Batches are not memoized, same as transform_batch() of wrapped transformation."""
+        return self.transformation.transform_batch(*batches)
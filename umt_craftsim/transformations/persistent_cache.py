@@ -0,0 +1,345 @@
+"""
+Transformation cache kept in SQLite file across runs.\n
+PersistentTransformationCache is TransformationCache whose misses are looked up in\n
+local SQLite database before machine runs, and whose new outputs are written there\n
+in bulk, one transaction per batch. Database is in WAL mode, so process pool workers\n
+read it while others write, every process opens its own connection.\n
+Key is hash of machine, formula hash of machine and fingerprints of inputs, so entries\n
+of changed machine (spec or code) are never returned, they are evicted as least recently\n
+used, when database grows over max_entries.\n
+Example:
+    ```
+    cache = PersistentTransformationCache("crafts.sqlite")
+    TransformationRegistry.enable_memoization(cache=cache)
+    report = sweep(recipes)  # second run is served from crafts.sqlite
+    cache.close()
+    ```
+"""
+
+import inspect
+import os
+import sqlite3
+import sys
+import time
+from functools import lru_cache
+from hashlib import blake2b
+from multiprocessing.util import Finalize
+from threading import Lock
+
+from umt_craftsim.constants import DustTypes, ItemTypes
+from umt_craftsim.dataclasses.items import CompactItem, Item, mask_to_tags, tags_to_mask
+from umt_craftsim.transformations.memoization import TransformationCache
+from umt_craftsim.transformations.transformation_registry import (
+    TransformationRegistry,
+    compiled_machine,
+)
+
+# version of table layout, database of other version is recreated
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    compact INTEGER NOT NULL,
+    item_type TEXT NOT NULL,
+    value NOT NULL,
+    materials REAL NOT NULL,
+    dustwork_type TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+# decoded strings are same enum members, as in items made by transformations
+_MEMBERS: dict[str, str] = {
+    str(member): member for enum in (ItemTypes, DustTypes) for member in enum
+}
+_SEPARATOR = "\x1f"
+_TAG_SEPARATOR = "\x1e"
+# connections inherited by forked workers, closing them in worker could checkpoint
+# and delete WAL files parent still uses, so they are kept open and unused
+_INHERITED_CONNECTIONS: list[sqlite3.Connection] = []
+
+
+@lru_cache(maxsize=None)
+def formula_hash(machine: str) -> str:
+    """Hash of everything output of machine depends on.\n
+    Declarative machine depends on its spec and engine code, hand-written machine on code\n
+    of module it is defined in, machine which isn't in registry only on its name.
+
+    Args:
+        machine (str): machine name, better to use Machines constants
+
+    Returns:
+        str: hex digest, changes when formula of machine changes
+    """
+    try:
+        transformation = TransformationRegistry.get_instance(machine)
+    except (KeyError, NotImplementedError):
+        return ""
+    compiled = compiled_machine(transformation)
+    if compiled is not None:
+        parts = [repr(compiled.spec), sys.modules[type(compiled).__module__]]
+    else:
+        parts = [type(transformation).__qualname__, sys.modules[type(transformation).__module__]]
+    digest = blake2b(digest_size=8)
+    for part in parts:
+        if not isinstance(part, str):
+            try:
+                part = inspect.getsource(part)
+            except (OSError, TypeError):
+                part = part.__name__
+        digest.update(part.encode())
+    return digest.hexdigest()
+
+
+def _disk_key(key: tuple) -> bytes:
+    """Stable (across processes and runs) hash of memory key (machine, *fingerprints)."""
+    machine, *fingerprints = key
+    parts = [str(machine), formula_hash(machine)]
+    for item_class, item_type, value, materials, tags in fingerprints:
+        if item_class is CompactItem:
+            tags = _TAG_SEPARATOR.join(mask_to_tags(tags))
+        else:
+            tags = _TAG_SEPARATOR.join(map(str, tags))
+        parts.append(f"{item_class.__name__}|{item_type!s}|{value!r}|{float(materials)!r}|{tags}")
+    return blake2b(_SEPARATOR.join(parts).encode(), digest_size=16).digest()
+
+
+class _Database:
+    """
+    SQLite connection of one process and outputs buffered for it.\n
+    Exit finalizer of cache calls close() of this object, not of cache,\n
+    so finalizer doesn't keep cache alive.\n
+    Attributes:
+        db (sqlite3.Connection): connection
+        pending (dict[bytes, tuple]): rows to insert by disk key
+        touched (set[bytes]): disk keys of rows read since last flush
+        rows (int): number of rows in database, refreshed before eviction
+    """
+
+    def __init__(self, path: str, lock: Lock):
+        """Opens database, table of other schema version is recreated.
+
+        Args:
+            path (str): database file
+            lock (Lock): lock of cache, guards buffers and connection
+        """
+        self.lock = lock
+        self.pending: dict[bytes, tuple] = {}
+        self.touched: set[bytes] = set()
+        db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with db:
+                db.execute("DROP TABLE IF EXISTS results")
+                db.executescript(_SCHEMA)
+                db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.rows = db.execute("SELECT count(*) FROM results").fetchone()[0]
+        self.db = db
+
+    def flush(self, max_entries: int):
+        """Writes buffered outputs and use times in one transaction and evicts. Call under lock."""
+        if not self.pending and not self.touched:
+            return
+        db = self.db
+        used = time.time_ns()
+        rows = []
+        for disk_key, row in self.pending.items():
+            # values out of SQLite integer range are not stored
+            if isinstance(row[2], int) and not -(2**63) <= row[2] < 2**63:
+                continue
+            rows.append((disk_key, *row, used))
+        with db:
+            inserted = db.executemany(
+                "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            ).rowcount
+            db.executemany(
+                "UPDATE results SET used = ? WHERE key = ?",
+                ((used, disk_key) for disk_key in self.touched),
+            )
+            self.rows += max(inserted, 0)
+            if self.rows > max_entries:
+                # other processes insert too, so counter is refreshed before eviction
+                self.rows = db.execute("SELECT count(*) FROM results").fetchone()[0]
+                excess = self.rows - max_entries
+                if excess > 0:
+                    # evict tenth of limit at once, so next inserts don't evict again
+                    excess += max_entries // 10
+                    db.execute(
+                        "DELETE FROM results WHERE key IN "
+                        "(SELECT key FROM results ORDER BY used LIMIT ?)",
+                        (excess,),
+                    )
+                    self.rows = max(self.rows - excess, 0)
+        self.pending.clear()
+        self.touched.clear()
+
+    def close(self, max_entries: int):
+        """Flushes buffered outputs and closes connection."""
+        with self.lock:
+            self.flush(max_entries)
+            self.db.close()
+
+
+class PersistentTransformationCache(TransformationCache):
+    """
+    TransformationCache backed by SQLite file, shared by runs and by processes.\n
+    Memory LRU table is checked first, then database, outputs of misses are buffered\n
+    and written every batch_size misses, by flush(), close(), when process exits\n
+    and when cache is garbage collected.\n
+    Attributes:
+        path (str): database file
+        max_entries (int): maximum number of rows in database
+        batch_size (int): number of buffered outputs written in one transaction
+        disk_hits (int): number of hits answered from database
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        maxsize: int = 4096,
+        max_entries: int = 1_000_000,
+        batch_size: int = 1000,
+    ):
+        """PersistentTransformationCache init, database is created if needed.
+
+        Args:
+            path (str | os.PathLike): database file
+            maxsize (int): maximum number of outputs in memory LRU table. Defaults to 4096.
+            max_entries (int): maximum number of rows in database, least recently used
+                are evicted. Defaults to 1_000_000.
+            batch_size (int): outputs written in one transaction. Defaults to 1000.
+
+        Raises:
+            ValueError: if maxsize, max_entries or batch_size is less than 1
+        """
+        super().__init__(maxsize)
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be positive, got {max_entries}")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        self.path = os.fspath(path)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.disk_hits = 0
+        self._pid: int | None = None
+        self._database: _Database | None = None
+        self._finalizer: Finalize | None = None
+        with self._lock:
+            self._connection()
+
+    def _connection(self) -> _Database:
+        """Database of current process, forked pool worker opens its own. Call under lock."""
+        if self._pid == os.getpid():
+            return self._database  # type: ignore
+        if self._database is not None:
+            # writes buffered by parent process are flushed by parent
+            _INHERITED_CONNECTIONS.append(self._database.db)
+        database = _Database(self.path, self._lock)
+        self._database = database
+        self._pid = os.getpid()
+        # one finalizer per process, it runs at exit of main process and of multiprocessing
+        # workers (atexit doesn't run in workers) or when cache is collected
+        self._finalizer = Finalize(
+            self, database.close, args=(self.max_entries,), exitpriority=10
+        )
+        return database
+
+    def _get(self, key: tuple) -> tuple | None:
+        entry = super()._get(key)
+        if entry is not None:
+            return entry
+        disk_key = _disk_key(key)
+        with self._lock:
+            database = self._connection()
+            row = database.pending.get(disk_key)
+            if row is None:
+                row = database.db.execute(
+                    "SELECT compact, item_type, value, materials, dustwork_type, tags "
+                    "FROM results WHERE key = ?",
+                    (disk_key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                database.touched.add(disk_key)
+            compact, item_type, value, materials, dustwork_type, tags = row
+            tags = tuple(tags.split(_TAG_SEPARATOR)) if tags else ()
+            entry = (
+                CompactItem if compact else Item,
+                _MEMBERS.get(item_type, item_type),
+                value,
+                materials,
+                _MEMBERS.get(dustwork_type, dustwork_type),
+                tags_to_mask(tags) if compact else tags,
+            )
+            self.hits += 1
+            self.disk_hits += 1
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _put(self, key: tuple, entry: tuple | None):
+        super()._put(key, entry)
+        if entry is None:
+            return
+        item_class, item_type, value, materials, dustwork_type, tags = entry
+        if item_class is CompactItem:
+            tags = mask_to_tags(tags)
+        row = (
+            item_class is CompactItem,
+            str(item_type),
+            value,
+            materials,
+            str(dustwork_type),
+            _TAG_SEPARATOR.join(tags),
+        )
+        disk_key = _disk_key(key)
+        with self._lock:
+            database = self._connection()
+            database.pending[disk_key] = row
+            if len(database.pending) >= self.batch_size:
+                database.flush(self.max_entries)
+
+    def flush(self):
+        """Writes buffered outputs into database."""
+        with self._lock:
+            if self._database is not None:
+                self._connection().flush(self.max_entries)
+
+    def disk_size(self) -> int:
+        """Number of outputs stored in database, buffered outputs included.
+
+        Returns:
+            int: number of rows after flush()
+        """
+        with self._lock:
+            database = self._connection()
+            database.flush(self.max_entries)
+            return database.db.execute("SELECT count(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        """Removes all stored outputs from memory and database, resets counters."""
+        super().clear()
+        with self._lock:
+            database = self._connection()
+            database.pending.clear()
+            database.touched.clear()
+            with database.db:
+                database.db.execute("DELETE FROM results")
+            database.rows = 0
+            self.disk_hits = 0
+
+    def close(self):
+        """Flushes buffered outputs and closes connection, next use opens it again."""
+        with self._lock:
+            if self._database is not None and self._pid == os.getpid():
+                self._finalizer.cancel()  # type: ignore
+                self._database.flush(self.max_entries)
+                self._database.db.close()
+            self._database = None
+            self._finalizer = None
+            self._pid = None
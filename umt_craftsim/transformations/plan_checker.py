@@ -0,0 +1,245 @@
+"""
+Static type and tag checker for crafting plans.\n
+Validation of every machine depends only on item type and tags of inputs, so plan can be\n
+checked once on abstract states (item_type, tags) instead of on every item.\n
+Checker runs machines of plan on sets of possible states, rejects plan with\n
+PlanValidationError before any item is processed, and returns possible output states.\n
+Plans proven valid can be executed in trusted mode, without per-item validation,\n
+see ItemBuilder.compile(trusted=True) and CompiledMachine.run_trusted.\n
+Example:
+    ```
+    states = check_chain([Machines.ORE_CLEANER, Machines.ORE_SMELTER], [state_of(ore)])
+    states = check_recipe((Machines.ALLOY_FURNACE, (Machines.ORE_SMELTER, ore), bar))
+    ```
+"""
+
+from itertools import product
+from typing import Callable, Iterable, NamedTuple
+
+from umt_craftsim.constants import ItemTypes, Machines, Tags
+from umt_craftsim.dataclasses.items import CompactItem, Item
+from umt_craftsim.service.exceptions import (
+    InvalidItemTypeError,
+    ItemError,
+    ItemProcessingError,
+    PlanValidationError,
+    TagConflictError,
+    TagMissingError,
+)
+from umt_craftsim.transformations.machine_specs import MACHINE_SPECS, InputSpec, MachineSpec
+
+
+class ItemState(NamedTuple):
+    """Abstract item: everything validation of machines depends on.\n
+    Attributes:
+        item_type (str): item type, better to use ItemTypes constants
+        tags (frozenset[str]): tags of item
+    """
+
+    item_type: str
+    tags: frozenset = frozenset()
+
+    def __str__(self) -> str:
+        return f"{self.item_type} [{', '.join(sorted(map(str, self.tags)))}]"
+
+
+def state_of(item: Item | CompactItem | ItemState) -> ItemState:
+    """Abstract state of item.
+
+    Args:
+        item (Item | CompactItem | ItemState): item, state is returned as it is
+
+    Returns:
+        ItemState: type and tags of item
+    """
+    if isinstance(item, ItemState):
+        return item
+    return ItemState(item.item_type, frozenset(item.tags))
+
+
+def _check_inputs(
+    machine_spec: MachineSpec | None, specs: tuple[InputSpec, ...], states: tuple[ItemState, ...]
+):
+    """Raises error machine would raise on items with given states, checks are in machine order."""
+    if machine_spec is not None and machine_spec.types_first:
+        checks = (_check_type, _check_tags)
+    elif machine_spec is not None and machine_spec.tags_first:
+        checks = (_check_tags, _check_type)
+    else:
+        for spec, state in zip(specs, states):
+            _check_type(spec, state)
+            _check_tags(spec, state)
+        return
+    for check in checks:
+        for spec, state in zip(specs, states):
+            check(spec, state)
+
+
+def _check_type(spec: InputSpec, state: ItemState):
+    if spec.types and state.item_type not in spec.types:
+        expected = spec.types[0] if len(spec.types) == 1 else list(spec.types)
+        raise InvalidItemTypeError(expected, state.item_type)
+
+
+def _check_tags(spec: InputSpec, state: ItemState):
+    for tag in spec.required_tags:
+        if tag not in state.tags:
+            raise TagMissingError(tag)
+    for tag in spec.forbidden_tags:
+        if tag in state.tags:
+            raise TagConflictError(tag)
+
+
+def _ore_upgrader(ore: ItemState) -> ItemState:
+    if ore.tags:
+        raise ItemProcessingError("DUDE, STOP, DON'T USE ORE UPGRADER AFTER ANYTHING")
+    return ItemState(ore.item_type, frozenset([Tags.UPGRADED]))
+
+
+# Hand-written transformations: input requirements and output state
+_HANDWRITTEN: dict[str, tuple[tuple[InputSpec, ...], Callable[..., ItemState]]] = {
+    Machines.ORE_UPGRADER: ((InputSpec((ItemTypes.ORE,)),), _ore_upgrader),
+    Machines.BLASTING_POWDER_CHAMBER: (
+        (InputSpec(("metal dust",)), InputSpec(("stone dust",))),
+        lambda metal_dust, stone_dust: ItemState(ItemTypes.BLASTING_POWDER),
+    ),
+    Machines.EXPLOSIVES_MAKER: (
+        (
+            InputSpec((ItemTypes.BLASTING_POWDER,)),
+            InputSpec((ItemTypes.METAL_CASING, ItemTypes.CERAMIC_CASING)),
+        ),
+        lambda powder, casing: ItemState(ItemTypes.EXPLOSIVES, casing.tags),
+    ),
+}
+
+
+def machine_rules(machine: str) -> tuple[tuple[InputSpec, ...], Callable[..., ItemState]]:
+    """Input requirements and output state function of machine.
+
+    Args:
+        machine (str): machine name, better to use Machines constants
+
+    Raises:
+        KeyError: if machine is neither declared in MACHINE_SPECS nor known hand-written machine
+
+    Returns:
+        tuple[tuple[InputSpec, ...], Callable[..., ItemState]]: requirements of every input and
+            function returning output state for input states
+    """
+    spec = MACHINE_SPECS.get(machine)
+    if spec is not None:
+
+        def output(*states: ItemState) -> ItemState:
+            tags = frozenset().union(*(state.tags for state in states))
+            if spec.add_tag is not None:
+                tags = tags | {spec.add_tag}
+            return ItemState(spec.output_type or states[spec.output_type_from].item_type, tags)
+
+        return spec.inputs, output
+    return _HANDWRITTEN[machine]
+
+
+def check_machine(
+    machine: str, *inputs: Iterable[ItemState | Item | CompactItem], step: int = 0
+) -> frozenset[ItemState]:
+    """Checks one machine on every combination of possible input states.
+
+    Args:
+        machine (str): machine name, better to use Machines constants
+        *inputs (Iterable[ItemState | Item | CompactItem]): possible states of every input
+        step (int): index of step reported in error. Defaults to 0.
+
+    Raises:
+        PlanValidationError: if machine rejects any combination, or can't be checked
+
+    Returns:
+        frozenset[ItemState]: possible output states
+    """
+    try:
+        specs, output = machine_rules(machine)
+    except KeyError:
+        raise PlanValidationError(
+            machine, step, None, ItemProcessingError(f"Transformation of {machine} can't be checked")
+        ) from None
+    machine_spec = MACHINE_SPECS.get(machine)
+    if len(inputs) != len(specs):
+        raise PlanValidationError(
+            machine,
+            step,
+            None,
+            ItemProcessingError(f"{machine} takes {len(specs)} items, got {len(inputs)}"),
+        )
+    outputs = set()
+    for states in product(*(sorted({state_of(s) for s in states}, key=str) for states in inputs)):
+        try:
+            _check_inputs(machine_spec, specs, states)
+            outputs.add(output(*states))
+        except ItemError as error:
+            rejected = states[0] if len(states) == 1 else ", ".join(map(str, states))
+            raise PlanValidationError(machine, step, rejected, error) from None
+    return frozenset(outputs)
+
+
+def check_chain(
+    machines: Iterable[str], states: Iterable[ItemState | Item | CompactItem]
+) -> frozenset[ItemState]:
+    """Checks chain of single input machines, as queued in ItemBuilder.
+
+    Args:
+        machines (Iterable[str]): machines in crafting order
+        states (Iterable[ItemState | Item | CompactItem]): possible states of chain input
+
+    Raises:
+        PlanValidationError: for first step which rejects possible state
+
+    Returns:
+        frozenset[ItemState]: possible output states
+    """
+    current = frozenset(state_of(state) for state in states)
+    for step, machine in enumerate(machines):
+        current = check_machine(machine, current, step=step)
+    return current
+
+
+def check_recipe(recipe) -> frozenset[ItemState]:
+    """Checks recipe DAG of registry machines.
+
+    Recipe is input or tuple (machine, *recipes of inputs), input is Item, CompactItem,
+    ItemState or set of possible ItemState. Same sub-recipe object used several times
+    is checked once, steps are numbered in checking (post-)order.
+
+    Args:
+        recipe (tuple | Item | CompactItem | ItemState | Iterable[ItemState]): recipe
+
+    Raises:
+        PlanValidationError: for first step which rejects possible state
+
+    Returns:
+        frozenset[ItemState]: possible states of recipe output
+
+    Example:
+        ```
+        bar = (Machines.ORE_SMELTER, (Machines.ORE_CLEANER, ItemState(ItemTypes.ORE)))
+        check_recipe((Machines.ALLOY_FURNACE, bar, bar))
+        ```
+    """
+    checked: dict[int, frozenset[ItemState]] = {}
+    steps = 0
+
+    def visit(node) -> frozenset[ItemState]:
+        nonlocal steps
+        if id(node) in checked:
+            return checked[id(node)]
+        if isinstance(node, tuple) and not isinstance(node, ItemState):
+            machine, *children = node
+            inputs = [visit(child) for child in children]
+            states = check_machine(machine, *inputs, step=steps)
+            steps += 1
+        elif isinstance(node, (Item, CompactItem, ItemState)):
+            states = frozenset([state_of(node)])
+        else:
+            states = frozenset(state_of(state) for state in node)
+        checked[id(node)] = states
+        return states
+
+    return visit(recipe)
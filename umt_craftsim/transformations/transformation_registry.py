@@ -2,92 +2,258 @@
 Central registry for machine-to-transformation mappings.
 """
 
+import os
+import sys
+from collections.abc import Iterator, MutableMapping
+from importlib import import_module
+from itertools import product
+from threading import Lock
+from typing import TYPE_CHECKING
+
 from umt_craftsim.constants import Machines
-from umt_craftsim.transformations import transformations_multiple, transformations_single
-from umt_craftsim.transformations.transformations_multiple import Transformation_Multiple
-from umt_craftsim.transformations.transformations_single import Transformation_Single
+from umt_craftsim.dataclasses.items import Item
+from umt_craftsim.transformations.engine import CompiledMachine, compile_spec
+from umt_craftsim.transformations.machine_specs import MACHINE_SPECS, MachineSpec
+from umt_craftsim.transformations.memoization import TransformationCache
+from umt_craftsim.transformations.plan_checker import ItemState, machine_rules
+
+if TYPE_CHECKING:
+    from umt_craftsim.transformations.transformations_multiple import Transformation_Multiple
+    from umt_craftsim.transformations.transformations_single import Transformation_Single
+
+
+# Short names used by players, resolved same as display names
+MACHINE_ALIASES: dict[str, Machines] = {
+    "QA": Machines.QUALITY_ASSURANCE_MACHINE,
+    "QA Machine": Machines.QUALITY_ASSURANCE_MACHINE,
+    "GTB": Machines.GEM_TO_BAR_TRANSMUTER,
+    "BTG": Machines.BAR_TO_GEM_TRANSMUTER,
+    "Philosopher Stone": Machines.PHILOSOPHERS_STONE,
+    "Mech Parts Maker": Machines.MECHANICAL_PARTS_MAKER,
+}
+
+
+def normalize_machine_name(name: str) -> str:
+    """Key of machine name lookup: case, spaces, underscores and punctuation are ignored,\n
+    so "ORE_CLEANER", "Ore Cleaner", "ore-cleaner" and "orecleaner" are same name.
+
+    Args:
+        name (str): machine name in any spelling
+
+    Returns:
+        str: lowercase name with only letters and digits
+    """
+    return "".join(char for char in name.casefold() if char.isalnum())
+
+
+def _machine_names() -> dict[str, Machines]:
+    """Normalized enum names, display values and aliases of every machine."""
+    names = {}
+    for machine in Machines:
+        names[normalize_machine_name(machine.name)] = machine
+        names[normalize_machine_name(machine.value)] = machine
+    for alias, machine in MACHINE_ALIASES.items():
+        names[normalize_machine_name(alias)] = machine
+    return names
+
+
+def transformation_from_spec(spec: MachineSpec) -> type:
+    """Creates transformation class for machine declared only in machine_specs.MACHINE_SPECS.
+
+    Args:
+        spec (MachineSpec): machine description
+
+    Returns:
+        type: subclass of SpecTransformation_Single or SpecTransformation_Multiple
+    """
+    from umt_craftsim.transformations.transformations_multiple import SpecTransformation_Multiple
+    from umt_craftsim.transformations.transformations_single import SpecTransformation_Single
+
+    base = SpecTransformation_Single if len(spec.inputs) == 1 else SpecTransformation_Multiple
+    name = "".join(word.capitalize() for word in str(spec.machine).split()) + "Transformation"
+    return type(name, (base,), {"machine": spec.machine, "_compiled": compile_spec(spec)})
+
+
+def compiled_machine(
+    transformation: "Transformation_Single | Transformation_Multiple",
+) -> CompiledMachine | None:
+    """Returns compiled engine machine which transform() of transformation delegates to.
+
+    Args:
+        transformation (Transformation_Single | Transformation_Multiple): transformation instance
+
+    Returns:
+        CompiledMachine | None: compiled machine, None for hand-written transformations
+    """
+    # module of transformation is loaded already, so imports are dict lookups
+    from umt_craftsim.transformations.transformations_multiple import SpecTransformation_Multiple
+    from umt_craftsim.transformations.transformations_single import SpecTransformation_Single
+
+    # wrappers (MemoizedTransformation) have transform() as instance attribute, not method
+    if getattr(type(transformation), "transform", None) in (
+        SpecTransformation_Single.transform,
+        SpecTransformation_Multiple.transform,
+    ):
+        return transformation._compiled  # type: ignore
+    return None
+
+
+class LazyRegistry(MutableMapping):
+    """
+    Machine to transformation class mapping, which loads classes on first access.\n
+    Value is stored as class, None (not implemented), import path "module.ClassName"\n
+    (module can be relative to umt_craftsim.transformations, as ".transformations_single")\n
+    or MachineSpec, which is turned into class by transformation_from_spec().\n
+    Path and spec are resolved once, when value is read first time, so importing registry\n
+    doesn't import transformation modules and doesn't build classes nobody uses.
+    """
+
+    def __init__(self, entries: dict | None = None):
+        """LazyRegistry init.
+
+        Args:
+            entries (dict | None): machine to class, None, import path or MachineSpec. Defaults to None.
+        """
+        self._entries: dict = dict(entries or {})
+        self._lock = Lock()
+
+    def __getitem__(self, machine):
+        value = self._entries[machine]
+        if isinstance(value, (str, MachineSpec)):
+            with self._lock:
+                value = self._entries[machine]
+                if isinstance(value, MachineSpec):
+                    value = self._entries[machine] = transformation_from_spec(value)
+                elif isinstance(value, str):
+                    module, _, name = value.rpartition(".")
+                    value = getattr(import_module(module, __package__), name)
+                    self._entries[machine] = value
+        return value
+
+    def __setitem__(self, machine, value):
+        self._entries[machine] = value
+
+    def __delitem__(self, machine):
+        del self._entries[machine]
+
+    def __contains__(self, machine) -> bool:
+        return machine in self._entries
+
+    def __iter__(self) -> Iterator:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._entries!r})"
+
+    def peek(self, machine, default=None):
+        """Stored value of machine without loading it: class, None, import path or MachineSpec,
+        default if machine is not in registry."""
+        return self._entries.get(machine, default)
 
 
 class TransformationRegistry:
     """Central catalog mapping crafting machines to their transformation logic.
 
     Attributes:
-        registry (dict[Machines, Transformation_Single | Transformation_Multiple | None]):
+        registry (LazyRegistry[Machines, Transformation_Single | Transformation_Multiple | None]):
             Complete mapping of all machines to their corresponding transformation classes.
-            None indicates unimplemented transformations.
+            None indicates unimplemented transformations. Machines declared only in
+            machine_specs.MACHINE_SPECS get generated class. Classes are imported
+            (or generated) on first access, see LazyRegistry.
+
+    Transformations are stateless, so registry also hands out one shared instance per machine,
+    created on first use, see get_instance() and apply().
+    apply() results can be memoized, see enable_memoization().
+    Search code can look machines up by what they consume, produce, add or forbid,
+    see consumers(), producers(), tag_adders(), tag_forbidders() and tag_requirers(),
+    indexes are built on first query.
 
     Example:
         ```
         frame_maker = TransformationRegistry.get_transformation("Frame Maker")
         frame = frame_maker().transform(bar, bolts)
+        # same without new transformation object:
+        frame = TransformationRegistry.apply(Machines.FRAME_MAKER, bar, bolts)
         ```
     """
 
-    registry = {
-        Machines.ORE_CLEANER: transformations_single.OreCleanerTransformation,
-        Machines.POLISHER: transformations_single.PolisherTransformation,
-        Machines.ELECTRONIC_TUNER: transformations_single.PolisherTransformation,
-        Machines.GEM_CUTTER: transformations_single.GemCutterTransformation,
-        Machines.TEMPERING_FORGE: transformations_single.TemperingForgeTransformation,
-        Machines.QUALITY_ASSURANCE_MACHINE: transformations_single.QAMachineTransformation,
-        Machines.PHILOSOPHERS_STONE: transformations_single.PhilosophersStoneTransformation,
-        Machines.ORE_UPGRADER: transformations_single.OreUpgraderTransformation,
+    _instances: dict = {}
+    _appliers: dict = {}
+    _lock = Lock()
+    _indexes: dict[str, dict] | None = None
+    _names: dict[str, Machines] = _machine_names()
+    _resolved: dict[str, Machines] = {}
+    cache: TransformationCache | None = None
+
+    registry = LazyRegistry({
+        Machines.ORE_CLEANER: ".transformations_single.OreCleanerTransformation",
+        Machines.POLISHER: ".transformations_single.PolisherTransformation",
+        Machines.ELECTRONIC_TUNER: ".transformations_single.ElectronicTunerTransformation",
+        Machines.GEM_CUTTER: ".transformations_single.GemCutterTransformation",
+        Machines.TEMPERING_FORGE: ".transformations_single.TemperingForgeTransformation",
+        Machines.QUALITY_ASSURANCE_MACHINE: ".transformations_single.QAMachineTransformation",
+        Machines.PHILOSOPHERS_STONE: ".transformations_single.PhilosophersStoneTransformation",
+        Machines.ORE_UPGRADER: ".transformations_single.OreUpgraderTransformation",
         Machines.TOPAZ_PROSPECTOR: None,
         Machines.EMERALD_PROSPECTOR: None,
         Machines.SAPPHIRE_PROSPECTOR: None,
         Machines.RUBY_PROSPECTOR: None,
         Machines.DIAMOND_PROSPECTOR: None,
-        Machines.ORE_SMELTER: transformations_single.OreSmelterTransformation,
-        Machines.CRUSHER: transformations_single.CrusherTransformation,
-        Machines.COILER: transformations_single.CoilerTransformation,
+        Machines.ORE_SMELTER: ".transformations_single.OreSmelterTransformation",
+        Machines.CRUSHER: ".transformations_single.CrusherTransformation",
+        Machines.COILER: ".transformations_single.CoilerTransformation",
         Machines.BRICK_MOLD: None,
-        Machines.BOLT_MACHINE: transformations_single.BoltMachineTransformation,
-        Machines.PLATE_STAMPER: transformations_single.PlateStamperTransformation,
+        Machines.BOLT_MACHINE: ".transformations_single.BoltMachineTransformation",
+        Machines.PLATE_STAMPER: ".transformations_single.PlateStamperTransformation",
         Machines.SIFTER: None,
-        Machines.PIPE_MAKER: transformations_single.PipeMakerTransformation,
+        Machines.PIPE_MAKER: ".transformations_single.PipeMakerTransformation",
         Machines.KILN: None,
-        Machines.MECHANICAL_PARTS_MAKER: transformations_single.MechanicalPartsMakerTransformation,
-        Machines.BLAST_FURNACE: transformations_single.BlastFurnaceTransformation,
-        Machines.CERAMIC_FURNACE: transformations_single.CeramicFurnaceTransformation,
-        Machines.FILIGREE_CUTTER: transformations_single.FiligreeCutterTransformation,
-        Machines.LENS_CUTTER: transformations_single.LensCutterTransformation,
-        Machines.DUPLICATOR: transformations_single.DuplicatorTransformation,
+        Machines.MECHANICAL_PARTS_MAKER: ".transformations_single.MechanicalPartsMakerTransformation",
+        Machines.BLAST_FURNACE: ".transformations_single.BlastFurnaceTransformation",
+        Machines.CERAMIC_FURNACE: ".transformations_single.CeramicFurnaceTransformation",
+        Machines.FILIGREE_CUTTER: ".transformations_single.FiligreeCutterTransformation",
+        Machines.LENS_CUTTER: ".transformations_single.LensCutterTransformation",
+        Machines.DUPLICATOR: ".transformations_single.DuplicatorTransformation",
         Machines.NANO_SIFTER: None,
-        Machines.GEM_TO_BAR_TRANSMUTER: transformations_single.GTBTransformation,
-        Machines.BAR_TO_GEM_TRANSMUTER: transformations_single.BTGTransformation,
+        Machines.GEM_TO_BAR_TRANSMUTER: ".transformations_single.GTBTransformation",
+        Machines.BAR_TO_GEM_TRANSMUTER: ".transformations_single.BTGTransformation",
         Machines.CEMENT_MIXER: None,
-        Machines.FRAME_MAKER: transformations_multiple.FrameMakerTransformation,
-        Machines.RING_MAKER: transformations_multiple.RingMakerTransformation,
-        Machines.BLASTING_POWDER_CHAMBER: transformations_multiple.BlastingPowderChamberTransformation,
-        Machines.EXPLOSIVES_MAKER: transformations_multiple.ExplosivesMakerTransformation,
-        Machines.CIRCUIT_MAKER: transformations_multiple.CircuitMakerTransformation,
-        Machines.CLAY_MIXER: transformations_multiple.ClayMixerTransformation,
-        Machines.CASING_MACHINE: transformations_multiple.CasingMachineTransformation,
-        Machines.PRISMATIC_GEM_CRUCIBLE: transformations_multiple.PrismaticGemCrucibleTransformation,
-        Machines.ALLOY_FURNACE: transformations_multiple.AlloyFurnaceTransformation,
-        Machines.MAGNETIC_MACHINE: transformations_multiple.MagneticMachineTransformation,
-        Machines.OPTICS_MACHINE: transformations_multiple.OpticsMachineTransformation,
-        Machines.GILDER: transformations_multiple.GilderTransformation,
-        Machines.ENGINE_FACTORY: transformations_multiple.EngineFactoryTransformation,
-        Machines.SUPERCONDUCTOR_CONSTRUCTOR: transformations_multiple.SuperconductorConstructorTransformation,
-        Machines.AMULET_MAKER: transformations_multiple.AmuletMakerTransformation,
-        Machines.TABLET_FACTORY: transformations_multiple.TabletFactoryTransformation,
-        Machines.BLASTING_POWDER_REFINER: transformations_multiple.BlastingPowderRefinerTransformation,
-        Machines.LASER_MAKER: transformations_multiple.LaserMakerTransformation,
-        Machines.POWER_CORE_ASSEMBLER: transformations_multiple.PowerCoreAssemblerTransformation,
-    }
+        Machines.FRAME_MAKER: ".transformations_multiple.FrameMakerTransformation",
+        Machines.RING_MAKER: ".transformations_multiple.RingMakerTransformation",
+        Machines.BLASTING_POWDER_CHAMBER: ".transformations_multiple.BlastingPowderChamberTransformation",
+        Machines.EXPLOSIVES_MAKER: ".transformations_multiple.ExplosivesMakerTransformation",
+        Machines.CIRCUIT_MAKER: ".transformations_multiple.CircuitMakerTransformation",
+        Machines.CLAY_MIXER: ".transformations_multiple.ClayMixerTransformation",
+        Machines.CASING_MACHINE: ".transformations_multiple.CasingMachineTransformation",
+        Machines.PRISMATIC_GEM_CRUCIBLE: ".transformations_multiple.PrismaticGemCrucibleTransformation",
+        Machines.ALLOY_FURNACE: ".transformations_multiple.AlloyFurnaceTransformation",
+        Machines.MAGNETIC_MACHINE: ".transformations_multiple.MagneticMachineTransformation",
+        Machines.OPTICS_MACHINE: ".transformations_multiple.OpticsMachineTransformation",
+        Machines.GILDER: ".transformations_multiple.GilderTransformation",
+        Machines.ENGINE_FACTORY: ".transformations_multiple.EngineFactoryTransformation",
+        Machines.SUPERCONDUCTOR_CONSTRUCTOR: ".transformations_multiple.SuperconductorConstructorTransformation",
+        Machines.AMULET_MAKER: ".transformations_multiple.AmuletMakerTransformation",
+        Machines.TABLET_FACTORY: ".transformations_multiple.TabletFactoryTransformation",
+        Machines.BLASTING_POWDER_REFINER: ".transformations_multiple.BlastingPowderRefinerTransformation",
+        Machines.LASER_MAKER: ".transformations_multiple.LaserMakerTransformation",
+        Machines.POWER_CORE_ASSEMBLER: ".transformations_multiple.PowerCoreAssemblerTransformation",
+    })
 
     @classmethod
     def get_transformation(
         cls, machine_name: str | Machines
-    ) -> Transformation_Multiple | Transformation_Single:
+    ) -> "Transformation_Multiple | Transformation_Single":
         """
         Retrieves transformation class for a crafting machine.
 
         Provides machine name resolution from both string identifiers and enum members.
 
         Args:
-            machine_name (str | Machines): Machine identifier (case-insensitive string or Machines enum)
+            machine_name (str | Machines): Machine identifier (Machines enum, or enum name, display name
+                or alias in any case and spacing, see resolve())
 
         Raises:
             KeyError: For invalid/unregistered machine names
@@ -106,14 +272,337 @@ class TransformationRegistry:
             ```
         """
 
-        if isinstance(machine_name, str):
-            if machine_name.upper() in Machines.__members__.keys():
-                machine_name = Machines[machine_name.upper()]
-            else:
-                raise KeyError(f"Machine with name {machine_name} not found in Machines")
+        machine_name = cls.resolve(machine_name)
         if machine_name not in cls.registry:
             raise KeyError(f"Transformation for {machine_name} not found")
         elif not cls.registry[machine_name]:
             raise NotImplementedError(f"Transformation class for {machine_name} not implemented")
         else:
             return cls.registry[machine_name]
+
+    @classmethod
+    def resolve(cls, machine_name: str | Machines) -> Machines:
+        """
+        Resolves machine name into Machines member with one dict lookup.
+
+        Enum names ("ORE_CLEANER"), display names ("Ore Cleaner") and MACHINE_ALIASES ("QA")
+        are accepted in any case, with any spaces, underscores or punctuation.
+
+        Args:
+            machine_name (str | Machines): machine name in any spelling, or Machines member
+
+        Raises:
+            KeyError: if name is unknown, message lists closest machine names
+
+        Returns:
+            Machines: machine
+        """
+        if isinstance(machine_name, Machines):
+            return machine_name
+        machine = cls._resolved.get(machine_name)
+        if machine is None:
+            machine = cls._names.get(normalize_machine_name(machine_name))
+            if machine is None:
+                suggestions = cls.suggest(machine_name)
+                hint = f", did you mean {', '.join(suggestions)}?" if suggestions else ""
+                raise KeyError(f"Machine with name {machine_name} not found in Machines{hint}")
+            # names loaded from files repeat, exact spelling is resolved without normalization
+            cls._resolved[machine_name] = machine
+        return machine
+
+    @classmethod
+    def suggest(cls, machine_name: str, count: int = 3) -> list[str]:
+        """
+        Display names of machines closest to unknown name.
+
+        Args:
+            machine_name (str): misspelled machine name
+            count (int): maximum number of suggestions. Defaults to 3.
+
+        Returns:
+            list[str]: display names, closest first
+        """
+        # difflib is needed only for typos, so it isn't imported with registry
+        from difflib import get_close_matches
+
+        matches = get_close_matches(normalize_machine_name(machine_name), cls._names, count * 2)
+        return list(dict.fromkeys(str(cls._names[match]) for match in matches))[:count]
+
+    @classmethod
+    def add_alias(cls, alias: str, machine_name: str | Machines):
+        """
+        Makes resolve() (and every method accepting machine name) accept alias.
+
+        Args:
+            alias (str): new name of machine
+            machine_name (str | Machines): machine, in any spelling resolve() accepts
+
+        Raises:
+            KeyError: if machine_name is unknown
+        """
+        machine = cls.resolve(machine_name)
+        with cls._lock:
+            cls._names = {**cls._names, normalize_machine_name(alias): machine}
+            # alias may be re-pointed, so spellings resolved before are forgotten
+            cls._resolved.clear()
+            cls._appliers.clear()
+            cls._instances = {
+                key: instance for key, instance in cls._instances.items() if isinstance(key, Machines)
+            }
+        # recipes compiled with old meaning of alias, recipe_dsl is imported only if used
+        compile_recipe = getattr(sys.modules.get("umt_craftsim.recipe_dsl"), "_compile", None)
+        if compile_recipe is not None:
+            compile_recipe.cache_clear()
+
+    @classmethod
+    def get_instance(
+        cls, machine_name: str | Machines
+    ) -> "Transformation_Multiple | Transformation_Single":
+        """
+        Retrieves shared transformation instance for a crafting machine.
+
+        Instance is created once per machine (thread-safe) and reused by every caller,
+        transformations don't have state, so sharing is safe.
+
+        Args:
+            machine_name (str | Machines): Machine identifier, same as for get_transformation()
+
+        Raises:
+            KeyError: For invalid/unregistered machine names
+            NotImplementedError: if transformation for machine is found, but not implemented
+
+        Returns:
+            Transformation instance for the specified machine
+        """
+        instance = cls._instances.get(machine_name)
+        if instance is None:
+            machine = cls.resolve(machine_name)
+            transformation = cls.get_transformation(machine)
+            with cls._lock:
+                instance = cls._instances.get(machine)
+                if instance is None:
+                    try:
+                        instance = transformation()  # type: ignore
+                    except TypeError as exc:
+                        raise NotImplementedError(
+                            f"Transformation class for {machine} not implemented"
+                        ) from exc
+                    if not hasattr(instance, "transform"):
+                        raise NotImplementedError(
+                            f"Transformation class for {machine} not implemented"
+                        )
+                    cls._instances[machine] = instance
+                # every spelling of name shares instance of machine
+                cls._instances[machine_name] = instance
+        return instance
+
+    @classmethod
+    def apply(cls, machine_name: str | Machines, *items: Item) -> Item:
+        """
+        Transforms items with machine, one dict lookup and one call after first use.
+
+        Declarative machines are called through compiled engine directly,
+        other machines through transform() of shared instance.
+
+        Args:
+            machine_name (str | Machines): Machine identifier, same as for get_transformation()
+            *items (Item): inputs of transform()
+
+        Raises:
+            KeyError: For invalid/unregistered machine names
+            NotImplementedError: if transformation for machine is found, but not implemented
+
+        Returns:
+            Item: output of transformation
+
+        Example:
+            ```
+            bar = TransformationRegistry.apply(Machines.ORE_SMELTER, ore)
+            alloy = TransformationRegistry.apply(Machines.ALLOY_FURNACE, bar, bar)
+            ```
+        """
+        try:
+            transform = cls._appliers[machine_name]
+        except KeyError:
+            instance = cls.get_instance(machine_name)
+            compiled = compiled_machine(instance)
+            transform = compiled.run if compiled is not None else instance.transform
+            if cls.cache is not None:
+                transform = cls.cache.wrap(instance.machine, transform)
+            cls._appliers[machine_name] = transform
+        return transform(*items)
+
+    @classmethod
+    def enable_memoization(
+        cls, maxsize: int = 4096, cache: TransformationCache | None = None
+    ) -> TransformationCache:
+        """
+        Makes apply() answer repeated crafts of same inputs from LRU cache.
+
+        Inputs are compared by item_type, value, materials and tags, so outputs
+        get history of actual inputs, see memoization.TransformationCache.
+        ItemFactory plans compiled after this call use same cache.
+
+        Args:
+            maxsize (int): maximum number of cached outputs. Defaults to 4096.
+            cache (TransformationCache | None): cache to use instead of new one, as
+                persistent_cache.PersistentTransformationCache kept across runs. Defaults to None.
+
+        Returns:
+            TransformationCache: cache used by apply(), for cache_info() and clear()
+        """
+        with cls._lock:
+            cls.cache = cache if cache is not None else TransformationCache(maxsize)
+            cls._appliers.clear()
+        return cls.cache
+
+    @classmethod
+    def disable_memoization(cls):
+        """Turns memoization of apply() off and drops cached outputs."""
+        with cls._lock:
+            cls.cache = None
+            cls._appliers.clear()
+
+    @classmethod
+    def _index(cls, name: str) -> dict:
+        """Index by name, all indexes are built together on first use."""
+        indexes = cls._indexes
+        if indexes is None:
+            with cls._lock:
+                if cls._indexes is None:
+                    cls._indexes = cls._build_indexes()
+                indexes = cls._indexes
+        return indexes[name]
+
+    @classmethod
+    def _build_indexes(cls) -> dict[str, dict]:
+        """Builds lookup tables of implemented machines from their declared rules.\n
+        Key None of consumers and producers holds machines accepting (and keeping) any item type,
+        they are included into list of every item type too.
+        """
+        consumers: dict = {None: []}
+        producers: dict = {None: []}
+        adders: dict = {}
+        forbidders: dict = {}
+        requirers: dict = {}
+        for machine, transformation in cls.registry.items():
+            if transformation is None or not hasattr(transformation, "transform"):
+                continue
+            try:
+                specs, output = machine_rules(machine)
+            except KeyError:
+                continue
+            for spec in specs:
+                for item_type in spec.types or (None,):
+                    consumers.setdefault(item_type, []).append(machine)
+                for tag in spec.forbidden_tags:
+                    forbidders.setdefault(tag, []).append(machine)
+                for tag in spec.required_tags:
+                    requirers.setdefault(tag, []).append(machine)
+            # None item type stands for input of any type, output keeps it
+            for types in product(*(spec.types or (None,) for spec in specs)):
+                state = output(*(ItemState(item_type) for item_type in types))  # type: ignore
+                producers.setdefault(state.item_type, []).append(machine)
+                for tag in state.tags:
+                    adders.setdefault(tag, []).append(machine)
+
+        def freeze(index: dict, any_type: bool = False) -> dict:
+            common = index.pop(None, []) if any_type else []
+            frozen = {
+                key: tuple(dict.fromkeys(machines + common)) for key, machines in index.items()
+            }
+            if any_type:
+                frozen[None] = tuple(dict.fromkeys(common))
+            return frozen
+
+        return {
+            "consumers": freeze(consumers, True),
+            "producers": freeze(producers, True),
+            "adders": freeze(adders),
+            "forbidders": freeze(forbidders),
+            "requirers": freeze(requirers),
+        }
+
+    @classmethod
+    def refresh_indexes(cls):
+        """Drops lookup indexes, next query rebuilds them, call after registry is changed."""
+        with cls._lock:
+            cls._indexes = None
+
+    @classmethod
+    def consumers(cls, item_type: str) -> tuple[Machines, ...]:
+        """
+        Machines with at least one input accepting item type, machines accepting any type included.
+
+        Args:
+            item_type (str): item type, better to use ItemTypes constants
+
+        Returns:
+            tuple[Machines, ...]: machines in registry order
+        """
+        index = cls._index("consumers")
+        return index.get(item_type, index[None])
+
+    @classmethod
+    def producers(cls, item_type: str) -> tuple[Machines, ...]:
+        """
+        Machines which can output item type, machines keeping type of any input included.
+
+        Args:
+            item_type (str): item type, better to use ItemTypes constants
+
+        Returns:
+            tuple[Machines, ...]: machines in registry order
+        """
+        index = cls._index("producers")
+        return index.get(item_type, index[None])
+
+    @classmethod
+    def tag_adders(cls, tag: str) -> tuple[Machines, ...]:
+        """
+        Machines which add tag to output.
+
+        Args:
+            tag (str): tag, better to use Tags constants
+
+        Returns:
+            tuple[Machines, ...]: machines in registry order
+        """
+        return cls._index("adders").get(tag, ())
+
+    @classmethod
+    def tag_forbidders(cls, tag: str) -> tuple[Machines, ...]:
+        """
+        Machines which reject input with tag.
+
+        Args:
+            tag (str): tag, better to use Tags constants
+
+        Returns:
+            tuple[Machines, ...]: machines in registry order
+        """
+        return cls._index("forbidders").get(tag, ())
+
+    @classmethod
+    def tag_requirers(cls, tag: str) -> tuple[Machines, ...]:
+        """
+        Machines which require input with tag.
+
+        Args:
+            tag (str): tag, better to use Tags constants
+
+        Returns:
+            tuple[Machines, ...]: machines in registry order
+        """
+        return cls._index("requirers").get(tag, ())
+
+
+for _machine, _spec in MACHINE_SPECS.items():
+    if TransformationRegistry.registry.peek(_machine) is None:
+        TransformationRegistry.registry[_machine] = _spec
+
+# opt-in instrumentation, nothing is imported while variable isn't set
+if os.environ.get("UMT_CRAFTSIM_INSTRUMENT"):
+    from umt_craftsim.transformations.instrumentation import enable_from_environment
+
+    enable_from_environment()
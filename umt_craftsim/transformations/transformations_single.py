@@ -3,12 +3,19 @@ Defines transformations that process a single input item.
 
 This module provides abstract base classes and concrete implementations
 for crafting transformations that operate on individual items.
+Most machines are declared in machine_specs.MACHINE_SPECS and their classes
+only name the machine, validation and value formula are run by compiled engine.
 """
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
 
 from umt_craftsim.constants import ItemTypes, Machines, Tags
 from umt_craftsim.dataclasses.items import Item
 from umt_craftsim.service.mixins import TransformationHelperMixin
+from umt_craftsim.transformations.engine import COMPILED_MACHINES, CompiledMachine
+
+if TYPE_CHECKING:
+    from umt_craftsim.dataclasses.batch import ItemBatch
 
 
 class Transformation_Single(ABC):
@@ -17,7 +24,13 @@ class Transformation_Single(ABC):
     
     Subclasses must implement the `transform()` method to define single-item
     transformation logic.
+
+    Attributes:
+        machine (str): machine of transformation, better to use Machines constants
     """
+
+    machine: str = Machines.UNKNOWN
+
     @abstractmethod
     def transform(self, item: Item) -> Item:
         """
@@ -31,276 +44,133 @@ class Transformation_Single(ABC):
         """
         pass
 
-
-# Reason why type: ignore everywhere is to surpess mismatch of names of vars of realization of transform
-class OreCleanerTransformation(Transformation_Single):
-    def transform(self, ore: Item) -> Item:  # type: ignore
+    def transform_batch(self, batch: "ItemBatch") -> "ItemBatch":
         """
-        transform ore -> ore with Cleaned tag
+        Process every item of batch, same as transform() of each item.
+
+        Default implementation calls transform() per item, subclasses override it
+        with vectorized version.
 
         Args:
-            ore (Item): item with type Ore without tag Cleaned
+            batch: Input ItemBatch to transform
 
         Returns:
-            Item: item with tag Cleaned and +10 value
+            New ItemBatch resulting from the transformation
         """
-        TransformationHelperMixin.validate_type(ore, ItemTypes.ORE)
-        TransformationHelperMixin.validate_tag_absence(ore, Tags.CLEANED)
-
-        return Item(
-            item_type=ore.item_type,
-            value=ore.value + 10,
-            materials=ore.materials,
-            tags=ore.tags + [Tags.CLEANED],
-            sequence=ore.sequence + [Machines.ORE_CLEANER],
-        )
-
-
-class PolisherTransformation(Transformation_Single):
-    def transform(self, any_item: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_tag_absence(any_item, Tags.POLISHED)
-
-        return Item(
-            item_type=any_item.item_type,
-            value=any_item.value + 10,
-            materials=any_item.materials,
-            tags=any_item.tags + [Tags.POLISHED],
-            sequence=any_item.sequence + [Machines.POLISHER],
-        )
-
-
-class OreSmelterTransformation(Transformation_Single):
-    def transform(self, ore: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(ore, ItemTypes.ORE)
-
-        return Item(
-            item_type=ItemTypes.BAR,
-            value=round(ore.value * 1.2),
-            materials=ore.materials,
-            tags=ore.tags + [Tags.SMELTED],
-            sequence=ore.sequence + [Machines.ORE_SMELTER],
-        )
+        from umt_craftsim.dataclasses.batch import ItemBatch
 
+        return ItemBatch.from_items(self.transform(item) for item in batch.to_items())
 
-class CoilerTransformation(Transformation_Single):
-    def transform(self, bar: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(bar, ItemTypes.BAR)
-
-        return Item(
-            item_type=ItemTypes.COIL,
-            value=bar.value + 20,
-            materials=bar.materials,
-            tags=bar.tags + [Tags.DRAWN],
-            sequence=bar.sequence + [Machines.COILER],
-        )
 
+class SpecTransformation_Single(Transformation_Single):
+    """
+    Single-item transformation declared by MachineSpec.
 
-class BoltMachineTransformation(Transformation_Single):
-    def transform(self, bar: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(bar, ItemTypes.BAR)
+    Subclasses only set `machine`, spec is taken from machine_specs.MACHINE_SPECS
+    (or given as `_compiled`) and executed by compiled engine.
+    """
 
-        return Item(
-            item_type=ItemTypes.BOLTS,
-            value=bar.value + 5,
-            materials=bar.materials,
-            tags=bar.tags + [Tags.BOLTS],
-            sequence=bar.sequence + [Machines.BOLT_MACHINE],
-        )
+    _compiled: CompiledMachine
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "_compiled" not in cls.__dict__:
+            cls._compiled = COMPILED_MACHINES[cls.machine]
 
-class PlateStamperTransformation(Transformation_Single):
-    def transform(self, bar: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(bar, ItemTypes.BAR)
+    def transform(self, item: Item) -> Item:
+        return self._compiled.run(item)
 
-        return Item(
-            item_type=ItemTypes.PLATE,
-            value=bar.value + 20,
-            materials=bar.materials,
-            tags=bar.tags + [Tags.PLATE],
-            sequence=bar.sequence + [Machines.PLATE_STAMPER],
-        )
+    def transform_batch(self, batch: "ItemBatch") -> "ItemBatch":
+        return self._compiled.run_batch(batch)
 
 
-class PipeMakerTransformation(Transformation_Single):
-    def transform(self, plate: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(plate, ItemTypes.PLATE)
+class OreCleanerTransformation(SpecTransformation_Single):
+    machine = Machines.ORE_CLEANER
 
-        return Item(
-            item_type=ItemTypes.PIPE,
-            value=plate.value + 20,
-            materials=plate.materials,
-            tags=plate.tags + [Tags.PIPE],
-            sequence=plate.sequence + [Machines.PIPE_MAKER],
-        )
 
+class PolisherTransformation(SpecTransformation_Single):
+    machine = Machines.POLISHER
 
-class MechanicalPartsMakerTransformation(Transformation_Single):
-    def transform(self, plate: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(plate, ItemTypes.PLATE)
 
-        return Item(
-            item_type=ItemTypes.MECHANICAL_PARTS,
-            value=plate.value + 30,
-            materials=plate.materials,
-            tags=plate.tags + [Tags.MECHANICAL_PARTS],
-            sequence=plate.sequence + [Machines.MECHANICAL_PARTS_MAKER],
-        )
+class OreSmelterTransformation(SpecTransformation_Single):
+    machine = Machines.ORE_SMELTER
 
 
-class ElectronicTunerTransformation(Transformation_Single):
-    def transform(self, electronics: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_tag_absence(electronics, Tags.TUNED)
-        TransformationHelperMixin.validate_multiple_items_types(
-            [electronics],
-            [
-                ItemTypes.CIRCUIT,
-                ItemTypes.ELECTROMAGNET,
-                ItemTypes.TABLET,
-                ItemTypes.POWER_CORE,
-            ],
-        )
+class CoilerTransformation(SpecTransformation_Single):
+    machine = Machines.COILER
 
-        return Item(
-            item_type=electronics.item_type,
-            value=electronics.value + 50,
-            materials=electronics.materials,
-            tags=electronics.tags + [Tags.TUNED],
-            sequence=electronics.sequence + [Machines.ELECTRONIC_TUNER],
-        )
 
+class BoltMachineTransformation(SpecTransformation_Single):
+    machine = Machines.BOLT_MACHINE
 
-class GemCutterTransformation(Transformation_Single):
-    def transform(self, gem: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(gem, ItemTypes.GEM)
-        TransformationHelperMixin.validate_tag_absence(gem, Tags.CUT)
 
-        return Item(
-            item_type=gem.item_type,
-            value=round(gem.value * 1.4),
-            materials=gem.materials,
-            tags=gem.tags + [Tags.CUT],
-            sequence=gem.sequence + [Machines.GEM_CUTTER],
-        )
+class PlateStamperTransformation(SpecTransformation_Single):
+    machine = Machines.PLATE_STAMPER
 
 
-class BlastFurnaceTransformation(Transformation_Single):
-    def transform(self, ore: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(ore, ItemTypes.ORE)
+class PipeMakerTransformation(SpecTransformation_Single):
+    machine = Machines.PIPE_MAKER
 
-        return Item(
-            item_type=ItemTypes.BAR,
-            value=round(ore.value * 0.8),
-            materials=ore.materials,
-            tags=ore.tags + [Tags.SMELTED],
-            sequence=ore.sequence + [Machines.BLAST_FURNACE],
-        )
 
+class MechanicalPartsMakerTransformation(SpecTransformation_Single):
+    machine = Machines.MECHANICAL_PARTS_MAKER
 
-class CeramicFurnaceTransformation(Transformation_Single):
-    def transform(self, clay_block: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(clay_block, ItemTypes.CLAY_BLOCK)
 
-        return Item(
-            item_type=ItemTypes.CERAMIC_CASING,
-            value=150,
-            materials=clay_block.materials,
-            tags=clay_block.tags + [Tags.CERAMIC],
-            sequence=clay_block.sequence + [Machines.CERAMIC_FURNACE],
-        )
+class ElectronicTunerTransformation(SpecTransformation_Single):
+    machine = Machines.ELECTRONIC_TUNER
 
 
-class TemperingForgeTransformation(Transformation_Single):
-    def transform(self, bar: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(bar, ItemTypes.BAR)
-        TransformationHelperMixin.validate_tag_absence(bar, Tags.TEMPERED)
+class GemCutterTransformation(SpecTransformation_Single):
+    machine = Machines.GEM_CUTTER
 
-        return Item(
-            item_type=bar.item_type,
-            value=round(bar.value * 2),
-            materials=bar.materials,
-            tags=bar.tags + [Tags.TEMPERED],
-            sequence=bar.sequence + [Machines.TEMPERING_FORGE],
-        )
 
+class BlastFurnaceTransformation(SpecTransformation_Single):
+    machine = Machines.BLAST_FURNACE
 
-class FiligreeCutterTransformation(Transformation_Single):
-    def transform(self, plate: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(plate, ItemTypes.PLATE)
 
-        return Item(
-            item_type=ItemTypes.FILIGREE,
-            value=round(plate.value * 1.1),
-            materials=plate.materials,
-            tags=plate.tags + [Tags.FILIGREE],
-            sequence=plate.sequence + ["Filigree Cutter"],
-        )
+class CeramicFurnaceTransformation(SpecTransformation_Single):
+    machine = Machines.CERAMIC_FURNACE
 
 
-class LensCutterTransformation(Transformation_Single):
-    def transform(self, glass: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(glass, ItemTypes.GLASS)
+class TemperingForgeTransformation(SpecTransformation_Single):
+    machine = Machines.TEMPERING_FORGE
 
-        return Item(
-            item_type=ItemTypes.LENS,
-            value=glass.value + 50,
-            materials=glass.materials,
-            tags=glass.tags,  # I tested, here is no tag in game for some reason
-            sequence=glass.sequence + [Machines.LENS_CUTTER],
-        )
 
+class FiligreeCutterTransformation(SpecTransformation_Single):
+    machine = Machines.FILIGREE_CUTTER
 
-class QAMachineTransformation(Transformation_Single):
-    def transform(self, any_item: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_tag_absence(any_item, Tags.QUALITY_ASSURED)
 
-        return Item(
-            item_type=any_item.item_type,
-            value=round(any_item.value * 1.2),
-            materials=any_item.materials,
-            tags=any_item.tags + [Tags.QUALITY_ASSURED],
-            sequence=any_item.sequence + [Machines.QUALITY_ASSURANCE_MACHINE],
-        )
+class LensCutterTransformation(SpecTransformation_Single):
+    machine = Machines.LENS_CUTTER
 
 
-class DuplicatorTransformation(Transformation_Single):
-    def transform(self, any_item: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_tag_absence(any_item, Tags.DUPLICATED)
+class QAMachineTransformation(SpecTransformation_Single):
+    machine = Machines.QUALITY_ASSURANCE_MACHINE
 
-        return Item(
-            item_type=any_item.item_type,
-            value=round(any_item.value * 0.5),
-            materials=any_item.materials * 0.5,
-            tags=any_item.tags + [Tags.DUPLICATED],
-            sequence=any_item.sequence + [Machines.DUPLICATOR],
-        )
 
+class DuplicatorTransformation(SpecTransformation_Single):
+    machine = Machines.DUPLICATOR
 
-class PhilosophersStoneTransformation(Transformation_Single):
-    def transform(self, ore: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(ore, ItemTypes.ORE)
-        TransformationHelperMixin.validate_tag_absence(ore, Tags.GOLD_INFUSED)
 
-        return Item(
-            item_type=ore.item_type,
-            value=round(ore.value * 1.25),
-            materials=ore.materials,
-            tags=ore.tags + [Tags.GOLD_INFUSED],
-            sequence=ore.sequence + [Machines.PHILOSOPHERS_STONE],
-        )
+class PhilosophersStoneTransformation(SpecTransformation_Single):
+    machine = Machines.PHILOSOPHERS_STONE
 
 
+# Reason why type: ignore is to surpess mismatch of names of vars of realization of transform
 class OreUpgraderTransformation(Transformation_Single):
     """Just don't use this after anything, might update later"""
 
+    machine = Machines.ORE_UPGRADER
+    ores = [10, 20, 30, 50, 65, 150, 180, 240, 300, 350, 400, 600, 1000, 1200, 2000]
+
     def transform(self, ore: Item) -> Item:  # type: ignore
         TransformationHelperMixin.validate_type(ore, ItemTypes.ORE)
         if ore.tags:
             raise Exception("DUDE, STOP, DON'T USE ORE UPGRADER AFTER ANYTHING")
 
         value = ore.value
-        ores = [10, 20, 30, 50, 65, 150, 180, 240, 300, 350, 400, 600, 1000, 1200, 2000]
-        value = ores[ores.index(value) + 1]
-        return Item(
+        value = self.ores[self.ores.index(value) + 1]
+        return type(ore)(
             item_type=ore.item_type,
             value=value,
             materials=ore.materials,
@@ -308,31 +178,29 @@ class OreUpgraderTransformation(Transformation_Single):
             sequence=ore.sequence + [Machines.ORE_UPGRADER],
         )
 
+    def transform_batch(self, batch: "ItemBatch") -> "ItemBatch":
+        import numpy as np
+
+        batch.validate_type(ItemTypes.ORE)
+        if (batch.tag_mask != 0).any():
+            raise Exception("DUDE, STOP, DON'T USE ORE UPGRADER AFTER ANYTHING")
 
-class GTBTransformation(Transformation_Single):
-    def transform(self, gem: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(gem, ItemTypes.GEM)
+        ores = np.array(self.ores, np.int64)
+        positions = np.searchsorted(ores, batch.value)
+        found = (positions < len(ores)) & (ores[np.minimum(positions, len(ores) - 1)] == batch.value)
+        if not found.all():
+            raise ValueError(f"{batch.value[~found][0]} is not in list")
+        if (positions + 1 >= len(ores)).any():
+            raise IndexError("list index out of range")
+        return batch.derive(Machines.ORE_UPGRADER, ores[positions + 1], add_tag=Tags.UPGRADED)
 
-        return Item(
-            item_type=ItemTypes.BAR,
-            value=gem.value,
-            materials=gem.materials,
-            tags=gem.tags,
-            sequence=gem.sequence + [Machines.GEM_TO_BAR_TRANSMUTER],
-        )
 
+class GTBTransformation(SpecTransformation_Single):
+    machine = Machines.GEM_TO_BAR_TRANSMUTER
 
-class BTGTransformation(Transformation_Single):
-    def transform(self, bar: Item) -> Item:  # type: ignore
-        TransformationHelperMixin.validate_type(bar, ItemTypes.BAR)
 
-        return Item(
-            item_type=ItemTypes.GEM,
-            value=bar.value,
-            materials=bar.materials,
-            tags=bar.tags,
-            sequence=bar.sequence + [Machines.BAR_TO_GEM_TRANSMUTER],
-        )
+class BTGTransformation(SpecTransformation_Single):
+    machine = Machines.BAR_TO_GEM_TRANSMUTER
 
 
 class CrusherTransformation(Transformation_Single):
@@ -341,4 +209,4 @@ class CrusherTransformation(Transformation_Single):
     Dusts are very incosistent with barely documentation in game neither researches from community.
     """
 
-    pass
+    machine = Machines.CRUSHER